@@ -4,7 +4,7 @@ from marshmallow import Schema, fields, ValidationError
 from app.database import get_db
 from app.models import User, MedicalRecord
 from app.api.deps import require_auth, get_current_active_user
-from app.services.ai_service import ai_service
+from app.services.ai_service import ai_service, is_fallback
 
 bp = Blueprint('ai', __name__, url_prefix='/api/ai')
 
@@ -29,6 +29,8 @@ class AIResponseSchema(Schema):
     """Response schema for AI operations"""
     result = fields.Str(allow_none=True)
     cached = fields.Bool(missing=False, default=False)
+    # Rule-based text served while every AI provider is down
+    fallback = fields.Bool(missing=False, default=False)
 
 
 # Initialize schemas
@@ -122,7 +124,7 @@ def chat_with_ai():
             # Process with OCR first
             from app.services.ocr_service import ocr_service
             try:
-                extracted_text, confidence = ocr_service.extract_text_from_image(image_b64)
+                extracted_text, confidence = ocr_service.extract_text_from_bytes(image_bytes)
                 ocr_result = {
                     "extracted_text": extracted_text or "",
                     "confidence": int(confidence * 100) if confidence else 0
@@ -283,7 +285,9 @@ def translate_medical_text():
             "error": "Failed to translate medical text. Please try again."
         }), 500
     
-    return jsonify(ai_response_schema.dump({"result": translation, "cached": False})), 200
+    return jsonify(ai_response_schema.dump({
+        "result": translation, "cached": False, "fallback": is_fallback(translation)
+    })), 200
 
 
 @bp.route('/suggestions', methods=['POST'])
@@ -303,14 +307,12 @@ def get_lifestyle_suggestions():
         }), 503
     
     # Run async function in sync context
+    # Never None: canned tips stand in when no provider answers
     suggestions = asyncio.run(ai_service.generate_lifestyle_suggestions(data['condition']))
     
-    if suggestions is None:
-        return jsonify({
-            "error": "Failed to generate lifestyle suggestions. Please try again."
-        }), 500
-    
-    return jsonify(ai_response_schema.dump({"result": suggestions, "cached": False})), 200
+    return jsonify(ai_response_schema.dump({
+        "result": suggestions, "cached": False, "fallback": is_fallback(suggestions)
+    })), 200
 
 
 @bp.route('/explain/<int:record_id>', methods=['POST'])
@@ -336,7 +338,8 @@ def explain_medical_record(record_id):
         return jsonify({
             "translation": record.translated_text,
             "suggestions": record.lifestyle_suggestions,
-            "cached": True
+            "cached": True,
+            "fallback": False
         }), 200
     
     # Check if AI service is configured
@@ -348,10 +351,10 @@ def explain_medical_record(record_id):
     # Get AI explanations (run async in sync context)
     result = asyncio.run(ai_service.explain_medical_record(record.original_text, record.record_type))
     
-    # Cache the results
-    if result["translation"]:
+    # Cache the results (rule-based fallbacks are not worth keeping)
+    if result["translation"] and not is_fallback(result["translation"]):
         record.translated_text = result["translation"]
-    if result["suggestions"]:
+    if result["suggestions"] and not is_fallback(result["suggestions"]):
         record.lifestyle_suggestions = result["suggestions"]
     
     db.commit()
@@ -360,5 +363,6 @@ def explain_medical_record(record_id):
     return jsonify({
         "translation": result["translation"],
         "suggestions": result["suggestions"],
-        "cached": False
+        "cached": False,
+        "fallback": is_fallback(result["translation"]) or is_fallback(result["suggestions"])
     }), 200
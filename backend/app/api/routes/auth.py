@@ -3,7 +3,7 @@ from flask import Blueprint, request, jsonify, abort
 from marshmallow import ValidationError
 from app.database import get_db
 from app.schemas.auth import TokenSchema
-from app.schemas.user import UserCreateSchema, UserResponseSchema
+from app.schemas.user import UserCreateSchema
 from app.services.auth import create_user, login_user
 from app.api.deps import require_auth, get_current_active_user
 
@@ -11,7 +11,6 @@ bp = Blueprint('auth', __name__, url_prefix='/api/auth')
 
 # Initialize schemas
 user_create_schema = UserCreateSchema()
-user_response_schema = UserResponseSchema()
 token_schema = TokenSchema()
 
 
@@ -29,7 +28,7 @@ def register():
     # Create user (service will handle validation errors)
     try:
         user = create_user(db, data)
-        return jsonify(user_response_schema.dump(user)), 201
+        return jsonify(user.to_dict()), 201
     except ValueError as e:
         return jsonify({"error": str(e)}), 400
 
@@ -59,4 +58,4 @@ def login():
 def get_current_user_info():
     """Get current authenticated user information"""
     current_user = get_current_active_user()
-    return jsonify(user_response_schema.dump(current_user)), 200
+    return jsonify(current_user.to_dict()), 200
@@ -2,12 +2,7 @@
 from flask import Blueprint, request, jsonify
 from marshmallow import ValidationError
 from app.database import get_db
-from app.schemas.medical_record import (
-    MedicalRecordCreateSchema,
-    MedicalRecordUpdateSchema,
-    MedicalRecordResponseSchema,
-    MedicalRecordListSchema
-)
+from app.schemas.medical_record import MedicalRecordCreateSchema, MedicalRecordUpdateSchema
 from app.models import User, MedicalRecord
 from app.api.deps import require_auth, get_current_active_user
 
@@ -16,8 +11,6 @@ bp = Blueprint('records', __name__, url_prefix='/api/records')
 # Initialize schemas
 record_create_schema = MedicalRecordCreateSchema()
 record_update_schema = MedicalRecordUpdateSchema()
-record_response_schema = MedicalRecordResponseSchema()
-record_list_schema = MedicalRecordListSchema(many=True)
 
 
 @bp.route('', methods=['POST'])
@@ -114,7 +107,7 @@ def create_medical_record():
     except Exception as e:
         print(f"RAG Indexing Failed: {e}")
         
-    return jsonify(record_response_schema.dump(db_record)), 201
+    return jsonify(db_record.to_dict()), 201
 
 
 @bp.route('', methods=['GET'])
@@ -126,25 +119,24 @@ def list_medical_records():
     
     skip = request.args.get('skip', 0, type=int)
     limit = request.args.get('limit', 100, type=int)
+    cursor = request.args.get('cursor', type=int)
     
-    records = db.query(MedicalRecord).filter(
+    # Newest first; ids grow with creation time, so the last id doubles as a keyset cursor
+    query = db.query(*MedicalRecord.summary_columns()).filter(
         MedicalRecord.user_id == current_user.id
-    ).offset(skip).limit(limit).all()
-    
-    # Transform to list view
-    record_list = [
-        {
-            "id": record.id,
-            "title": record.title,
-            "record_type": record.record_type,
-            "created_at": record.created_at,
-            "has_translation": record.translated_text is not None,
-            "has_suggestions": record.lifestyle_suggestions is not None
-        }
-        for record in records
-    ]
-    
-    return jsonify(record_list_schema.dump(record_list)), 200
+    ).order_by(MedicalRecord.id.desc())
+    if cursor is not None:
+        # Seek straight past the cursor instead of scanning and discarding skipped rows
+        query = query.filter(MedicalRecord.id < cursor)
+    elif skip:
+        query = query.offset(skip)
+    records = query.limit(limit).all()
+    
+    response = jsonify([MedicalRecord.summary_dict(record) for record in records])
+    # A full page may have more behind it; clients pass this back as ?cursor=
+    if records and len(records) == limit:
+        response.headers['X-Next-Cursor'] = str(records[-1].id)
+    return response, 200
 
 
 @bp.route('/<int:record_id>', methods=['GET'])
@@ -162,7 +154,7 @@ def get_medical_record(record_id):
     if not record:
         return jsonify({"error": "Medical record not found"}), 404
     
-    return jsonify(record_response_schema.dump(record)), 200
+    return jsonify(record.to_dict()), 200
 
 
 @bp.route('/<int:record_id>', methods=['PUT'])
@@ -186,6 +178,12 @@ def update_medical_record(record_id):
     except ValidationError as err:
         return jsonify({"errors": err.messages}), 400
     
+    # Resending the same text is not a change; keep the cached AI data for it
+    if "original_text" in update_data and update_data["original_text"] == record.original_text:
+        del update_data["original_text"]
+    if not update_data:
+        return jsonify(record.to_dict()), 200
+    
     # Update fields
     for field, value in update_data.items():
         setattr(record, field, value)
@@ -197,7 +195,7 @@ def update_medical_record(record_id):
     
     db.commit()
     db.refresh(record)
-    return jsonify(record_response_schema.dump(record)), 200
+    return jsonify(record.to_dict()), 200
 
 
 @bp.route('/<int:record_id>', methods=['DELETE'])
@@ -1,4 +1,5 @@
 # Training data API routes
+import hashlib
 from flask import Blueprint, request, jsonify
 from marshmallow import ValidationError
 from app.database import get_db
@@ -51,13 +52,11 @@ def upload_training_image():
     if image_type not in ['handwritten', 'printed', 'mixed']:
         return jsonify({'error': 'Invalid image_type. Must be: handwritten, printed, or mixed'}), 400
     
-    # Read and encode image
-    import base64
+    # Read image (stored as raw bytes, no base64 inflation)
     image_bytes = file.read()
-    image_b64 = base64.b64encode(image_bytes).decode('utf-8')
     
-    # Extract text using OCR
-    extracted_text, confidence = ocr_service.extract_text_from_image(image_b64)
+    # Extract text using OCR (straight from the upload, no base64 decode)
+    extracted_text, confidence = ocr_service.extract_text_from_bytes(image_bytes)
     
     # Extract medications from text
     medications_detected = []
@@ -68,7 +67,8 @@ def upload_training_image():
     # Save to database
     training_image = TrainingImage(
         user_id=current_user.id,
-        image_data=image_b64,
+        image_data=image_bytes,
+        image_hash=hashlib.sha256(image_bytes).hexdigest(),
         extracted_text=extracted_text,
         ocr_confidence=confidence,
         image_type=image_type,
@@ -1,8 +1,10 @@
 # User profile and dashboard API routes
 from flask import Blueprint, request, jsonify
 from marshmallow import ValidationError
+from sqlalchemy import case, func, or_
+from sqlalchemy.exc import IntegrityError
 from app.database import get_db
-from app.schemas.user import UserProfileSchema, UserUpdateSchema, UserResponseSchema
+from app.schemas.user import UserProfileSchema, UserUpdateSchema
 from app.models import User, MedicalRecord
 from app.api.deps import require_auth, get_current_active_user
 from app.utils.security import get_password_hash
@@ -12,7 +14,6 @@ bp = Blueprint('users', __name__, url_prefix='/api/users')
 # Initialize schemas
 user_profile_schema = UserProfileSchema()
 user_update_schema = UserUpdateSchema()
-user_response_schema = UserResponseSchema()
 
 
 @bp.route('/me', methods=['GET'])
@@ -28,16 +29,12 @@ def get_user_profile():
     
     # Create response dict
     user_dict = {
-        "id": current_user.id,
-        "email": current_user.email,
-        "username": current_user.username,
-        "full_name": current_user.full_name,
-        "created_at": current_user.created_at,
-        "updated_at": current_user.updated_at,
+        **current_user.to_dict(),
+        "updated_at": current_user.updated_at.isoformat() if current_user.updated_at else None,
         "record_count": record_count
     }
     
-    return jsonify(user_profile_schema.dump(user_dict)), 200
+    return jsonify(user_dict), 200
 
 
 @bp.route('/me', methods=['PUT'])
@@ -53,24 +50,6 @@ def update_user_profile():
     except ValidationError as err:
         return jsonify({"errors": err.messages}), 400
     
-    # Check if email is being updated and if it's already taken
-    if "email" in update_data:
-        existing_user = db.query(User).filter(
-            User.email == update_data["email"],
-            User.id != current_user.id
-        ).first()
-        if existing_user:
-            return jsonify({"error": "Email already registered"}), 400
-            
-    # Check if username is being updated and if it's already taken
-    if "username" in update_data:
-        existing_user = db.query(User).filter(
-            User.username == update_data["username"],
-            User.id != current_user.id
-        ).first()
-        if existing_user:
-            return jsonify({"error": "Username already taken"}), 400
-    
     # Handle password update separately
     if "password" in update_data:
         current_user.hashed_password = get_password_hash(update_data["password"])
@@ -80,11 +59,24 @@ def update_user_profile():
     for field, value in update_data.items():
         setattr(current_user, field, value)
     
-    db.commit()
-    db.refresh(current_user)
-    db.commit()
+    # The unique indexes on email and username reject duplicates; no lookups before the write
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        # One lookup to report which field collided (email wins, as before)
+        existing = db.query(User.email).filter(
+            User.id != current_user.id,
+            or_(User.email == update_data.get("email"), User.username == update_data.get("username"))
+        ).all()
+        if any(row.email == update_data.get("email") for row in existing):
+            return jsonify({"error": "Email already registered"}), 400
+        if existing:
+            return jsonify({"error": "Username already taken"}), 400
+        raise
+    
     db.refresh(current_user)
-    return jsonify(user_response_schema.dump(current_user)), 200
+    return jsonify(current_user.to_dict()), 200
 
 
 @bp.route('/me', methods=['DELETE'])
@@ -147,15 +139,19 @@ def get_dashboard_stats():
     current_user = get_current_active_user()
     db = get_db()
     
-    # Get all records for the user
-    all_records = db.query(MedicalRecord).filter(
+    # Basic Counters in one aggregate query (empty text counts as missing)
+    total_records, records_with_translation, records_with_suggestions = db.query(
+        func.count(MedicalRecord.id),
+        func.count(case((MedicalRecord.translated_text != '', 1))),
+        func.count(case((MedicalRecord.lifestyle_suggestions != '', 1)))
+    ).filter(
         MedicalRecord.user_id == current_user.id
-    ).order_by(MedicalRecord.created_at.desc()).all()
+    ).one()
     
-    # Basic Counters
-    total_records = len(all_records)
-    records_with_translation = sum(1 for r in all_records if r.translated_text)
-    records_with_suggestions = sum(1 for r in all_records if r.lifestyle_suggestions)
+    # Only the columns the stats below need, not record text or images
+    all_records = db.query(*MedicalRecord.summary_columns()).filter(
+        MedicalRecord.user_id == current_user.id
+    ).order_by(MedicalRecord.created_at.desc()).all()
     
     # Time-based filters
     from datetime import datetime, timedelta, timezone
@@ -204,17 +200,7 @@ def get_dashboard_stats():
     ]
     
     # Recent Records
-    recent_records = [
-        {
-            "id": record.id,
-            "title": record.title,
-            "record_type": record.record_type,
-            "created_at": record.created_at.isoformat(),
-            "has_translation": record.translated_text is not None,
-            "has_suggestions": record.lifestyle_suggestions is not None
-        }
-        for record in all_records[:5]
-    ]
+    recent_records = [MedicalRecord.summary_dict(record) for record in all_records[:5]]
     
     response = {
         "user_profile": {
@@ -26,6 +26,8 @@ class Settings:
     SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secret-key-change-this-in-production")
     ALGORITHM: str = os.getenv("ALGORITHM", "HS256")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+    # bcrypt cost factor (each +1 doubles hashing time); lower it on slow dev boxes
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", "12"))
     
     # JWT (Flask-JWT-Extended)
     JWT_SECRET_KEY: str = os.getenv("JWT_SECRET_KEY", os.getenv("SECRET_KEY", "your-secret-key-change-this-in-production"))
@@ -51,7 +53,6 @@ class Settings:
     
     HUGGINGFACE_API_KEY: Optional[str] = os.getenv("HUGGINGFACE_API_KEY")
     HUGGINGFACE_MODEL: str = os.getenv("HUGGINGFACE_MODEL", "meta-llama/Llama-3.2-11B-Vision-Instruct")
-    HUGGINGFACE_BASE_URL: str = os.getenv("HUGGINGFACE_BASE_URL", "https://router.huggingface.co/models")
     
     # Ollama Configuration
     OLLAMA_BASE_URL: str = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
@@ -60,6 +61,19 @@ class Settings:
     # Groq Configuration
     GROQ_API_KEY: Optional[str] = os.getenv("GROQ_API_KEY")
     GROQ_MODEL: str = os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile")
+
+    # Gzip request bodies and negotiate compressed responses with hosted providers
+    HTTP_COMPRESSION: bool = os.getenv("HTTP_COMPRESSION", "True").lower() in ("true", "1", "yes")
+
+    # Start the next hosted provider if the current one hasn't answered within the delay
+    HEDGE_ENABLED: bool = os.getenv("HEDGE_ENABLED", "False").lower() in ("true", "1", "yes")
+    HEDGE_DELAY_MS: int = int(os.getenv("HEDGE_DELAY_MS", "250"))
+
+    # Skip AI translation of OCR text below this average confidence (0.0 - 1.0)
+    OCR_MIN_CONFIDENCE: float = float(os.getenv("OCR_MIN_CONFIDENCE", "0.4"))
+
+    # Tesseract processes run at once by OCRService.extract_batch
+    OCR_CONCURRENCY: int = max(1, int(os.getenv("OCR_CONCURRENCY", str(os.cpu_count() or 1))))
     
     # Legacy Together/Meta AI (Optional Fallback)
     META_AI_API_KEY: Optional[str] = os.getenv("META_AI_API_KEY")
@@ -11,6 +11,25 @@ engine = create_engine(
     connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {}
 )
 
+# Bulk-load SQLite tuning for the seed and scrape scripts: WAL lets readers run
+# alongside the writer and, with synchronous=NORMAL, commits no longer fsync (only
+# checkpoints do). The app engine keeps the default so records and users stay durable.
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-65536",  # 64 MiB page cache per connection
+)
+
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Apply SQLITE_PRAGMAS to each new SQLite connection (register on script engines only)"""
+    cursor = dbapi_connection.cursor()
+    for pragma in SQLITE_PRAGMAS:
+        cursor.execute(pragma)
+    cursor.close()
+
+
 # Create session factory with scoped session for Flask
 session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 SessionLocal = scoped_session(session_factory)
@@ -1,10 +1,13 @@
 
+import logging
 from flask import Flask, render_template, jsonify
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 from flasgger import Swagger
 from app.config import settings
 from app.database import init_db, close_db
+from app.utils.security import check_password_hash_cost
+from app.utils.json_provider import ORJSONProvider, ORJSON_AVAILABLE
 
 # Import blueprints
 from app.api.routes import auth, medical_records, ai, users, knowledge, medications, training
@@ -12,10 +15,21 @@ from app.api.routes import auth, medical_records, ai, users, knowledge, medicati
 
 def create_app():
     """Create and configure Flask application"""
+    # Service modules log through the standard logging hierarchy
+    logging.basicConfig(
+        level=logging.DEBUG if settings.DEBUG else logging.INFO,
+        format="%(asctime)s %(levelname)s [%(name)s] %(message)s"
+    )
+    check_password_hash_cost()
+    
     app = Flask(__name__, 
                 template_folder="../../frontend/templates",
                 static_folder="../../frontend/static")
     
+    # Serialize jsonify() responses and parse request bodies with orjson when installed
+    if ORJSON_AVAILABLE:
+        app.json = ORJSONProvider(app)
+    
     # Configure app
     app.config['SECRET_KEY'] = settings.SECRET_KEY
     app.config['JWT_SECRET_KEY'] = settings.JWT_SECRET_KEY
@@ -24,6 +38,7 @@ def create_app():
     # Initialize CORS
     CORS(app, 
          resources={r"/api/*": {"origins": settings.BACKEND_CORS_ORIGINS}},
+         expose_headers=["X-Next-Cursor"],
          supports_credentials=True)
     
     # Initialize JWT Manager
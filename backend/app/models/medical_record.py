@@ -1,5 +1,5 @@
 # Medical record database model
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -24,3 +24,51 @@ class MedicalRecord(Base):
     
     # Relationship to user
     user = relationship("User", back_populates="medical_records")
+    
+    # Every listing filters on user_id: the records list pages newest-first by id,
+    # the dashboard sorts by created_at (covering title/type on PostgreSQL)
+    __table_args__ = (
+        Index("ix_medical_records_user_id_id", user_id, id),
+        Index(
+            "ix_medical_records_user_id_created_at", user_id, created_at.desc(),
+            postgresql_include=["title", "record_type"]
+        ),
+    )
+
+    def to_dict(self) -> dict:
+        """API representation (same output as MedicalRecordResponseSchema, without the marshmallow pass)"""
+        return {
+            "id": self.id,
+            "user_id": self.user_id,
+            "title": self.title,
+            "original_text": self.original_text,
+            "record_type": self.record_type,
+            "translated_text": self.translated_text,
+            "lifestyle_suggestions": self.lifestyle_suggestions,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None
+        }
+
+    @classmethod
+    def summary_columns(cls) -> tuple:
+        """Columns behind the list views; leaves record text and images unloaded"""
+        return (
+            cls.id,
+            cls.title,
+            cls.record_type,
+            cls.created_at,
+            cls.translated_text.isnot(None).label("has_translation"),
+            cls.lifestyle_suggestions.isnot(None).label("has_suggestions")
+        )
+
+    @staticmethod
+    def summary_dict(row) -> dict:
+        """List view representation of a summary_columns() row (same output as MedicalRecordListSchema)"""
+        return {
+            "id": row.id,
+            "title": row.title,
+            "record_type": row.record_type,
+            "created_at": row.created_at.isoformat() if row.created_at else None,
+            "has_translation": bool(row.has_translation),
+            "has_suggestions": bool(row.has_suggestions)
+        }
@@ -1,5 +1,5 @@
 # Medication database model
-from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime
+from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, Index
 from sqlalchemy.sql import func
 from app.database import Base
 
@@ -18,5 +18,10 @@ class Medication(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
+    # Case-insensitive name lookups filter on lower(name); index that expression
+    __table_args__ = (
+        Index("ix_medications_name_lower", func.lower(name)),
+    )
+    
     def __repr__(self):
         return f"<Medication(name='{self.name}', discontinued={self.discontinued})>"
@@ -1,5 +1,5 @@
 # Training image database model
-from sqlalchemy import Column, Integer, String, Text, Float, Boolean, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, Float, Boolean, DateTime, ForeignKey, LargeBinary
 from sqlalchemy.sql import func
 from app.database import Base
 
@@ -10,7 +10,8 @@ class TrainingImage(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=True)  # Nullable for admin uploads
-    image_data = Column(Text, nullable=False)  # Base64 encoded image
+    image_data = Column(LargeBinary, nullable=False)  # Raw image bytes
+    image_hash = Column(String(64), index=True, nullable=True)  # SHA-256 of the raw image bytes, for duplicate checks
     extracted_text = Column(Text, nullable=True)  # OCR extracted text
     corrected_text = Column(Text, nullable=True)  # Human-corrected version (for training feedback)
     ocr_confidence = Column(Float, nullable=True)  # Confidence score from OCR (0.0 - 1.0)
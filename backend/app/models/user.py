@@ -19,3 +19,13 @@ class User(Base):
     
     # Relationship to medical records
     medical_records = relationship("MedicalRecord", back_populates="user", cascade="all, delete-orphan")
+
+    def to_dict(self) -> dict:
+        """Public API representation (same output as UserResponseSchema, without the marshmallow pass)"""
+        return {
+            "id": self.id,
+            "email": self.email,
+            "username": self.username,
+            "full_name": self.full_name,
+            "created_at": self.created_at.isoformat() if self.created_at else None
+        }
@@ -1,93 +1,289 @@
 # Meta AI service for medical text translation and lifestyle suggestions
+import asyncio
+import atexit
+import hashlib
+import json
+import logging
+import threading
+import time
 import httpx
-from typing import Optional
+from collections import OrderedDict
+from typing import Optional, List, Dict, Tuple
 from huggingface_hub import AsyncInferenceClient
+from huggingface_hub.utils import HfHubHTTPError
 from groq import AsyncGroq
+from sqlalchemy.orm import Session
 from app.config import settings
+from app.database import get_db
+from app.services.knowledge_base import knowledge_base
+from app.services.medication_service import medication_service
+from app.services.ocr_service import ocr_service
+from app.utils.http import AsyncClientPool, model_loading_wait
+
+logger = logging.getLogger(__name__)
+
+# Hosted providers: detect an unreachable host quickly, leave room for generation
+HOSTED_TIMEOUT = httpx.Timeout(30.0, connect=2.0, read=25.0, write=5.0, pool=2.0)
+
+# Many concurrent chat completions can be in flight against Groq at once
+GROQ_LIMITS = httpx.Limits(max_connections=200, max_keepalive_connections=20)
+
+# Local Ollama: a refused connection should fall through almost immediately
+OLLAMA_TIMEOUT = httpx.Timeout(60.0, connect=0.5)
+
+# Attempts per hosted provider before falling back, with exponential backoff between them
+PROVIDER_ATTEMPTS = 2
+PROVIDER_RETRY_BACKOFF = 0.2
+
+# Consecutive failed calls that open a provider's circuit, and how long it stays open
+BREAKER_THRESHOLD = 5
+BREAKER_COOLDOWN = 30.0
+
+# Image arguments starting with these are sent to providers as URLs, not re-wrapped base64
+IMAGE_URL_PREFIXES = ("http://", "https://", "data:")
+
+# Maximum number of (image, prompt) analyses kept in memory
+IMAGE_CACHE_SIZE = 128
+
+# Maximum number of knowledge base lookups kept in memory
+KB_CACHE_SIZE = 1024
+
+# Translations/suggestions kept in memory, and how long (seconds) each stays fresh
+RESPONSE_CACHE_SIZE = 1024
+RESPONSE_CACHE_TTL = 3600.0
+
+# OCR text shorter than this (after stripping) is too little to translate
+OCR_MIN_TEXT_LENGTH = 20
+
+# Canned wellness tips used when no AI provider answers, keyed by condition keyword
+FALLBACK_LIFESTYLE_TIPS = {
+    "diabet": "Keep meals regular, favour whole grains and vegetables, and limit sugary drinks.",
+    "blood pressure": "Cut back on salt, stay active most days, and limit alcohol.",
+    "hypertension": "Cut back on salt, stay active most days, and limit alcohol.",
+    "cholesterol": "Choose unsaturated fats, eat more fibre, and limit fried and processed foods.",
+    "asthma": "Avoid known triggers such as smoke and dust, and keep your inhaler with you.",
+    "anxiety": "Keep a regular sleep schedule, try breathing exercises, and limit caffeine.",
+    "depress": "Stay connected with people you trust, get daylight and gentle exercise, and keep a routine.",
+    "arthritis": "Low-impact exercise like walking or swimming helps keep joints moving.",
+}
+FALLBACK_GENERAL_TIPS = (
+    "Drink enough water, aim for 7-9 hours of sleep, move a little every day, "
+    "and talk to your doctor before changing any treatment."
+)
+
+
+class FallbackText(str):
+    """Rule-based text returned while every AI provider is unavailable"""
+    deterministic = True
+
+
+def is_fallback(text: Optional[str]) -> bool:
+    """True for FallbackText results, which should not be persisted as AI output"""
+    return isinstance(text, FallbackText)
 
 
 class AIService:
     """Service for Meta AI integration (using Hugging Face and Groq)"""
     
     def __init__(self):
+        # Pooled client for Ollama so repeat calls reuse open connections
+        self._http = AsyncClientPool()
+        atexit.register(self._http.close)
+        # Transport for the Groq SDK, likewise one per event loop
+        self._groq_http = AsyncClientPool(timeout=HOSTED_TIMEOUT, limits=GROQ_LIMITS)
+        atexit.register(self._groq_http.close)
+        self.reload()
+
+    def reload(self):
+        """Snapshot settings, rebuild provider clients and drop cached results"""
         # Configuration
         self.max_tokens = settings.META_AI_MAX_TOKENS
         self.temperature = settings.META_AI_TEMPERATURE
+        self.groq_model = settings.GROQ_MODEL
+        self.ollama_base_url = settings.OLLAMA_BASE_URL
+        self.ollama_model = settings.OLLAMA_MODEL
+        self.hedge_enabled = settings.HEDGE_ENABLED
+        self.hedge_delay = settings.HEDGE_DELAY_MS / 1000
         
         # Initialize Hugging Face Client
         self.hf_client = None
         if settings.HUGGINGFACE_API_KEY:
              self.hf_client = AsyncInferenceClient(
                  model=settings.HUGGINGFACE_MODEL,
-                 token=settings.HUGGINGFACE_API_KEY
+                 token=settings.HUGGINGFACE_API_KEY,
+                 timeout=HOSTED_TIMEOUT.read
              )
 
         # Initialize Groq Client
         self.groq_client = None
         if settings.GROQ_API_KEY:
-            self.groq_client = AsyncGroq(api_key=settings.GROQ_API_KEY)
-            self.groq_model = settings.GROQ_MODEL
+            self.groq_client = AsyncGroq(api_key=settings.GROQ_API_KEY, timeout=HOSTED_TIMEOUT)
 
         # Legacy Together AI fallback config
         self.meta_api_key = settings.META_AI_API_KEY
+
+        # Per-provider circuit breakers: consecutive failures and reopen time
+        self._breakers: Dict[str, Dict[str, float]] = {
+            provider: {"fails": 0, "open_until": 0.0} for provider in ("groq", "huggingface")
+        }
+
+        # _kb_query runs in executor threads, so its cache needs a lock
+        self._kb_lock = threading.Lock()
+        self.clear_caches()
+
+    def clear_caches(self):
+        """Drop every cached AI result"""
+        # Vision results keyed by (image digest, prompt)
+        self._image_cache: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+
+        # RAG lookups keyed by (knowledge base version, message)
+        self._kb_cache: "OrderedDict[Tuple[int, str], Tuple[str, ...]]" = OrderedDict()
+
+        # Text responses keyed by (kind, text digest, options) -> (response, expiry)
+        self._response_cache: "OrderedDict[Tuple, Tuple[str, float]]" = OrderedDict()
     
     @property
     def is_configured(self) -> bool:
         """Check if any AI service is configured"""
-        return bool(self.hf_client) or bool(self.groq_client) or bool(self.meta_api_key) or bool(settings.OLLAMA_BASE_URL)
+        return bool(self.hf_client) or bool(self.groq_client) or bool(self.meta_api_key) or bool(self.ollama_base_url)
     
+    @staticmethod
+    def _image_digest(image_b64: str) -> str:
+        """Fast non-cryptographic fingerprint of a base64 image"""
+        return hashlib.blake2b(image_b64.encode(), digest_size=16).hexdigest()
+
+    @staticmethod
+    def _build_messages(prompt: str, system_message: str, image_b64: Optional[str] = None) -> List[Dict]:
+        """Build chat messages; image_b64 may be raw base64 or an http(s)/data: URL"""
+        messages = [{"role": "system", "content": system_message}]
+        if image_b64:
+            # URLs (e.g. presigned object-store links) go through as-is, skipping a copy of the image
+            if image_b64.startswith(IMAGE_URL_PREFIXES):
+                image_url = image_b64
+            else:
+                image_url = f"data:image/jpeg;base64,{image_b64}"
+            messages.append({
+                "role": "user",
+                "content": [
+                    {"type": "image_url", "image_url": {"url": image_url}},
+                    {"type": "text", "text": prompt}
+                ]
+            })
+        else:
+            messages.append({"role": "user", "content": prompt})
+        return messages
+
+    @staticmethod
+    def _text_digest(text: str) -> str:
+        """Fingerprint of input text for response cache keys"""
+        return hashlib.sha1(text.encode()).hexdigest()
+
+    def _cached_response(self, key: Tuple) -> Optional[str]:
+        """Fresh cached response for key, or None"""
+        entry = self._response_cache.get(key)
+        if entry is None:
+            return None
+        response, expires_at = entry
+        if time.monotonic() >= expires_at:
+            del self._response_cache[key]
+            return None
+        self._response_cache.move_to_end(key)
+        return response
+
+    def _cache_response(self, key: Tuple, response: Optional[str]):
+        """Remember a successful response for RESPONSE_CACHE_TTL seconds"""
+        if not response:
+            return
+        self._response_cache[key] = (response, time.monotonic() + RESPONSE_CACHE_TTL)
+        self._response_cache.move_to_end(key)
+        if len(self._response_cache) > RESPONSE_CACHE_SIZE:
+            self._response_cache.popitem(last=False)
+
+    def _kb_query(self, message: str) -> Tuple[str, ...]:
+        """Query the knowledge base, memoized until the next knowledge base write"""
+        cache_key = (knowledge_base.version, message)
+        with self._kb_lock:
+            cached = self._kb_cache.get(cache_key)
+            if cached is not None:
+                self._kb_cache.move_to_end(cache_key)
+                return cached
+
+        docs = tuple(knowledge_base.query(message))
+        # Empty results may come from a failed embedding call, so only hits are kept
+        if docs:
+            with self._kb_lock:
+                self._kb_cache[cache_key] = docs
+                self._kb_cache.move_to_end(cache_key)
+                if len(self._kb_cache) > KB_CACHE_SIZE:
+                    self._kb_cache.popitem(last=False)
+        return docs
+
     async def _call_ollama_api(self, prompt: str, system_message: str) -> Optional[str]:
-        """Call local Ollama API (Fallback)"""
-        url = f"{settings.OLLAMA_BASE_URL}/api/chat"
+        """Call local Ollama API (Fallback), accumulating the streamed NDJSON reply"""
+        url = f"{self.ollama_base_url}/api/chat"
         payload = {
-            "model": settings.OLLAMA_MODEL,
+            "model": self.ollama_model,
             "messages": [
                 {"role": "system", "content": system_message},
                 {"role": "user", "content": prompt}
             ],
-            "stream": False
+            "stream": True
         }
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(url, json=payload, timeout=60.0)
-                if response.status_code == 200:
-                    data = response.json()
-                    return data.get("message", {}).get("content")
-        except Exception as e:
-            print(f"Ollama API Error: {str(e)}")
+            client = self._http.get()
+            async with client.stream("POST", url, json=payload, timeout=OLLAMA_TIMEOUT) as response:
+                if response.status_code != 200:
+                    return None
+                parts = []
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    content = chunk.get("message", {}).get("content")
+                    if content:
+                        parts.append(content)
+                    if chunk.get("done"):
+                        break
+                return "".join(parts) or None
+        except Exception:
+            logger.warning("Ollama API error", exc_info=True)
             return None
-        return None
+
+    async def _start_hf_stream(self, messages: List[Dict]):
+        """Open a streamed Hugging Face chat completion"""
+        return await self.hf_client.chat_completion(
+            messages=messages,
+            max_tokens=self.max_tokens,
+            temperature=self.temperature,
+            stream=True
+        )
 
     async def _call_huggingface_api(self, prompt: str, system_message: str, image_b64: Optional[str] = None) -> Optional[str]:
-        """Call Hugging Face using AsyncInferenceClient"""
+        """Call Hugging Face chat completion (streamed) using AsyncInferenceClient"""
         if not self.hf_client:
             return None
             
-        messages = [{"role": "system", "content": system_message}]
-        
-        if image_b64:
-            image_data_url = f"data:image/jpeg;base64,{image_b64}"
-            messages.append({
-                "role": "user",
-                "content": [
-                    {"type": "image_url", "image_url": {"url": image_data_url}},
-                    {"type": "text", "text": prompt}
-                ]
-            })
-        else:
-            messages.append({"role": "user", "content": prompt})
+        messages = self._build_messages(prompt, system_message, image_b64)
             
         try:
-            response = await self.hf_client.chat_completion(
-                messages=messages,
-                max_tokens=self.max_tokens,
-                temperature=self.temperature
-            )
-            if response.choices and len(response.choices) > 0:
-                return response.choices[0].message.content
-            return None
-        except Exception as e:
-            print(f"Hugging Face Inference Error: {e}")
+            # Streamed chat completion; tokens are accumulated as they arrive
+            try:
+                stream = await self._start_hf_stream(messages)
+            except HfHubHTTPError as e:
+                # Cold-starting model: wait out the estimate once rather than falling back
+                wait = model_loading_wait(e.response)
+                if wait is None:
+                    raise
+                logger.info("Hugging Face model loading, retrying in %.1fs", wait)
+                await asyncio.sleep(wait)
+                stream = await self._start_hf_stream(messages)
+            parts = []
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    parts.append(chunk.choices[0].delta.content)
+            return "".join(parts) or None
+        except Exception:
+            logger.warning("Hugging Face inference error", exc_info=True)
             return None
 
     async def _call_groq_api(self, prompt: str, system_message: str, image_b64: Optional[str] = None) -> Optional[str]:
@@ -95,49 +291,106 @@ class AIService:
         if not self.groq_client:
             return None
             
-        messages = [{"role": "system", "content": system_message}]
-        
-        if image_b64:
-            # Groq implementation for Llama 3.2 Vision
-            image_data_url = f"data:image/jpeg;base64,{image_b64}"
-            messages.append({
-                "role": "user",
-                "content": [
-                    {"type": "image_url", "image_url": {"url": image_data_url}},
-                    {"type": "text", "text": prompt}
-                ]
-            })
-        else:
-            messages.append({"role": "user", "content": prompt})
+        # Groq implementation for Llama 3.2 Vision shares the HF message format
+        messages = self._build_messages(prompt, system_message, image_b64)
             
         try:
-            response = await self.groq_client.chat.completions.create(
+            # Routes drive coroutines on short-lived event loops; bind the SDK to this loop's pool
+            client = self.groq_client.with_options(http_client=self._groq_http.get())
+            response = await client.chat.completions.create(
                 messages=messages,
                 model=self.groq_model,
                 temperature=self.temperature,
                 max_tokens=self.max_tokens
             )
             return response.choices[0].message.content
-        except Exception as e:
-            print(f"Groq API Error: {e}")
+        except Exception:
+            logger.warning("Groq API error", exc_info=True)
+            return None
+
+    async def _call_with_breaker(self, provider: str, call, *args) -> Optional[str]:
+        """Call a hosted provider with bounded retries, skipping it while its circuit is open"""
+        breaker = self._breakers[provider]
+        if time.monotonic() < breaker["open_until"]:
+            return None
+
+        for attempt in range(PROVIDER_ATTEMPTS):
+            result = await call(*args)
+            if result:
+                breaker["fails"] = 0
+                return result
+            if attempt + 1 < PROVIDER_ATTEMPTS:
+                await asyncio.sleep(PROVIDER_RETRY_BACKOFF * 2 ** attempt)
+
+        breaker["fails"] += 1
+        if breaker["fails"] >= BREAKER_THRESHOLD:
+            breaker["open_until"] = time.monotonic() + BREAKER_COOLDOWN
+            logger.warning("%s failed %d times in a row, skipping it for %.0fs", provider, breaker["fails"], BREAKER_COOLDOWN)
+        return None
+
+    async def _call_groq(self, prompt: str, system_message: str, image_b64: Optional[str] = None) -> Optional[str]:
+        """Groq behind its circuit breaker"""
+        return await self._call_with_breaker("groq", self._call_groq_api, prompt, system_message, image_b64)
+
+    async def _call_huggingface(self, prompt: str, system_message: str, image_b64: Optional[str] = None) -> Optional[str]:
+        """Hugging Face behind its circuit breaker"""
+        return await self._call_with_breaker("huggingface", self._call_huggingface_api, prompt, system_message, image_b64)
+
+    async def _call_hosted_hedged(self, prompt: str, system_message: str, image_b64: Optional[str] = None) -> Optional[str]:
+        """Race Groq and HF, starting HF once Groq fails or exceeds the hedge delay"""
+        calls = []
+        if self.groq_client:
+            calls.append(self._call_groq)
+        if self.hf_client:
+            calls.append(self._call_huggingface)
+
+        loop = asyncio.get_running_loop()
+        pending = set()
+        try:
+            for index, call in enumerate(calls):
+                pending.add(asyncio.create_task(call(prompt, system_message, image_b64)))
+                is_last = index == len(calls) - 1
+                deadline = None if is_last else loop.time() + self.hedge_delay
+
+                while pending:
+                    timeout = None if deadline is None else max(0.0, deadline - loop.time())
+                    done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        if task.result():
+                            return task.result()
+                    # Hedge delay elapsed or a provider failed: bring in the next one
+                    if not is_last:
+                        break
             return None
+        finally:
+            for task in pending:
+                task.cancel()
 
     async def _call_api(self, prompt: str, system_message: str, image_b64: Optional[str] = None) -> Optional[str]:
         """Call the AI API with prioritization: Groq -> HuggingFace -> Ollama"""
         
+        if self.hedge_enabled and self.groq_client and self.hf_client:
+            hosted_response = await self._call_hosted_hedged(prompt, system_message, image_b64)
+            if hosted_response:
+                return hosted_response
+            logger.info("Hosted providers failed, trying Ollama")
+            if not image_b64:
+                return await self._call_ollama_api(prompt, system_message)
+            return None
+
         # Priority 1: Groq (Fastest, Smartest 70B model)
         if self.groq_client:
-            groq_response = await self._call_groq_api(prompt, system_message, image_b64)
+            groq_response = await self._call_groq(prompt, system_message, image_b64)
             if groq_response:
                 return groq_response
-            print("Groq API failed, trying Hugging Face...")
+            logger.info("Groq API failed, trying Hugging Face")
 
         # Priority 2: Hugging Face (Fallback)
         if self.hf_client:
-            hf_response = await self._call_huggingface_api(prompt, system_message, image_b64)
+            hf_response = await self._call_huggingface(prompt, system_message, image_b64)
             if hf_response:
                 return hf_response
-            print("Hugging Face API failed, trying Ollama...")
+            logger.info("Hugging Face API failed, trying Ollama")
             
         # Priority 3: Ollama (Local)
         if not image_b64:
@@ -147,17 +400,15 @@ class AIService:
             
         return None
     
-    async def translate_medical_text(self, medical_text: str, include_medications: bool = True) -> Optional[str]:
-        """Translate medical jargon into layman's terms with medication context"""
+    def build_translation_prompt(self, db: Optional[Session], medical_text: str, include_medications: bool = True) -> Tuple[str, str, List[Dict]]:
+        """System message, prompt and detected medications for a translation request"""
         system_message = "You are a helpful medical translator. Translate medical jargon into simple, patient-friendly language. Do not provide medical advice."
         
         # Add medication context if requested
         medication_context = ""
-        if include_medications:
+        medications_found = []
+        if include_medications and db is not None:
             try:
-                from app.database import get_db
-                from app.services.medication_service import medication_service
-                db = get_db()
                 medications_found = medication_service.get_medication_context(db, medical_text)
                 
                 if medications_found:
@@ -166,17 +417,71 @@ class AIService:
                         medication_context += f"- {med['name']}: {med['uses']}\n"
                         if med['discontinued']:
                             medication_context += f"  WARNING: This medication is DISCONTINUED. {med['discontinuation_reason'] or ''}\n"
-            except Exception as e:
-                print(f"Medication context error: {e}")
+            except Exception:
+                logger.warning("Medication context error", exc_info=True)
         
         prompt = f"Translate and explain this medically:{medication_context}\n\n{medical_text}"
-        return await self._call_api(prompt, system_message)
+        return system_message, prompt, medications_found
+
+    async def translate_medical_text(self, medical_text: str, include_medications: bool = True) -> Optional[str]:
+        """Translate medical jargon into layman's terms with medication context"""
+        cache_key = ("translate", self._text_digest(medical_text), include_medications)
+        cached = self._cached_response(cache_key)
+        if cached is not None:
+            return cached
+        
+        try:
+            db = get_db() if include_medications else None
+        except RuntimeError:
+            # No Flask app context (e.g. scripts): translate without medication context
+            logger.warning("Medication context error", exc_info=True)
+            db = None
+        system_message, prompt, medications_found = self.build_translation_prompt(db, medical_text, include_medications)
+        result = await self._call_api(prompt, system_message)
+        if result is None:
+            return self._fallback_translation(medications_found)
+        self._cache_response(cache_key, result)
+        return result
     
-    async def generate_lifestyle_suggestions(self, medical_condition: str) -> Optional[str]:
+    async def generate_lifestyle_suggestions(self, medical_condition: str) -> str:
         """Generate lifestyle suggestions"""
         system_message = "You are a wellness advisor. Provide general lifestyle tips (diet, sleep, etc) for the condition. DO NOT give medical advice."
+        cache_key = ("suggestions", self._text_digest(medical_condition))
+        cached = self._cached_response(cache_key)
+        if cached is not None:
+            return cached
+
         prompt = f"Suggest lifestyle tips for:\n\n{medical_condition}"
-        return await self._call_api(prompt, system_message)
+        result = await self._call_api(prompt, system_message)
+        if result is None:
+            return self._fallback_suggestions(medical_condition)
+        self._cache_response(cache_key, result)
+        return result
+
+    @staticmethod
+    def _fallback_translation(medications_found: List[Dict]) -> Optional[str]:
+        """Glossary of detected medications when no provider answered (None if nothing found)"""
+        if not medications_found:
+            return None
+        lines = ["AI translation is temporarily unavailable. Medications mentioned in this text:"]
+        for med in medications_found:
+            lines.append(f"- {med['name']}: {med['uses'] or 'No description available'}")
+            if med['discontinued']:
+                lines.append(f"  WARNING: This medication is DISCONTINUED. {med['discontinuation_reason'] or ''}".rstrip())
+        return FallbackText("\n".join(lines))
+
+    @staticmethod
+    def _fallback_suggestions(medical_condition: str) -> str:
+        """Canned lifestyle tips when no provider answered"""
+        condition = medical_condition.lower()
+        tips = []
+        for keyword, tip in FALLBACK_LIFESTYLE_TIPS.items():
+            if keyword in condition and tip not in tips:
+                tips.append(tip)
+        tips.append(FALLBACK_GENERAL_TIPS)
+        lines = ["AI suggestions are temporarily unavailable. General wellness tips:"]
+        lines.extend(f"- {tip}" for tip in tips)
+        return FallbackText("\n".join(lines))
     
     async def chat_with_patient(self, message: str, context: Optional[str] = None) -> Optional[str]:
         """Chat with patient using context and medication knowledge"""
@@ -185,15 +490,15 @@ class AIService:
         # RAG Retrieval
         if not context:
             try:
-                from app.services.knowledge_base import knowledge_base
-                docs = knowledge_base.query(message)
+                # The embedding lookup is blocking, keep it off the event loop
+                loop = asyncio.get_running_loop()
+                docs = await loop.run_in_executor(None, self._kb_query, message)
                 if docs: context = "\n---\n".join(docs)
-            except: pass
+            except Exception:
+                logger.warning("Knowledge base lookup error", exc_info=True)
         
         # Add medication context
         try:
-            from app.database import get_db
-            from app.services.medication_service import medication_service
             db = get_db()
             medications_found = medication_service.get_medication_context(db, message)
             
@@ -207,39 +512,57 @@ class AIService:
                         med_context += f"  ⚠️ DISCONTINUED: {med['discontinuation_reason'] or 'No longer available'}\n"
                 
                 context = (context or "") + med_context
-        except Exception as e:
-            print(f"Medication lookup error in chat: {e}")
+        except Exception:
+            logger.warning("Medication lookup error in chat", exc_info=True)
             
         prompt = f"Context:\n{context}\n\nQuestion: {message}" if context else message
         return await self._call_api(prompt, system_message)
 
-    async def analyze_image(self, image_b64: str, prompt: str = "Describe this medical document") -> Optional[str]:
-        """Analyze a medical image using Hugging Face Vision capability"""
+    async def analyze_image(self, image_b64: Optional[str] = None, prompt: str = "Describe this medical document",
+                            image_url: Optional[str] = None) -> Optional[str]:
+        """Analyze a medical image (base64, or a URL the provider can fetch) using Vision capability"""
         # We reuse the unified API helper which supports images
         system_message = "You are an AI medical imaging assistant. Describe the image in detail. Do not diagnose."
-        return await self._call_api(prompt, system_message, image_b64=image_b64)
+        image = image_url or image_b64
+        if not image:
+            return None
+
+        # Re-analysis of the same image (e.g. follow-up chat turns) skips the API call
+        cache_key = (self._image_digest(image), prompt)
+        cached = self._image_cache.get(cache_key)
+        if cached is not None:
+            self._image_cache.move_to_end(cache_key)
+            return cached
+
+        result = await self._call_api(prompt, system_message, image_b64=image)
+        if result:
+            self._image_cache[cache_key] = result
+            if len(self._image_cache) > IMAGE_CACHE_SIZE:
+                self._image_cache.popitem(last=False)
+        return result
     
     async def analyze_medical_note_with_medications(self, image_b64: str) -> dict:
         """
         Analyze medical note image with OCR and medication detection
         Returns extracted text, medications found, and AI analysis
         """
-        from app.services.ocr_service import ocr_service
-        from app.database import get_db
-        from app.services.medication_service import medication_service
-        
-        # Extract text using OCR
-        extracted_text, confidence = ocr_service.extract_text_from_image(image_b64)
+        # Extract text using OCR (Tesseract blocks, keep it off the event loop)
+        extracted_text, confidence = await asyncio.to_thread(ocr_service.extract_text_from_image, image_b64)
         
-        # Find medications
+        # Find medications; stays on this thread since the request's DB session isn't
+        # thread-safe, and the memoized result is reused by translate_medical_text below
         medications_found = []
         if extracted_text:
             db = get_db()
             medications_found = medication_service.get_medication_context(db, extracted_text)
         
-        # Get AI translation with medication context
+        # Get AI translation with medication context; noise and near-empty reads aren't worth an LLM call
         translation = None
-        if extracted_text:
+        if (
+            extracted_text
+            and confidence >= settings.OCR_MIN_CONFIDENCE
+            and len(extracted_text.strip()) >= OCR_MIN_TEXT_LENGTH
+        ):
             translation = await self.translate_medical_text(extracted_text, include_medications=True)
         
         return {
@@ -251,9 +574,18 @@ class AIService:
 
     async def explain_medical_record(self, record_text: str, record_type: str = "doctor_note") -> dict:
         """Get both translation and suggestions with medication awareness"""
+        # Independent LLM calls: run them concurrently, a failure only blanks its own part
+        translation, suggestions = await asyncio.gather(
+            self.translate_medical_text(record_text, include_medications=True),
+            self.generate_lifestyle_suggestions(record_text),
+            return_exceptions=True
+        )
+        for result in (translation, suggestions):
+            if isinstance(result, Exception):
+                logger.warning("Explain record step failed", exc_info=result)
         return {
-            "translation": await self.translate_medical_text(record_text, include_medications=True),
-            "suggestions": await self.generate_lifestyle_suggestions(record_text)
+            "translation": None if isinstance(translation, Exception) else translation,
+            "suggestions": None if isinstance(suggestions, Exception) else suggestions
         }
 
 
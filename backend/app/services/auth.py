@@ -1,10 +1,32 @@
 # Authentication service for user registration and login
+import hashlib
+import threading
+import time
+from collections import OrderedDict
 from datetime import timedelta
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from app.models import User
 from app.utils.security import verify_password, get_password_hash, create_access_token
 from app.config import settings
 
+# Rapid identical failed logins reuse the previous bcrypt verdict for this long (seconds)
+FAILED_LOGIN_CACHE_TTL = 2.0
+FAILED_LOGIN_CACHE_SIZE = 10000
+
+# sha256(username, stored hash, password) -> expiry of the cached failure
+_failed_logins: "OrderedDict[bytes, float]" = OrderedDict()
+# Request handlers run in threads; eviction between an insert and move_to_end would raise KeyError
+_failed_logins_lock = threading.Lock()
+
+
+def _failed_login_key(username: str, hashed_password: str, password: str) -> bytes:
+    """Cache key that changes whenever the stored hash does (e.g. password reset)"""
+    return hashlib.sha256(
+        b"\0".join((username.encode("utf-8"), hashed_password.encode("utf-8"), password.encode("utf-8")))
+    ).digest()
+
 
 def get_user_by_username(db: Session, username: str) -> User | None:
     """Get user by username"""
@@ -21,22 +43,28 @@ def authenticate_user(db: Session, username: str, password: str) -> User | None:
     user = get_user_by_username(db, username)
     if not user:
         return None
+
+    # Only failures are cached, so this never lets a wrong password through
+    key = _failed_login_key(username, user.hashed_password, password)
+    now = time.monotonic()
+    with _failed_logins_lock:
+        expires_at = _failed_logins.get(key)
+    if expires_at is not None and now < expires_at:
+        return None
+
     if not verify_password(password, user.hashed_password):
+        with _failed_logins_lock:
+            _failed_logins[key] = now + FAILED_LOGIN_CACHE_TTL
+            _failed_logins.move_to_end(key)
+            while len(_failed_logins) > FAILED_LOGIN_CACHE_SIZE:
+                _failed_logins.popitem(last=False)
         return None
     return user
 
 
 def create_user(db: Session, user_data: dict) -> User:
     """Create a new user"""
-    # Check if username already exists
-    if get_user_by_username(db, user_data['username']):
-        raise ValueError("Username already registered")
-    
-    # Check if email already exists
-    if get_user_by_email(db, user_data['email']):
-        raise ValueError("Email already registered")
-    
-    # Create new user
+    # Insert directly and let the unique constraints catch duplicates
     hashed_password = get_password_hash(user_data['password'])
     db_user = User(
         email=user_data['email'],
@@ -45,7 +73,20 @@ def create_user(db: Session, user_data: dict) -> User:
         full_name=user_data.get('full_name')
     )
     db.add(db_user)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        # One lookup to report which field collided (username wins, as before)
+        existing = db.query(User.username).filter(or_(
+            User.username == user_data['username'],
+            User.email == user_data['email']
+        )).all()
+        if any(row.username == user_data['username'] for row in existing):
+            raise ValueError("Username already registered")
+        if existing:
+            raise ValueError("Email already registered")
+        raise
     db.refresh(db_user)
     return db_user
 
@@ -1,55 +1,256 @@
 
 import os
 import json
+import atexit
+import base64
+import logging
+import time
+import asyncio
 import numpy as np
 import httpx
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple, Union
 from app.config import settings
+from app.utils.http import AsyncClientPool, encode_json_body, model_loading_wait
+
+logger = logging.getLogger(__name__)
+
+# Optional: faster JSON encode/decode for the knowledge base files
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+    orjson = None
+
+
+def _json_dumps(obj) -> bytes:
+    """Serialize to UTF-8 JSON bytes"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode("utf-8")
+
+
+def _json_loads(data: bytes):
+    """Parse JSON from bytes or str"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+# Separate connect timeout so an unreachable embedding host fails in seconds
+EMBEDDING_TIMEOUT = httpx.Timeout(10.0, connect=2.0)
+
+EMBEDDING_MODEL_ID = "sentence-transformers/all-MiniLM-L6-v2"
+EMBEDDING_API_URL = f"https://api-inference.huggingface.co/pipeline/feature-extraction/{EMBEDDING_MODEL_ID}"
+
+# Texts sent per feature-extraction request when adding records in bulk
+EMBEDDING_BATCH_SIZE = 32
+
+# Appended records allowed in the log before it is folded into the snapshot files
+LOG_COMPACT_THRESHOLD = 256
 
 class KnowledgeBase:
-    """Lightweight RAG Service using JSON storage and HF API for embeddings"""
+    """Lightweight RAG Service using JSON + float16 .npy storage and HF API for embeddings"""
     
     def __init__(self):
         self.file_path = os.path.join(os.getcwd(), "knowledge_base.json")
         self.data: List[Dict] = []
+        # Bumped on every write so callers can invalidate cached query results
+        self.version = 0
+        # Keep-alive clients so repeat embedding calls skip the TCP/TLS handshake
+        self._sync_http = httpx.Client(
+            timeout=EMBEDDING_TIMEOUT,
+            limits=httpx.Limits(max_keepalive_connections=10)
+        )
+        self._async_http = AsyncClientPool(timeout=EMBEDDING_TIMEOUT)
+        atexit.register(self.close)
+        # Row-normalized float32 embeddings, row i belongs to self.data[i]
+        self._emb_matrix = np.empty((0, 0), dtype=np.float32)
+        # Records appended to the log since the last snapshot
+        self._log_count = 0
+        # Set when records loaded but their embeddings didn't; writes are refused so nothing is lost
+        self._embeddings_missing = False
         self._load_data()
+
+    def close(self):
+        """Release pooled HTTP connections"""
+        self._sync_http.close()
+        self._async_http.close()
+
+    @property
+    def embeddings_path(self) -> str:
+        """Binary sidecar holding the embedding matrix as float16"""
+        return os.path.splitext(self.file_path)[0] + ".npy"
+
+    @property
+    def log_path(self) -> str:
+        """Append-only JSONL of records added since the last snapshot"""
+        return os.path.splitext(self.file_path)[0] + ".log.jsonl"
         
     def _load_data(self):
         if os.path.exists(self.file_path):
             try:
-                with open(self.file_path, 'r') as f:
-                    self.data = json.load(f)
+                with open(self.file_path, 'rb') as f:
+                    self.data = _json_loads(f.read())
             except Exception:
                 self.data = []
         else:
             self.data = []
 
+        if any("embedding" in item for item in self.data):
+            # Legacy format with embeddings inlined as JSON floats: migrate once
+            self.data = [item for item in self.data if "embedding" in item]
+            matrix = np.asarray([item.pop("embedding") for item in self.data], dtype=np.float32)
+            self._emb_matrix = self._normalize_rows(matrix)
+            self._save_data()
+        elif self.data:
+            try:
+                self._emb_matrix = np.load(self.embeddings_path).astype(np.float32)
+            except Exception:
+                # Clearing the records here would let the next save overwrite the JSON with nothing
+                logger.error(
+                    "Knowledge base embeddings %s are missing or unreadable; keeping %d records "
+                    "but refusing writes until they are re-embedded",
+                    self.embeddings_path, len(self.data), exc_info=True
+                )
+                self._embeddings_missing = True
+                return
+            # An interrupted save can leave the two files out of step
+            count = min(len(self.data), len(self._emb_matrix))
+            self.data = self.data[:count]
+            self._emb_matrix = self._emb_matrix[:count]
+
+        try:
+            self._replay_log()
+        except Exception:
+            logger.warning("Ignoring unreadable knowledge base log", exc_info=True)
+        if self._log_count >= LOG_COMPACT_THRESHOLD:
+            self._save_data()
+
+    def _replay_log(self):
+        """Apply records appended after the snapshot was written"""
+        self._log_count = 0
+        if not os.path.exists(self.log_path):
+            return
+        entries, rows = [], []
+        with open(self.log_path, 'rb') as f:
+            for line in f:
+                try:
+                    entry = _json_loads(line)
+                    row = np.frombuffer(base64.b64decode(entry.pop("embedding")), dtype=np.float16)
+                except Exception:
+                    # A crash mid-append leaves a partial last line
+                    break
+                # Entries already folded into the snapshot are skipped by position
+                seq = entry.pop("seq")
+                if seq < len(self.data) + len(entries):
+                    continue
+                if seq > len(self.data) + len(entries):
+                    break
+                entries.append(entry)
+                rows.append(row)
+        if entries:
+            self._append_to_matrix(rows)
+            self.data.extend(entries)
+            self._log_count = len(entries)
+
+    @staticmethod
+    def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+        """Scale rows to unit length in place; zero rows stay zero (score 0)"""
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        matrix /= norms
+        return matrix
+
+    def _append_to_matrix(self, embeddings: List[List[float]]):
+        """Add normalized rows without rebuilding the whole matrix"""
+        rows = self._normalize_rows(np.asarray(embeddings, dtype=np.float32))
+        if self._emb_matrix.size:
+            self._emb_matrix = np.vstack([self._emb_matrix, rows])
+        else:
+            self._emb_matrix = rows
+
+    def _check_writable(self):
+        """Refuse writes that would replace records whose embeddings failed to load"""
+        if self._embeddings_missing:
+            raise RuntimeError("Knowledge base embeddings are missing; refusing to overwrite the stored records")
+
     def _save_data(self):
-        with open(self.file_path, 'w') as f:
-            json.dump(self.data, f)
+        """Write a full snapshot (compaction) and discard the append log"""
+        self._check_writable()
+        # Unit-length rows lose nothing meaningful for cosine ranking in float16
+        tmp_embeddings = self.embeddings_path + ".tmp"
+        with open(tmp_embeddings, 'wb') as f:
+            np.save(f, self._emb_matrix.astype(np.float16))
+        tmp_data = self.file_path + ".tmp"
+        with open(tmp_data, 'wb') as f:
+            f.write(_json_dumps(self.data))
+        os.replace(tmp_embeddings, self.embeddings_path)
+        os.replace(tmp_data, self.file_path)
+        if os.path.exists(self.log_path):
+            os.remove(self.log_path)
+        self._log_count = 0
+
+    def _append_records(self, records: List[Dict], embeddings):
+        """Add records in memory and persist them with an O(1) log append"""
+        self._check_writable()
+        rows = self._normalize_rows(np.asarray(embeddings, dtype=np.float32))
+        if self._emb_matrix.size and rows.shape[1] != self._emb_matrix.shape[1]:
+            raise ValueError(f"Embedding dimension {rows.shape[1]} does not match {self._emb_matrix.shape[1]}")
+
+        # Log first so a failed write leaves memory and disk in agreement
+        start = len(self.data)
+        with open(self.log_path, 'ab') as f:
+            for offset, (record, row) in enumerate(zip(records, rows.astype(np.float16))):
+                entry = {**record, "seq": start + offset, "embedding": base64.b64encode(row.tobytes()).decode()}
+                f.write(_json_dumps(entry) + b"\n")
+        self.data.extend(records)
+        self._append_to_matrix(rows)
+        self._log_count += len(records)
+        if self._log_count >= LOG_COMPACT_THRESHOLD:
+            self._save_data()
             
+    @staticmethod
+    def _encode_request(inputs: Union[str, List[str]]):
+        """Build the (possibly gzipped) embedding request body and headers"""
+        return encode_json_body(
+            {"inputs": inputs},
+            {"Authorization": f"Bearer {settings.HUGGINGFACE_API_KEY}"}
+        )
+
+    def _post_embedding_request(self, body: bytes, headers: Dict[str, str]) -> httpx.Response:
+        """POST an embedding request, retrying once if the model is still loading"""
+        response = self._sync_http.post(EMBEDDING_API_URL, headers=headers, content=body)
+        wait = model_loading_wait(response)
+        if wait is not None:
+            time.sleep(wait)
+            response = self._sync_http.post(EMBEDDING_API_URL, headers=headers, content=body)
+        return response
+
     async def _get_embedding(self, text: str) -> Optional[List[float]]:
         """Get embedding from Hugging Face API"""
         if not settings.HUGGINGFACE_API_KEY:
             return None
             
-        model_id = "sentence-transformers/all-MiniLM-L6-v2"
-        api_url = f"https://api-inference.huggingface.co/pipeline/feature-extraction/{model_id}"
-        headers = {"Authorization": f"Bearer {settings.HUGGINGFACE_API_KEY}"}
+        body, headers = self._encode_request(text)
         
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(api_url, headers=headers, json={"inputs": text})
-                if response.status_code == 200:
-                    result = response.json()
-                    # Handle different return formats (sometimes list of list, sometimes list)
-                    if isinstance(result, list):
-                        if isinstance(result[0], list):
-                            return result[0] # Batched return
-                        return result
-                return None
-        except Exception as e:
-            print(f"Embedding API Error: {e}")
+            client = self._async_http.get()
+            response = await client.post(EMBEDDING_API_URL, headers=headers, content=body)
+            # Cold-starting model: wait out the estimate once instead of failing
+            wait = model_loading_wait(response)
+            if wait is not None:
+                await asyncio.sleep(wait)
+                response = await client.post(EMBEDDING_API_URL, headers=headers, content=body)
+            if response.status_code == 200:
+                result = response.json()
+                # Handle different return formats (sometimes list of list, sometimes list)
+                if isinstance(result, list):
+                    if isinstance(result[0], list):
+                        return result[0] # Batched return
+                    return result
+            return None
+        except Exception:
+            logger.warning("Embedding API error", exc_info=True)
             return None
             
     def add_record(self, record_id: str, text: str, meta: dict = None):
@@ -60,46 +261,71 @@ class KnowledgeBase:
         
         # Let's use a sync storage for now, and maybe background the embedding?
         # Or just use sync requests/httpx
-        import requests
         
         if not settings.HUGGINGFACE_API_KEY:
              return
 
-        model_id = "sentence-transformers/all-MiniLM-L6-v2"
-        api_url = f"https://api-inference.huggingface.co/pipeline/feature-extraction/{model_id}"
-        headers = {"Authorization": f"Bearer {settings.HUGGINGFACE_API_KEY}"}
+        body, headers = self._encode_request(text)
         
         try:
-            response = requests.post(api_url, headers=headers, json={"inputs": text}, timeout=10)
+            response = self._post_embedding_request(body, headers)
             if response.status_code == 200:
                 embedding = response.json()
                 if isinstance(embedding, list) and isinstance(embedding[0], list):
                     embedding = embedding[0]
                 
-                self.data.append({
+                self._append_records([{
                     "id": str(record_id),
                     "text": text,
-                    "meta": meta or {},
-                    "embedding": embedding
-                })
-                self._save_data()
-        except Exception as e:
-            print(f"Failed to add record to KB: {e}")
+                    "meta": meta or {}
+                }], [embedding])
+                self.version += 1
+        except Exception:
+            logger.warning("Failed to add record to KB", exc_info=True)
+
+    def add_records_bulk(self, records: List[Tuple[str, str, Optional[dict]]]):
+        """Add many (record_id, text, meta) records using batched embedding requests"""
+        if not settings.HUGGINGFACE_API_KEY or not records:
+            return
+
+        added = 0
+        for start in range(0, len(records), EMBEDDING_BATCH_SIZE):
+            batch = records[start:start + EMBEDDING_BATCH_SIZE]
+            body, headers = self._encode_request([text for _, text, _ in batch])
+            try:
+                response = self._post_embedding_request(body, headers)
+                if response.status_code != 200:
+                    logger.warning("Failed to add records to KB: HTTP %s", response.status_code)
+                    continue
+                embeddings = np.asarray(response.json(), dtype=np.float32)
+
+                # One pooled vector per input is expected; anything else is unusable
+                if embeddings.ndim != 2 or len(embeddings) != len(batch):
+                    logger.warning("Failed to add records to KB: unexpected embedding shape %s", embeddings.shape)
+                    continue
+
+                self._append_records([
+                    {"id": str(record_id), "text": text, "meta": meta or {}}
+                    for record_id, text, meta in batch
+                ], embeddings)
+                added += len(batch)
+            except Exception:
+                logger.warning("Failed to add records to KB", exc_info=True)
+
+        if added:
+            self.version += 1
 
     def query(self, query_text: str, n_results: int = 3) -> List[str]:
         """Find relevant records using cosine similarity"""
-        import requests
         if not settings.HUGGINGFACE_API_KEY:
             return []
             
         # Get query embedding
-        model_id = "sentence-transformers/all-MiniLM-L6-v2"
-        api_url = f"https://api-inference.huggingface.co/pipeline/feature-extraction/{model_id}"
-        headers = {"Authorization": f"Bearer {settings.HUGGINGFACE_API_KEY}"}
+        body, headers = self._encode_request(query_text)
         
         query_embedding = None
         try:
-            response = requests.post(api_url, headers=headers, json={"inputs": query_text}, timeout=10)
+            response = self._post_embedding_request(body, headers)
             if response.status_code == 200:
                 query_embedding = response.json()
                 if isinstance(query_embedding, list) and isinstance(query_embedding[0], list):
@@ -107,30 +333,24 @@ class KnowledgeBase:
         except Exception:
             return []
             
-        if not query_embedding or not self.data:
+        if not query_embedding or not self.data or self._embeddings_missing:
             return []
             
-        # Calculate Cosine Similarities
-        q_vec = np.array(query_embedding)
+        # Cosine similarity against every record in one matrix-vector product
+        q_vec = np.asarray(query_embedding, dtype=np.float32)
         norm_q = np.linalg.norm(q_vec)
-        
-        scores = []
-        for item in self.data:
-            if "embedding" not in item:
-                continue
-            d_vec = np.array(item["embedding"])
-            norm_d = np.linalg.norm(d_vec)
-            
-            if norm_q == 0 or norm_d == 0:
-                score = 0
-            else:
-                score = np.dot(q_vec, d_vec) / (norm_q * norm_d)
-            
-            scores.append((score, item["text"]))
+        if norm_q == 0:
+            scores = np.zeros(len(self.data), dtype=np.float32)
+        else:
+            scores = self._emb_matrix @ (q_vec / norm_q)
             
-        # Sort and return top N
-        scores.sort(key=lambda x: x[0], reverse=True)
-        return [text for score, text in scores[:n_results]]
+        # Top N by score without fully sorting every record
+        k = min(n_results, len(scores))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+        top = top[np.lexsort((top, -scores[top]))]
+        return [self.data[i]["text"] for i in top]
 
 # Singleton
 knowledge_base = KnowledgeBase()
@@ -1,14 +1,138 @@
 # Medication Service for database queries and medication knowledge
-from typing import Optional, List, Dict
+from collections import OrderedDict
+from typing import Optional, List, Dict, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import or_, func
+from sqlalchemy import or_, func, insert, update
 from app.models.medication import Medication
+from app.services.knowledge_base import knowledge_base
 import re
 
+# Optional: linear-time multi-name matching; falls back to regex when missing
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+    ahocorasick = None
+
+# Names per combined regex when pyahocorasick is unavailable (bounds alternation cost)
+REGEX_CHUNK_SIZE = 1000
+
+# Distinct texts whose medication matches are remembered between table changes
+CONTEXT_CACHE_SIZE = 512
+
+# Writable medication columns accepted by bulk_create_medications
+MEDICATION_FIELDS = ('name', 'url', 'uses', 'side_effects', 'discontinued', 'discontinuation_reason')
+# Names per IN lookup (stays under SQLite's bound variable limit) and rows per bulk write
+BULK_LOOKUP_CHUNK_SIZE = 500
+BULK_WRITE_BATCH_SIZE = 1000
+
+
+def _is_word_char(ch: str) -> bool:
+    """Match the regex \\w definition used for word boundaries"""
+    return ch.isalnum() or ch == '_'
+
+
+def _is_boundary(text: str, index: int) -> bool:
+    """True if a regex \\b boundary sits before text[index]"""
+    before = index > 0 and _is_word_char(text[index - 1])
+    after = index < len(text) and _is_word_char(text[index])
+    return before != after
+
 
 class MedicationService:
     """Service for medication data operations"""
     
+    def __init__(self):
+        # In-memory name matcher, rebuilt when the medications table changes
+        self._matcher_signature: Optional[Tuple] = None
+        self._meds_by_name: Dict[str, List[Tuple[int, Dict]]] = {}
+        self._automaton = None
+        # Regex fallback: combined patterns plus, per name, the other names that prefix it
+        self._name_patterns: List["re.Pattern"] = []
+        self._name_prefixes: Dict[str, List[str]] = {}
+        # get_medication_context results by text, valid for the current matcher only
+        self._context_cache: "OrderedDict[str, List[Tuple[int, Dict]]]" = OrderedDict()
+
+    def invalidate_matcher(self):
+        """Force the medication name matcher to rebuild on next use"""
+        self._matcher_signature = None
+
+    def _table_signature(self, db: Session) -> Tuple:
+        """Cheap fingerprint of the medications table (catches writes made outside this service)"""
+        # created_at catches a deleted top row whose id SQLite hands to the next insert
+        return tuple(db.query(
+            func.count(Medication.id),
+            func.max(Medication.id),
+            func.max(Medication.created_at),
+            func.max(Medication.updated_at)
+        ).one())
+
+    def _refresh_matcher(self, db: Session):
+        """Rebuild the name -> medication map (and automaton) if the table changed"""
+        signature = self._table_signature(db)
+        if signature == self._matcher_signature:
+            return
+
+        meds_by_name: Dict[str, List[Tuple[int, Dict]]] = {}
+        for med in db.query(Medication).order_by(Medication.id).all():
+            meds_by_name.setdefault(med.name.lower(), []).append((med.id, {
+                'name': med.name,
+                'uses': med.uses,
+                'side_effects': med.side_effects,
+                'discontinued': med.discontinued,
+                'discontinuation_reason': med.discontinuation_reason,
+                'warning': 'DISCONTINUED' if med.discontinued else None
+            }))
+
+        automaton = None
+        name_patterns: List["re.Pattern"] = []
+        name_prefixes: Dict[str, List[str]] = {}
+        if AHOCORASICK_AVAILABLE and meds_by_name:
+            automaton = ahocorasick.Automaton()
+            for name in meds_by_name:
+                automaton.add_word(name, name)
+            automaton.make_automaton()
+        elif meds_by_name:
+            # Longest first, so each match is the longest name starting at that position;
+            # shorter names matching there are necessarily its prefixes
+            names = sorted(meds_by_name, key=len, reverse=True)
+            for start in range(0, len(names), REGEX_CHUNK_SIZE):
+                chunk = names[start:start + REGEX_CHUNK_SIZE]
+                # Zero-width lookahead so overlapping mentions are all visited
+                name_patterns.append(re.compile(r'(?=\b(' + '|'.join(map(re.escape, chunk)) + r')\b)'))
+            for name in names:
+                prefixes = [name[:i] for i in range(1, len(name)) if name[:i] in meds_by_name]
+                if prefixes:
+                    name_prefixes[name] = prefixes
+
+        self._meds_by_name = meds_by_name
+        self._automaton = automaton
+        self._name_patterns = name_patterns
+        self._name_prefixes = name_prefixes
+        self._matcher_signature = signature
+        self._context_cache.clear()
+
+    def _match_names(self, text_lower: str) -> set:
+        """Lower-cased medication names occurring in text on word boundaries"""
+        if self._automaton is not None:
+            matched = set()
+            for end, name in self._automaton.iter(text_lower):
+                start = end - len(name) + 1
+                if _is_boundary(text_lower, start) and _is_boundary(text_lower, end + 1):
+                    matched.add(name)
+            return matched
+
+        matched = set()
+        for pattern in self._name_patterns:
+            for match in pattern.finditer(text_lower):
+                name = match.group(1)
+                matched.add(name)
+                for prefix in self._name_prefixes.get(name, ()):
+                    if _is_boundary(text_lower, match.start() + len(prefix)):
+                        matched.add(prefix)
+        return matched
+
     def search_medications(
         self, 
         db: Session, 
@@ -108,27 +232,23 @@ class MedicationService:
         Returns:
             List of dictionaries with medication information
         """
-        # Get all medications from database
-        all_medications = db.query(Medication).all()
-        
-        found_medications = []
-        text_lower = text.lower()
-        
-        for med in all_medications:
-            # Check if medication name appears in text
-            # Use word boundaries to avoid partial matches
-            pattern = r'\b' + re.escape(med.name.lower()) + r'\b'
-            if re.search(pattern, text_lower):
-                found_medications.append({
-                    'name': med.name,
-                    'uses': med.uses,
-                    'side_effects': med.side_effects,
-                    'discontinued': med.discontinued,
-                    'discontinuation_reason': med.discontinuation_reason,
-                    'warning': 'DISCONTINUED' if med.discontinued else None
-                })
-        
-        return found_medications
+        self._refresh_matcher(db)
+        if not self._meds_by_name:
+            return []
+
+        # Translate and chat often scan the same text more than once per request
+        hits = self._context_cache.get(text)
+        if hits is None:
+            matched = self._match_names(text.lower())
+            hits = [entry for name in matched for entry in self._meds_by_name[name]]
+            # Preserve table order, as the previous per-row scan did
+            hits.sort(key=lambda entry: entry[0])
+            self._context_cache[text] = hits
+            if len(self._context_cache) > CONTEXT_CACHE_SIZE:
+                self._context_cache.popitem(last=False)
+        else:
+            self._context_cache.move_to_end(text)
+        return [dict(info) for _, info in hits]
     
     def create_medication(self, db: Session, medication_data: Dict) -> Medication:
         """
@@ -145,6 +265,7 @@ class MedicationService:
         db.add(medication)
         db.commit()
         db.refresh(medication)
+        self.invalidate_matcher()
         return medication
     
     def update_medication(self, db: Session, medication_id: int, update_data: Dict) -> Optional[Medication]:
@@ -171,6 +292,7 @@ class MedicationService:
         
         db.commit()
         db.refresh(medication)
+        self.invalidate_matcher()
         return medication
     
     def bulk_create_medications(self, db: Session, medications_data: List[Dict], update_existing: bool = True) -> Dict[str, int]:
@@ -189,36 +311,89 @@ class MedicationService:
         updated_count = 0
         skipped_count = 0
         
+        # Existing rows for every incoming name, fetched in a few IN queries
+        existing_by_name: Dict[str, Medication] = {}
+        lower_names = list({med_data['name'].lower() for med_data in medications_data})
+        for start in range(0, len(lower_names), BULK_LOOKUP_CHUNK_SIZE):
+            chunk = lower_names[start:start + BULK_LOOKUP_CHUNK_SIZE]
+            for med in db.query(Medication).filter(func.lower(Medication.name).in_(chunk)).all():
+                existing_by_name.setdefault(med.name.lower(), med)
+        
+        new_rows: Dict[str, Dict] = {}
+        update_rows: Dict[int, Dict] = {}
         for med_data in medications_data:
-            # Check if medication already exists
-            existing = self.get_medication_by_name(db, med_data['name'])
+            key = med_data['name'].lower()
+            fields = {k: v for k, v in med_data.items() if k in MEDICATION_FIELDS and k != 'name'}
             
+            pending = new_rows.get(key)
+            if pending is not None:
+                # Repeated name in this call: later data wins, as it would row by row
+                if update_existing and any(
+                    (v or pending.get(k)) and v != pending.get(k) for k, v in fields.items()
+                ):
+                    pending.update(fields)
+                    pending['discontinued'] = bool(pending['discontinued'])
+                    updated_count += 1
+                else:
+                    skipped_count += 1
+                continue
+            
+            existing = existing_by_name.get(key)
             if existing and update_existing:
-                # Check if any field has changed
+                # Compare against the row plus any update already queued for it
+                current = update_rows.get(existing.id, {})
                 has_changes = False
-                for field, new_value in med_data.items():
-                    if field in ['name', 'id']:
-                        continue
-                    old_value = getattr(existing, field, None)
+                for field, new_value in fields.items():
+                    old_value = current.get(field, getattr(existing, field, None))
                     # Compare, treating None and empty string as equivalent
                     if (new_value or old_value) and new_value != old_value:
                         has_changes = True
                         break
                 
                 if has_changes:
-                    # Update existing medication
-                    update_data = {k: v for k, v in med_data.items() if k not in ['name', 'id']}
-                    if self.update_medication(db, existing.id, update_data):
-                        updated_count += 1
+                    update_rows.setdefault(existing.id, {'id': existing.id}).update(fields)
+                    updated_count += 1
                 else:
                     skipped_count += 1
             elif existing:
                 skipped_count += 1
             else:
-                # Create new medication
-                medication = self.create_medication(db, med_data)
-                if medication:
-                    created_count += 1
+                row = {field: None for field in MEDICATION_FIELDS}
+                row.update(fields)
+                row['name'] = med_data['name']
+                row['discontinued'] = bool(row['discontinued'])
+                new_rows[key] = row
+                created_count += 1
+        
+        # Multi-row INSERTs and executemany UPDATEs instead of a commit per medication
+        inserts = list(new_rows.values())
+        for start in range(0, len(inserts), BULK_WRITE_BATCH_SIZE):
+            db.execute(insert(Medication), inserts[start:start + BULK_WRITE_BATCH_SIZE])
+        
+        # Bulk UPDATE by primary key needs the same columns in every row of a statement
+        updates_by_columns: Dict[Tuple, List[Dict]] = {}
+        for row in update_rows.values():
+            updates_by_columns.setdefault(tuple(sorted(row)), []).append(row)
+        for rows in updates_by_columns.values():
+            for start in range(0, len(rows), BULK_WRITE_BATCH_SIZE):
+                db.execute(update(Medication), rows[start:start + BULK_WRITE_BATCH_SIZE])
+        
+        db.commit()
+        if inserts or update_rows:
+            self.invalidate_matcher()
+        
+        # Make new medications retrievable by chat in as few embedding requests as possible
+        if inserts:
+            created = []
+            names = [row['name'] for row in inserts]
+            for start in range(0, len(names), BULK_LOOKUP_CHUNK_SIZE):
+                created.extend(db.query(Medication.id, Medication.name, Medication.uses).filter(
+                    Medication.name.in_(names[start:start + BULK_LOOKUP_CHUNK_SIZE])
+                ).all())
+            knowledge_base.add_records_bulk([
+                (f"medication-{med.id}", f"{med.name}: {med.uses}" if med.uses else med.name, {"type": "medication"})
+                for med in created
+            ])
         
         return {
             'created': created_count,
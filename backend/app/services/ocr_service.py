@@ -1,9 +1,19 @@
 # OCR Service for extracting text from medical images
 import base64
+import hashlib
 import io
-from typing import Optional, Dict, Tuple
+import logging
+import os
+import queue
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, List, Tuple
 from PIL import Image, ImageEnhance, ImageFilter
 import numpy as np
+from app.config import settings
+
+logger = logging.getLogger(__name__)
 
 # Placeholder for pytesseract - will be imported after package installation
 try:
@@ -13,39 +23,308 @@ except ImportError:
     TESSERACT_AVAILABLE = False
     pytesseract = None
 
+# In-process libtesseract binding: no subprocess or temp files, and the model stays loaded
+try:
+    from tesserocr import PyTessBaseAPI, PSM, OEM, RIL, iterate_level
+    TESSEROCR_AVAILABLE = True
+except ImportError:
+    TESSEROCR_AVAILABLE = False
+
+# OpenCV fuses preprocessing into two native passes; PIL pipeline is the fallback
+try:
+    import cv2
+    CV2_AVAILABLE = True
+except ImportError:
+    CV2_AVAILABLE = False
+    cv2 = None
+
+# Without OpenCV, a Numba-compiled kernel still keeps preprocessing native
+NUMBA_AVAILABLE = False
+fused_preprocess = None
+if not CV2_AVAILABLE:
+    try:
+        from app.services.ocr_kernels import fused_preprocess
+        NUMBA_AVAILABLE = True
+    except ImportError:
+        pass
+
+# Contrast factor applied around the image mean (same as ImageEnhance.Contrast)
+CONTRAST_FACTOR = 2.0
+
+# PIL counterpart of the OpenCV sharpen kernel
+SHARPEN_FILTER = ImageFilter.Kernel((3, 3), [0, -1, 0, -1, 5, -1, 0, -1, 0], scale=1)
+
+# Tesseract reads best around 300 DPI (~2000 px on the long side of a page); pixels beyond
+# that cost decode and preprocessing time without improving recognition
+OCR_MAX_SIDE = 2048
+# Non-JPEG images are only resized when clearly oversized, since that means a full decode
+OCR_RESIZE_THRESHOLD = 2500
+
+# Pages taller than this are OCRed as overlapping full-width bands; Tesseract's layout
+# analysis slows down and loses accuracy on very large pages
+OCR_TILE_MAX_SIDE = 1800
+OCR_TILE_OVERLAP = 48
+
+# Results kept per distinct image (keyed by a hash of the decoded bytes)
+OCR_CACHE_SIZE = 512
+
 
 class OCRService:
     """Service for OCR text extraction from medical images"""
     
     def __init__(self):
-        self.tesseract_available = TESSERACT_AVAILABLE
+        self.tesseract_available = TESSERACT_AVAILABLE or TESSEROCR_AVAILABLE
+        # Tesseract's OpenMP threading scales poorly; run each process single-threaded and get
+        # parallelism from extract_batch/tiling instead (inherited by every pytesseract subprocess)
+        os.environ.setdefault("OMP_THREAD_LIMIT", "1")
         if not self.tesseract_available:
             print("Warning: pytesseract not installed. OCR features will be limited.")
+        # Re-uploads of the same sheet skip Tesseract entirely; calls may come from worker threads
+        self._ocr_cache: "OrderedDict[str, Tuple[str, float, Dict]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        # PyTessBaseAPI isn't thread-safe; each OCR call borrows an idle instance or creates one
+        self._tess_apis: "queue.SimpleQueue" = queue.SimpleQueue()
+    
+    def _tesserocr_data(self, image: Image.Image) -> Dict:
+        """Word-level OCR via tesserocr, shaped like pytesseract's image_to_data dict"""
+        try:
+            api = self._tess_apis.get_nowait()
+        except queue.Empty:
+            api = PyTessBaseAPI(psm=PSM.AUTO, oem=OEM.DEFAULT)
+        
+        data = {key: [] for key in ('text', 'conf', 'left', 'top', 'width', 'height',
+                                    'block_num', 'par_num', 'line_num')}
+        try:
+            api.SetImage(image)
+            api.Recognize()
+            iterator = api.GetIterator()
+            block_num = par_num = line_num = 0
+            for word in (iterate_level(iterator, RIL.WORD) if iterator else []):
+                if word.IsAtBeginningOf(RIL.BLOCK):
+                    block_num += 1
+                    par_num = line_num = 0
+                if word.IsAtBeginningOf(RIL.PARA):
+                    par_num += 1
+                    line_num = 0
+                if word.IsAtBeginningOf(RIL.TEXTLINE):
+                    line_num += 1
+                
+                box = word.BoundingBox(RIL.WORD)
+                if box is None:
+                    continue
+                left, top, right, bottom = box
+                data['text'].append(word.GetUTF8Text(RIL.WORD) or '')
+                data['conf'].append(word.Confidence(RIL.WORD))
+                data['left'].append(left)
+                data['top'].append(top)
+                data['width'].append(right - left)
+                data['height'].append(bottom - top)
+                data['block_num'].append(block_num)
+                data['par_num'].append(par_num)
+                data['line_num'].append(line_num)
+        finally:
+            api.Clear()
+            self._tess_apis.put(api)
+        return data
+    
+    def _image_key(self, image_bytes: bytes) -> str:
+        """Hash decoded bytes so base64 whitespace/padding variants share an entry"""
+        return hashlib.blake2b(image_bytes, digest_size=16).hexdigest()
+    
+    def _cache_get(self, cache: OrderedDict, key: str):
+        with self._cache_lock:
+            value = cache.get(key)
+            if value is not None:
+                cache.move_to_end(key)
+            return value
+    
+    def _cache_put(self, cache: OrderedDict, key: str, value) -> None:
+        with self._cache_lock:
+            cache[key] = value
+            cache.move_to_end(key)
+            if len(cache) > OCR_CACHE_SIZE:
+                cache.popitem(last=False)
+    
+    # 3x3 sharpen kernel with the contrast stretch folded in, so one filter2D does both
+    SHARPEN_CONTRAST_KERNEL = np.array(
+        [[0, -1, 0], [-1, 5, -1], [0, -1, 0]], dtype=np.float32
+    ) * CONTRAST_FACTOR
     
     def preprocess_image(self, image: Image.Image) -> Image.Image:
         """
         Preprocess image for better OCR accuracy
         - Convert to grayscale
-        - Enhance contrast
         - Remove noise
         - Sharpen
+        - Enhance contrast
         """
+        if NUMBA_AVAILABLE:
+            gray = np.ascontiguousarray(image if image.mode == 'L' else image.convert('L'))
+            return Image.fromarray(fused_preprocess(gray, CONTRAST_FACTOR, float(gray.mean())))
+        if not CV2_AVAILABLE:
+            return self._preprocess_image_pil(image)
+        
+        # Convert to grayscale (same luminosity weights as PIL's 'L' mode)
+        if image.mode == 'RGB':
+            gray = cv2.cvtColor(np.asarray(image), cv2.COLOR_RGB2GRAY)
+        else:
+            gray = np.asarray(image if image.mode == 'L' else image.convert('L'))
+        
+        # Median first so sharpening doesn't amplify the noise
+        denoised = cv2.medianBlur(gray, 3)
+        
+        # out = mean + factor * (sharpen(p) - mean), saturated to 0-255
+        mean = float(cv2.mean(gray)[0])
+        processed = cv2.filter2D(
+            denoised, -1, self.SHARPEN_CONTRAST_KERNEL,
+            delta=mean * (1.0 - CONTRAST_FACTOR),
+            borderType=cv2.BORDER_REPLICATE
+        )
+        
+        return Image.fromarray(processed)
+    
+    def _preprocess_image_pil(self, image: Image.Image) -> Image.Image:
+        """Pure PIL preprocessing used when neither OpenCV nor Numba is installed"""
         # Convert to grayscale
         if image.mode != 'L':
             image = image.convert('L')
         
+        # Same order and sharpen kernel as the OpenCV/Numba paths, so every backend feeds
+        # Tesseract comparable images: median first so sharpening doesn't amplify the noise
+        image = image.filter(ImageFilter.MedianFilter(size=3))
+        
+        # Sharpen
+        image = image.filter(SHARPEN_FILTER)
+        
         # Enhance contrast
         enhancer = ImageEnhance.Contrast(image)
-        image = enhancer.enhance(2.0)
+        image = enhancer.enhance(CONTRAST_FACTOR)
         
-        # Sharpen
-        image = image.filter(ImageFilter.SHARPEN)
+        return image
+    
+    def _tile_image(self, image: Image.Image) -> List[Tuple[Image.Image, int, int, int]]:
+        """
+        Split a tall page into overlapping full-width bands for Tesseract
         
-        # Apply median filter to reduce noise
-        image = image.filter(ImageFilter.MedianFilter(size=3))
+        Returns:
+            List of (tile, y_offset, own_top, own_bottom); each tile keeps only words whose
+            centre falls in its own [own_top, own_bottom) range so the overlap isn't read twice
+        """
+        width, height = image.size
+        if height <= OCR_TILE_MAX_SIDE:
+            return [(image, 0, 0, height)]
         
+        step = OCR_TILE_MAX_SIDE - OCR_TILE_OVERLAP
+        offsets = list(range(0, height - OCR_TILE_OVERLAP, step))
+        tiles = []
+        for index, y_off in enumerate(offsets):
+            bottom = min(y_off + OCR_TILE_MAX_SIDE, height)
+            own_top = y_off + OCR_TILE_OVERLAP // 2 if index > 0 else 0
+            own_bottom = bottom - OCR_TILE_OVERLAP // 2 if index < len(offsets) - 1 else height
+            tiles.append((image.crop((0, y_off, width, bottom)), y_off, own_top, own_bottom))
+        return tiles
+    
+    def _extract_all(self, processed_image: Image.Image) -> Tuple[str, float, Dict]:
+        """
+        Run Tesseract once per tile and derive text, confidence and layout from the same pass
+        
+        Returns:
+            Tuple of (full_text, confidence_score, blocks)
+        """
+        tiles = self._tile_image(processed_image)
+        
+        def ocr_tile(tile: Image.Image) -> Dict:
+            if TESSEROCR_AVAILABLE:
+                return self._tesserocr_data(tile)
+            return pytesseract.image_to_data(tile, output_type=pytesseract.Output.DICT)
+        
+        if len(tiles) == 1:
+            tile_data = [ocr_tile(tiles[0][0])]
+        else:
+            # Layout analysis grows faster than page area, and each tile is its own process
+            with ThreadPoolExecutor(max_workers=min(settings.OCR_CONCURRENCY, len(tiles))) as executor:
+                tile_data = list(executor.map(ocr_tile, [tile for tile, _, _, _ in tiles]))
+        
+        lines = {}
+        blocks = {}
+        conf_total = 0.0
+        conf_count = 0
+        block_base = 0
+        for data, (_, y_off, own_top, own_bottom) in zip(tile_data, tiles):
+            # Vectorized filtering: only owned rows with text reach the Python loop below
+            conf = np.asarray(data['conf'], dtype=np.float32)
+            centres = np.asarray(data['top'], dtype=np.int64) + np.asarray(data['height'], dtype=np.int64) // 2 + y_off
+            owned = (centres >= own_top) & (centres < own_bottom)
+            
+            # -1 marks layout rows (page/block/line) that carry no recognized word
+            scored = owned & (conf != -1)
+            conf_total += float(conf[scored].sum())
+            conf_count += int(scored.sum())
+            
+            has_text = np.fromiter((bool(text.strip()) for text in data['text']), dtype=bool, count=len(data['text']))
+            for i in np.flatnonzero(owned & has_text):
+                text = data['text'][i]
+                
+                # Shift block numbers so blocks from different tiles stay distinct
+                block_num = data['block_num'][i] + block_base
+                line_key = (block_num, data['par_num'][i], data['line_num'][i])
+                lines.setdefault(line_key, []).append(text)
+                blocks.setdefault(block_num, []).append({
+                    'text': text,
+                    'conf': float(conf[i]) / 100.0,
+                    'left': data['left'][i],
+                    'top': data['top'][i] + y_off
+                })
+            block_base += max(data['block_num'], default=0)
+        
+        # Rebuild the plain text like image_to_string: words by line, blank line between blocks
+        text_parts = []
+        previous_block = None
+        for (block_num, _, _), words in lines.items():
+            if previous_block is not None and block_num != previous_block:
+                text_parts.append('')
+            text_parts.append(' '.join(words))
+            previous_block = block_num
+        
+        # Average confidence, converted to 0.0 - 1.0 range
+        confidence = conf_total / conf_count / 100.0 if conf_count else 0.0
+        return ('\n'.join(text_parts).strip(), confidence, blocks)
+    
+    def _open_for_ocr(self, image_bytes: bytes) -> Image.Image:
+        """Open an image no larger than OCR needs, letting libjpeg downscale while decoding"""
+        image = Image.open(io.BytesIO(image_bytes))
+        long_side = max(image.size)
+        if long_side <= OCR_MAX_SIDE:
+            return image
+        
+        if image.format == 'JPEG':
+            # DCT scaling (1/2, 1/4, 1/8) picks the smallest size still covering the target
+            ratio = OCR_MAX_SIDE / long_side
+            image.draft('L', (int(image.width * ratio), int(image.height * ratio)))
+        elif long_side > OCR_RESIZE_THRESHOLD:
+            image.thumbnail((OCR_MAX_SIDE, OCR_MAX_SIDE), Image.Resampling.BILINEAR)
         return image
     
+    def _ocr_image_bytes(self, image_bytes: bytes) -> Tuple[str, float, Dict]:
+        """Preprocess and OCR decoded image bytes, reusing cached results for the same image"""
+        cache_key = self._image_key(image_bytes)
+        cached = self._cache_get(self._ocr_cache, cache_key)
+        if cached is not None:
+            return cached
+        
+        image = self._open_for_ocr(image_bytes)
+        
+        # Preprocess image
+        processed_image = self.preprocess_image(image)
+        
+        result = self._extract_all(processed_image)
+        self._cache_put(self._ocr_cache, cache_key, result)
+        return result
+    
+    def _decode_b64(self, image_b64: str) -> bytes:
+        """Decode a base64 payload once; OCR helpers take the raw bytes from here on"""
+        return base64.b64decode(image_b64)
+    
     def extract_text_from_image(self, image_b64: str) -> Tuple[Optional[str], float]:
         """
         Extract text from base64 encoded image
@@ -57,50 +336,45 @@ class OCRService:
             return ("OCR service unavailable. Please install pytesseract.", 0.0)
         
         try:
-            # Decode base64 image
-            image_bytes = base64.b64decode(image_b64)
-            image = Image.open(io.BytesIO(image_bytes))
-            
-            # Preprocess image
-            processed_image = self.preprocess_image(image)
-            
-            # Extract text using Tesseract
-            extracted_text = pytesseract.image_to_string(processed_image)
-            
-            # Get confidence data
-            confidence = self._get_confidence_score(processed_image)
-            
-            return (extracted_text.strip(), confidence)
-            
-        except Exception as e:
-            print(f"OCR Error: {e}")
+            image_bytes = self._decode_b64(image_b64)
+        except Exception:
+            logger.warning("OCR error", exc_info=True)
             return (None, 0.0)
+        return self.extract_text_from_bytes(image_bytes)
     
-    def _get_confidence_score(self, image: Image.Image) -> float:
+    def extract_text_from_bytes(self, image_bytes: bytes) -> Tuple[Optional[str], float]:
         """
-        Get OCR confidence score from image
+        Extract text from raw image bytes (e.g. an uploaded file) without a base64 round-trip
         
         Returns:
-            Average confidence score (0.0 - 1.0)
+            Tuple of (extracted_text, confidence_score)
         """
         if not self.tesseract_available:
-            return 0.0
+            return ("OCR service unavailable. Please install pytesseract.", 0.0)
         
         try:
-            # Get detailed OCR data with confidence scores
-            data = pytesseract.image_to_data(image, output_type=pytesseract.Output.DICT)
+            extracted_text, confidence, _ = self._ocr_image_bytes(image_bytes)
+            return (extracted_text, confidence)
             
-            # Calculate average confidence (excluding -1 values which indicate no text)
-            confidences = [float(conf) for conf in data['conf'] if int(conf) != -1]
-            
-            if confidences:
-                avg_confidence = sum(confidences) / len(confidences)
-                return avg_confidence / 100.0  # Convert to 0.0 - 1.0 range
-            return 0.0
-            
-        except Exception as e:
-            print(f"Confidence calculation error: {e}")
-            return 0.0
+        except Exception:
+            logger.warning("OCR error", exc_info=True)
+            return (None, 0.0)
+    
+    def extract_batch(self, image_b64_list: List[str]) -> List[Tuple[Optional[str], float]]:
+        """
+        Extract text from several base64 encoded images in parallel
+        
+        Tesseract runs as a subprocess, so threads give real parallelism here.
+        
+        Returns:
+            List of (extracted_text, confidence_score), in input order
+        """
+        if len(image_b64_list) <= 1:
+            return [self.extract_text_from_image(image_b64) for image_b64 in image_b64_list]
+        
+        workers = min(settings.OCR_CONCURRENCY, len(image_b64_list))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(self.extract_text_from_image, image_b64_list))
     
     def extract_with_layout(self, image_b64: str) -> Dict:
         """
@@ -113,37 +387,16 @@ class OCRService:
             return {"error": "OCR service unavailable"}
         
         try:
-            # Decode base64 image
-            image_bytes = base64.b64decode(image_b64)
-            image = Image.open(io.BytesIO(image_bytes))
-            
-            # Preprocess image
-            processed_image = self.preprocess_image(image)
-            
-            # Get detailed OCR data
-            data = pytesseract.image_to_data(processed_image, output_type=pytesseract.Output.DICT)
-            
-            # Organize by blocks
-            blocks = {}
-            for i, text in enumerate(data['text']):
-                if text.strip():
-                    block_num = data['block_num'][i]
-                    if block_num not in blocks:
-                        blocks[block_num] = []
-                    blocks[block_num].append({
-                        'text': text,
-                        'conf': float(data['conf'][i]) / 100.0,
-                        'left': data['left'][i],
-                        'top': data['top'][i]
-                    })
-            
+            image_bytes = self._decode_b64(image_b64)
+            full_text, _, blocks = self._ocr_image_bytes(image_bytes)
+            # blocks belongs to the OCR cache; hand out a copy so callers can't alter it
             return {
-                'blocks': blocks,
-                'full_text': pytesseract.image_to_string(processed_image).strip()
+                'blocks': {num: [dict(word) for word in words] for num, words in blocks.items()},
+                'full_text': full_text
             }
             
         except Exception as e:
-            print(f"Layout extraction error: {e}")
+            logger.warning("Layout extraction error", exc_info=True)
             return {"error": str(e)}
 
 
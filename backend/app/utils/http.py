@@ -0,0 +1,70 @@
+# HTTP helpers for JSON requests to hosted inference providers
+import asyncio
+import gzip
+import json
+import weakref
+from typing import Any, Dict, Optional, Tuple
+import httpx
+from app.config import settings
+
+# Bodies at or below this size are not worth the compression round-trip
+GZIP_MIN_BYTES = 1024
+
+# Keep-alive pool shared by every request a service makes
+POOL_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20)
+
+
+def encode_json_body(payload: Any, headers: Dict[str, str] = None) -> Tuple[bytes, Dict[str, str]]:
+    """Serialize a JSON payload, gzipping large bodies when compression is enabled"""
+    body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    headers = {**(headers or {}), "Content-Type": "application/json"}
+
+    if not settings.HTTP_COMPRESSION:
+        headers["Accept-Encoding"] = "identity"
+        return body, headers
+
+    headers["Accept-Encoding"] = "gzip"
+    if len(body) > GZIP_MIN_BYTES:
+        body = gzip.compress(body, compresslevel=1)
+        headers["Content-Encoding"] = "gzip"
+    return body, headers
+
+
+# Longest we are willing to wait for a cold-starting Hugging Face model
+MODEL_LOADING_MAX_WAIT = 20.0
+
+
+def model_loading_wait(response: Any) -> Optional[float]:
+    """Seconds to wait before retrying a Hugging Face "model loading" 503, else None"""
+    if response is None or response.status_code != 503:
+        return None
+    try:
+        estimated = float(response.json().get("estimated_time", 5))
+    except Exception:
+        return None
+    return min(max(estimated, 0.0), MODEL_LOADING_MAX_WAIT)
+
+
+class AsyncClientPool:
+    """Reusable httpx.AsyncClient per event loop (pooled connections cannot cross loops)"""
+
+    def __init__(self, **client_kwargs):
+        self._client_kwargs = {"limits": POOL_LIMITS, **client_kwargs}
+        # Entries disappear with their loop, e.g. after asyncio.run() returns
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+    def get(self) -> httpx.AsyncClient:
+        """Client bound to the running event loop, created on first use"""
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(**self._client_kwargs)
+            self._clients[loop] = client
+        return client
+
+    def close(self):
+        """Close clients whose loop can still run them (used at interpreter exit)"""
+        for loop, client in list(self._clients.items()):
+            if not client.is_closed and not loop.is_closed() and not loop.is_running():
+                loop.run_until_complete(client.aclose())
+        self._clients.clear()
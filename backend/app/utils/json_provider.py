@@ -0,0 +1,38 @@
+# Flask JSON provider backed by orjson for API responses and request bodies
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+    orjson = None
+
+# Same output as Flask's provider: sorted keys, non-string keys allowed and
+# datetimes handed to its default hook (HTTP dates) instead of orjson's ISO format
+ORJSON_OPTIONS = (
+    orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+    if ORJSON_AVAILABLE else 0
+)
+
+
+class ORJSONProvider(DefaultJSONProvider):
+    """Encode and decode JSON with orjson, falling back to Flask's hook for other types"""
+
+    def dumps(self, obj, **kwargs) -> str:
+        # orjson has no equivalent for json.dumps options such as indent or separators
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=ORJSON_OPTIONS).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        """Build the response body as bytes directly, skipping the str round-trip"""
+        obj = self._prepare_response_obj(args, kwargs)
+        option = ORJSON_OPTIONS | orjson.OPT_APPEND_NEWLINE
+        if self.compact is False or (self.compact is None and self._app.debug):
+            option |= orjson.OPT_INDENT_2
+        body = orjson.dumps(obj, default=self.default, option=option)
+        return self._app.response_class(body, mimetype=self.mimetype)
@@ -1,23 +1,58 @@
 # Security utilities for password hashing and JWT tokens
+import logging
+import time
 from datetime import timedelta
 from typing import Optional
 from flask_jwt_extended import create_access_token as flask_create_access_token, decode_token
 import bcrypt
 from app.config import settings
 
+logger = logging.getLogger(__name__)
+
+# A single hash slower than this starves request workers during signup bursts
+PASSWORD_HASH_WARN_SECONDS = 0.5
+
+# Length of every "$2b$<cost>$<salt+digest>" bcrypt hash
+BCRYPT_HASH_LENGTH = 60
+
+_hash_cost_checked = False
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a plain password against a hashed password"""
-    return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+    # Anything that isn't a 60-char bcrypt hash can't match; skip the expensive compare
+    if not hashed_password or len(hashed_password) != BCRYPT_HASH_LENGTH or not hashed_password.startswith("$2"):
+        return False
+    try:
+        return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+    except ValueError:
+        return False
 
 
 def get_password_hash(password: str) -> str:
     """Hash a password"""
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS)
     hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
     return hashed.decode('utf-8')
 
 
+def check_password_hash_cost() -> None:
+    """Time one hash at the configured cost and warn if it's too slow for this CPU (once per process)"""
+    global _hash_cost_checked
+    if _hash_cost_checked:
+        return
+    _hash_cost_checked = True
+    
+    started = time.perf_counter()
+    get_password_hash("startup-probe")
+    elapsed = time.perf_counter() - started
+    if elapsed > PASSWORD_HASH_WARN_SECONDS:
+        logger.warning(
+            "Password hashing takes %.0f ms at BCRYPT_ROUNDS=%d; consider lowering it for this CPU",
+            elapsed * 1000, settings.BCRYPT_ROUNDS
+        )
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token using Flask-JWT-Extended"""
  
@@ -4,14 +4,20 @@ Batch upload training images from a folder
 Processes entire directories of medical images for OCR training
 """
 import requests
+import httpx
 import json
+import time
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Dict
-import time
+from itertools import islice
+from typing import Dict, Iterator, Optional
 import mimetypes
 
+from token_cache import load_cached_token, save_cached_token
+
 # Configuration
 BASE_URL = "http://localhost:5000"
 API_BASE = f"{BASE_URL}/api"
@@ -19,9 +25,22 @@ API_BASE = f"{BASE_URL}/api"
 # Supported image formats
 IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.tif', '.webp'}
 
+# Server-side OCR can take a while on large scans
+UPLOAD_TIMEOUT = 120.0
+
+# Retries per image when the server is overloaded or a proxy in front of it hiccups
+MAX_RETRIES = 3
+RETRY_STATUSES = {429, 502, 503, 504}
+RETRY_BACKOFF = 0.3
+
 
 def get_auth_token(username: str = "testuser", password: str = "testpassword"):
     """Login and get JWT token"""
+    token = load_cached_token(API_BASE, username)
+    if token:
+        print(f"🔐 Reusing saved session for {username}\n")
+        return token
+    
     print(f"🔐 Authenticating as {username}...")
     
     response = requests.post(
@@ -31,6 +50,7 @@ def get_auth_token(username: str = "testuser", password: str = "testpassword"):
     
     if response.status_code == 200:
         token = response.json()['access_token']
+        save_cached_token(API_BASE, username, token)
         print(f"✅ Authentication successful!\n")
         return token
     else:
@@ -38,20 +58,53 @@ def get_auth_token(username: str = "testuser", password: str = "testpassword"):
         sys.exit(1)
 
 
-def find_images_in_folder(folder_path: str) -> List[Path]:
-    """Recursively find all images in folder"""
-    folder = Path(folder_path)
-    
-    if not folder.exists():
+def _scan_images(folder_path: str) -> Iterator[os.DirEntry]:
+    """Recursively yield image DirEntry objects (one scandir per directory, case-insensitive extensions)"""
+    if not os.path.isdir(folder_path):
         print(f"❌ Folder not found: {folder_path}")
-        return []
-    
-    images = []
-    for ext in IMAGE_EXTENSIONS:
-        images.extend(folder.rglob(f"*{ext}"))
-        images.extend(folder.rglob(f"*{ext.upper()}"))
+        return
     
-    return sorted(images)
+    pending = [folder_path]
+    while pending:
+        with os.scandir(pending.pop()) as it:
+            # Sort per directory so the walk order is deterministic without sorting everything at the end
+            entries = sorted(it, key=lambda entry: entry.name)
+        subdirs = []
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append(entry.path)
+            elif os.path.splitext(entry.name)[1].lower() in IMAGE_EXTENSIONS:
+                yield entry
+        # Files of a folder come before its subfolders, like a top-down os.walk
+        pending.extend(reversed(subdirs))
+
+
+def find_images_in_folder(folder_path: str) -> Iterator[Path]:
+    """Recursively yield all images in folder"""
+    for entry in _scan_images(folder_path):
+        yield Path(entry.path)
+
+
+def _classify_path_text(text: str) -> str:
+    """Image type hinted by a path fragment, or '' if it names none"""
+    text = text.lower()
+    if 'handwritten' in text or 'hand' in text:
+        return 'handwritten'
+    elif 'mixed' in text:
+        return 'mixed'
+    return ''
+
+
+@lru_cache(maxsize=None)
+def _type_for_dir(parent: str) -> str:
+    """Folder hint, computed once per directory rather than once per image"""
+    return _classify_path_text(parent)
+
+
+@lru_cache(maxsize=None)
+def _mime_for_ext(ext: str) -> Optional[str]:
+    """MIME type for a file extension (the same few extensions repeat across a batch)"""
+    return mimetypes.guess_type(f"image{ext.lower()}")[0]
 
 
 def detect_image_type(image_path: Path) -> str:
@@ -61,42 +114,38 @@ def detect_image_type(image_path: Path) -> str:
     You can enhance this with ML model or manual categorization
     """
     # Simple heuristic: check folder name or filename
-    path_str = str(image_path).lower()
+    hints = (_type_for_dir(str(image_path.parent)), _classify_path_text(image_path.name))
     
-    if 'handwritten' in path_str or 'hand' in path_str:
+    if 'handwritten' in hints:
         return 'handwritten'
-    elif 'mixed' in path_str:
+    elif 'mixed' in hints:
         return 'mixed'
     else:
         return 'printed'
 
 
 def upload_single_image(
-    token: str, 
+    client: httpx.Client, 
     image_path: Path, 
-    image_type: str,
-    delay: float = 0.5
+    image_type: str
 ) -> Dict:
     """Upload a single training image"""
-    headers = {"Authorization": f"Bearer {token}"}
-    
     try:
         with open(image_path, 'rb') as f:
-            files = {'image': (image_path.name, f, mimetypes.guess_type(str(image_path))[0])}
+            files = {'image': (image_path.name, f, _mime_for_ext(image_path.suffix))}
             data = {
                 'image_type': image_type,
                 'is_training_data': 'true'
             }
             
-            response = requests.post(
-                f"{API_BASE}/training/upload",
-                headers=headers,
-                files=files,
-                data=data
-            )
-        
-        # Add small delay to avoid overwhelming server
-        time.sleep(delay)
+            # Only back off when the server says it's overloaded or briefly unavailable
+            for attempt in range(MAX_RETRIES + 1):
+                f.seek(0)
+                response = client.post("/training/upload", files=files, data=data)
+                if response.status_code not in RETRY_STATUSES or attempt == MAX_RETRIES:
+                    break
+                retry_after = response.headers.get('Retry-After', '')
+                time.sleep(float(retry_after) if retry_after.isdigit() else RETRY_BACKOFF * 2 ** attempt)
         
         if response.status_code == 201:
             result = response.json()
@@ -124,7 +173,7 @@ def batch_upload_images(
     folder_path: str,
     image_type: str = 'auto',
     max_images: int = None,
-    delay: float = 0.5
+    workers: int = None
 ):
     """Batch upload all images from folder"""
     
@@ -133,20 +182,19 @@ def batch_upload_images(
     print(f"{'='*70}")
     print(f"Source Folder: {folder_path}")
     print(f"Image Type: {image_type}")
+    print(f"Parallel Uploads: {workers or os.cpu_count()}")
     print(f"{'='*70}\n")
     
     # Find all images
     print("🔍 Scanning for images...")
-    images = find_images_in_folder(folder_path)
+    # Stop scanning as soon as enough images are found
+    images = list(islice(find_images_in_folder(folder_path), max_images))
     
     if not images:
         print(f"❌ No images found in {folder_path}")
         print(f"   Supported formats: {', '.join(IMAGE_EXTENSIONS)}")
         return
     
-    if max_images:
-        images = images[:max_images]
-    
     print(f"✅ Found {len(images)} image(s) to upload\n")
     
     # Confirm upload
@@ -170,39 +218,55 @@ def batch_upload_images(
     print("UPLOADING IMAGES")
     print(f"{'='*70}\n")
     
-    for i, image_path in enumerate(images, 1):
-        # Auto-detect image type if needed
-        if image_type == 'auto':
-            current_type = detect_image_type(image_path)
-        else:
-            current_type = image_type
-        
-        print(f"[{i}/{len(images)}] 📤 {image_path.name} ({current_type})... ", end='')
-        
-        result = upload_single_image(token, image_path, current_type, delay)
+    # Auto-detect image type if needed
+    image_types = [
+        detect_image_type(image_path) if image_type == 'auto' else image_type
+        for image_path in images
+    ]
+    
+    # The server OCRs each upload in its own Tesseract process, so keep several in flight,
+    # sharing one keep-alive connection pool instead of a new connection per image
+    workers = workers or os.cpu_count()
+    with httpx.Client(
+        base_url=API_BASE,
+        headers={"Authorization": f"Bearer {token}"},
+        # The transport also retries failed connection attempts (nothing sent yet, so always safe)
+        transport=httpx.HTTPTransport(
+            retries=MAX_RETRIES,
+            limits=httpx.Limits(max_connections=workers, max_keepalive_connections=workers)
+        ),
+        timeout=UPLOAD_TIMEOUT
+    ) as client, ThreadPoolExecutor(max_workers=workers) as executor:
+        upload_results = executor.map(
+            lambda args: upload_single_image(client, *args),
+            zip(images, image_types)
+        )
         
-        if result['success']:
-            print(f"✅ Success!")
-            print(f"         ID: {result['image_id']} | "
-                  f"Confidence: {result['confidence']:.1%} | "
-                  f"Meds: {len(result['medications'])} | "
-                  f"Text: {result['text_length']} chars")
+        for i, (image_path, current_type, result) in enumerate(zip(images, image_types, upload_results), 1):
+            print(f"[{i}/{len(images)}] 📤 {image_path.name} ({current_type})... ", end='')
             
-            results['successful'] += 1
-            results['total_medications'] += len(result['medications'])
-            confidences.append(result['confidence'])
+            if result['success']:
+                print(f"✅ Success!")
+                print(f"         ID: {result['image_id']} | "
+                      f"Confidence: {result['confidence']:.1%} | "
+                      f"Meds: {len(result['medications'])} | "
+                      f"Text: {result['text_length']} chars")
             
-            if result['medications']:
-                print(f"         💊 {', '.join(result['medications'])}")
-        else:
-            print(f"❌ Failed: {result['error']}")
-            results['failed'] += 1
-            results['errors'].append({
-                'file': image_path.name,
-                'error': result['error']
-            })
+                results['successful'] += 1
+                results['total_medications'] += len(result['medications'])
+                confidences.append(result['confidence'])
+            
+                if result['medications']:
+                    print(f"         💊 {', '.join(result['medications'])}")
+            else:
+                print(f"❌ Failed: {result['error']}")
+                results['failed'] += 1
+                results['errors'].append({
+                    'file': image_path.name,
+                    'error': result['error']
+                })
         
-        print()
+            print()
     
     # Calculate stats
     if confidences:
@@ -243,27 +307,30 @@ def batch_upload_images(
 
 def export_training_manifest(folder_path: str, output_file: str = "training_manifest.json"):
     """Create a manifest file of all images for tracking"""
-    images = find_images_in_folder(folder_path)
+    # DirEntry.stat() is answered from the directory listing where the OS provides it (Windows)
+    entries = list(_scan_images(folder_path))
     
     manifest = {
         'folder': str(folder_path),
-        'total_images': len(images),
+        'total_images': len(entries),
         'images': []
     }
     
-    for img in images:
+    for entry in entries:
+        img = Path(entry.path)
         manifest['images'].append({
-            'filename': img.name,
-            'path': str(img),
-            'size_bytes': img.stat().st_size,
+            'filename': entry.name,
+            'path': entry.path,
+            'size_bytes': entry.stat().st_size,
             'detected_type': detect_image_type(img)
         })
     
+    # Compact JSON: the manifest is read by tools, and large folders make indented output bulky
     with open(output_file, 'w') as f:
-        json.dump(manifest, f, indent=2)
+        json.dump(manifest, f, separators=(',', ':'))
     
     print(f"📄 Manifest created: {output_file}")
-    print(f"   {len(images)} images catalogued")
+    print(f"   {len(entries)} images catalogued")
 
 
 if __name__ == "__main__":
@@ -298,8 +365,8 @@ Examples:
                        help="Image type (default: auto-detect from path)")
     parser.add_argument("--max", "-m", type=int,
                        help="Maximum number of images to upload")
-    parser.add_argument("--delay", "-d", type=float, default=0.5,
-                       help="Delay between uploads in seconds (default: 0.5)")
+    parser.add_argument("--workers", "-w", type=int,
+                       help="Parallel uploads (default: CPU count)")
     parser.add_argument("--username", "-u", default="testuser",
                        help="Username for authentication")
     parser.add_argument("--password", "-p", default="testpassword",
@@ -318,5 +385,5 @@ Examples:
             args.folder,
             args.type,
             args.max,
-            args.delay
+            args.workers
         )
@@ -7,12 +7,15 @@ Shows how to:
 3. Check training statistics
 """
 import requests
+import httpx
 import json
 import base64
 import sys
 import os
 from pathlib import Path
 
+from token_cache import load_cached_token, save_cached_token
+
 # Configuration
 BASE_URL = "http://localhost:5000"
 API_BASE = f"{BASE_URL}/api"
@@ -20,6 +23,11 @@ API_BASE = f"{BASE_URL}/api"
 
 def get_auth_token(username: str = "testuser", password: str = "testpassword"):
     """Login and get JWT token"""
+    token = load_cached_token(API_BASE, username)
+    if token:
+        print(f"🔐 Reusing saved session for {username}\n")
+        return token
+    
     print(f"🔐 Logging in as {username}...")
     
     response = requests.post(
@@ -29,6 +37,7 @@ def get_auth_token(username: str = "testuser", password: str = "testpassword"):
     
     if response.status_code == 200:
         token = response.json()['access_token']
+        save_cached_token(API_BASE, username, token)
         print(f"✅ Successfully logged in!\n")
         return token
     else:
@@ -50,11 +59,13 @@ def upload_training_image(token: str, image_path: str, image_type: str = "printe
             'is_training_data': 'true'
         }
         
-        response = requests.post(
+        # httpx streams the file in chunks; requests would read the whole scan into memory first
+        response = httpx.post(
             f"{API_BASE}/training/upload",
             headers=headers,
             files=files,
-            data=data
+            data=data,
+            timeout=120.0
         )
     
     if response.status_code == 201:
@@ -6,17 +6,72 @@ Processes word-level images of medication names with labels
 import sys
 import os
 import csv
-import base64
+import hashlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 
 # Add parent directory to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from sqlalchemy import case, func, insert, select
 from app.main import create_app
 from app.database import get_db
 from app.models.training_image import TrainingImage
 from app.models.medication import Medication
 
 
+# Rows per multi-row INSERT
+INSERT_BATCH_SIZE = 1000
+# Parallel file reads, and how many images may be read ahead of the insert loop
+READ_WORKERS = 16
+READ_AHEAD = 256
+# Names per medication INSERT (two bound parameters each; stays under SQLite's variable limit)
+MEDICATION_BATCH_SIZE = 400
+
+
+def read_prefetched(executor, read_fn, rows):
+    """Map read_fn over rows on the executor in order, keeping at most READ_AHEAD reads in flight"""
+    pending = deque()
+    for row in rows:
+        pending.append(executor.submit(read_fn, row))
+        if len(pending) >= READ_AHEAD:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def insert_missing_medications(db, names):
+    """
+    Add medications for names not already in the table, ignoring ones that exist
+    
+    Returns:
+        Number of medications created
+    """
+    if db.get_bind().dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    
+    created = 0
+    names = sorted(names)
+    for start in range(0, len(names), MEDICATION_BATCH_SIZE):
+        chunk = names[start:start + MEDICATION_BATCH_SIZE]
+        # One IN query per chunk; re-runs usually find every name already present
+        existing = set(db.execute(
+            select(Medication.name).where(Medication.name.in_(chunk))
+        ).scalars())
+        values = [{'name': name, 'discontinued': False} for name in chunk if name not in existing]
+        if not values:
+            continue
+        result = db.execute(
+            dialect_insert(Medication).values(values).on_conflict_do_nothing(index_elements=['name'])
+        )
+        created += max(result.rowcount, 0)
+    db.commit()
+    return created
+
+
 def load_prescription_training_data(split='Training', limit=None):
     """
     Load handwritten prescription dataset
@@ -53,14 +108,10 @@ def load_prescription_training_data(split='Training', limit=None):
         print(f"Loading {split} Dataset - Handwritten Prescription Words")
         print(f"{'='*70}\n")
         
-        # Read CSV
-        with open(csv_file, 'r') as f:
-            reader = csv.DictReader(f)
-            rows = list(reader)
-        
-        total_rows = len(rows)
-        if limit:
-            rows = rows[:limit]
+        # Count rows with a raw line scan; the rows themselves are streamed below
+        with open(csv_file, 'r', newline='') as f:
+            total_rows = max(sum(1 for _ in f) - 1, 0)
+        process_rows = min(total_rows, limit) if limit else total_rows
         
         print(f"Found {total_rows} labeled images")
         if limit:
@@ -71,76 +122,77 @@ def load_prescription_training_data(split='Training', limit=None):
         # Process each image
         loaded_count = 0
         skipped_count = 0
-        medication_updates = 0
+        pending_rows = []
+        generic_names = set()
         
-        for i, row in enumerate(rows, 1):
-            image_filename = row['IMAGE']
-            medicine_name = row['MEDICINE_NAME']
-            generic_name = row['GENERIC_NAME']
-            
-            image_path = os.path.join(images_dir, image_filename)
-            
-            if not os.path.exists(image_path):
-                print(f"⚠️  Skipping {image_filename}: file not found")
-                skipped_count += 1
-                continue
-            
-            # Read and encode image
-            with open(image_path, 'rb') as img_file:
-                image_bytes = img_file.read()
-                image_b64 = base64.b64encode(image_bytes).decode('utf-8')
-            
-            # Check if already exists
-            existing = db.query(TrainingImage).filter(
-                TrainingImage.image_data == image_b64
-            ).first()
-            
-            if existing:
-                skipped_count += 1
-                continue
-            
-            # Create training image entry
-            training_image = TrainingImage(
-                image_data=image_b64,
-                extracted_text=medicine_name,  # What was written
-                corrected_text=f"{medicine_name} ({generic_name})",  # Full label
-                image_type='handwritten',
-                is_training_data=True,
-                ocr_confidence=None  # Will be set when OCR is run
-            )
-            
-            db.add(training_image)
-            loaded_count += 1
-            
-            # Also check/update medication database
-            # Look for generic name in medications
-            if generic_name:
-                existing_med = db.query(Medication).filter(
-                    Medication.name == generic_name
-                ).first()
-                
-                if not existing_med:
-                    # Create new medication entry
-                    try:
-                        new_med = Medication(
-                            name=generic_name,
-                            discontinued=False
-                        )
-                        db.add(new_med)
-                        db.flush()  # Flush to catch uniqueness constraint
-                        medication_updates += 1
-                    except Exception as e:
-                        # Likely duplicate, skip
-                        db.rollback()
-                        pass
-            
-            # Progress
-            if i % 100 == 0:
-                print(f"Processed: {i}/{len(rows)} images ({loaded_count} new, {skipped_count} skipped)")
+        # One indexed-column read up front; duplicates are then O(1) set lookups
+        existing_hashes = set(db.execute(
+            select(TrainingImage.image_hash).where(TrainingImage.image_hash.isnot(None))
+        ).scalars())
+        
+        def flush_pending():
+            """Write queued training images as one multi-row INSERT"""
+            if pending_rows:
+                db.execute(insert(TrainingImage), pending_rows)
                 db.commit()
+                pending_rows.clear()
         
-        # Final commit
-        db.commit()
+        def read_image(row):
+            """Read and hash one image on a worker thread (None if the file is missing)"""
+            try:
+                with open(os.path.join(images_dir, row['IMAGE']), 'rb') as img_file:
+                    image_bytes = img_file.read()
+            except FileNotFoundError:
+                return row, None, None
+            return row, image_bytes, hashlib.sha256(image_bytes).hexdigest()
+        
+        # Overlap file reads on a thread pool; DB writes stay on this thread (sessions aren't thread-safe)
+        with open(csv_file, 'r', newline='') as f, \
+                ThreadPoolExecutor(max_workers=READ_WORKERS) as executor:
+            reader = csv.DictReader(f)
+            rows = islice(reader, limit) if limit else reader
+            read_results = read_prefetched(executor, read_image, rows)
+            for i, (row, image_bytes, image_hash) in enumerate(read_results, 1):
+                image_filename = row['IMAGE']
+                medicine_name = row['MEDICINE_NAME']
+                generic_name = row['GENERIC_NAME']
+                
+                if image_bytes is None:
+                    print(f"⚠️  Skipping {image_filename}: file not found")
+                    skipped_count += 1
+                    continue
+                
+                # Check if already exists (stored earlier or queued in this run); hash is of the raw bytes
+                if image_hash in existing_hashes:
+                    skipped_count += 1
+                    continue
+                existing_hashes.add(image_hash)
+                
+                # Queue training image entry
+                pending_rows.append({
+                    'image_data': image_bytes,
+                    'image_hash': image_hash,
+                    'extracted_text': medicine_name,  # What was written
+                    'corrected_text': f"{medicine_name} ({generic_name})",  # Full label
+                    'image_type': 'handwritten',
+                    'is_training_data': True,
+                    'ocr_confidence': None  # Will be set when OCR is run
+                })
+                loaded_count += 1
+                
+                # Also collect generic names for the medication database
+                if generic_name:
+                    generic_names.add(generic_name)
+                
+                if len(pending_rows) >= INSERT_BATCH_SIZE:
+                    flush_pending()
+                
+                # Progress
+                if i % 100 == 0:
+                    print(f"Processed: {i}/{process_rows} images ({loaded_count} new, {skipped_count} skipped)")
+                
+        flush_pending()
+        medication_updates = insert_missing_medications(db, generic_names)
         
         # Print summary
         print(f"\n{'='*70}")
@@ -150,13 +202,11 @@ def load_prescription_training_data(split='Training', limit=None):
         print(f"⏭️  Skipped: {skipped_count} duplicates")
         print(f"💊 Medications added/updated: {medication_updates}")
         
-        # Get total stats
-        total_training = db.query(TrainingImage).filter(
-            TrainingImage.is_training_data == True
-        ).count()
-        total_handwritten = db.query(TrainingImage).filter(
-            TrainingImage.image_type == 'handwritten'
-        ).count()
+        # Get total stats in one scan (SUM(CASE) works on SQLite and PostgreSQL alike)
+        total_training, total_handwritten = db.execute(select(
+            func.coalesce(func.sum(case((TrainingImage.is_training_data == True, 1), else_=0)), 0),
+            func.coalesce(func.sum(case((TrainingImage.image_type == 'handwritten', 1), else_=0)), 0)
+        )).one()
         
         print(f"\n📊 Database Stats:")
         print(f"   Total training images: {total_training}")
@@ -0,0 +1,70 @@
+"""
+JWT cache shared by the training scripts
+Reuses a still-valid token between runs instead of logging in (and paying a bcrypt verify) every time
+"""
+import base64
+import json
+import os
+import time
+from pathlib import Path
+from typing import Optional
+
+TOKEN_CACHE_PATH = Path.home() / ".meta-hack" / "token.json"
+
+# Treat tokens this close to expiry as already expired
+EXPIRY_MARGIN_SECONDS = 60
+
+
+def peek_token(token: str) -> Optional[dict]:
+    """
+    Read a JWT's claims without verifying its signature
+    
+    NOT a security check: only use it for client-side bookkeeping such as expiry.
+    The server verifies every token it receives.
+    """
+    try:
+        _, payload, _ = token.split('.')
+        payload += '=' * (-len(payload) % 4)
+        claims = json.loads(base64.urlsafe_b64decode(payload))
+    except (AttributeError, TypeError, ValueError):
+        return None
+    return claims if isinstance(claims, dict) else None
+
+
+def _token_expiry(token: str) -> Optional[float]:
+    """Expiry timestamp of a token, or None if it has no usable exp claim"""
+    claims = peek_token(token)
+    try:
+        return float(claims['exp'])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def load_cached_token(api_base: str, username: str) -> Optional[str]:
+    """Return the cached token for this server and user if it's still valid"""
+    try:
+        cached = json.loads(TOKEN_CACHE_PATH.read_text())
+    except (OSError, ValueError):
+        return None
+
+    if cached.get('api_base') != api_base or cached.get('user') != username:
+        return None
+    if cached.get('exp', 0) <= time.time() + EXPIRY_MARGIN_SECONDS:
+        return None
+    return cached.get('token')
+
+
+def save_cached_token(api_base: str, username: str, token: str) -> None:
+    """Store a fresh token, readable only by the current user"""
+    exp = _token_expiry(token)
+    if exp is None:
+        return
+
+    try:
+        TOKEN_CACHE_PATH.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        fd = os.open(TOKEN_CACHE_PATH, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        os.fchmod(fd, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'api_base': api_base, 'user': username, 'token': token, 'exp': exp}, f)
+    except OSError:
+        pass  # Caching is best effort; the next run just logs in again
@@ -5,7 +5,7 @@ Fine-tunes microsoft/trocr-base-handwritten on medication names
 """
 import sys
 import os
-import base64
+import json
 from io import BytesIO
 
 # Add parent directory to path
@@ -21,7 +21,8 @@ from transformers import (
     Seq2SeqTrainingArguments,
     default_data_collator
 )
-from datasets import load_metric
+import datasets
+import evaluate
 import numpy as np
 
 from app.main import create_app
@@ -29,115 +30,211 @@ from app.database import get_db
 from app.models.training_image import TrainingImage
 
 
+# Character Error Rate, loaded once rather than on every evaluation
+CER_METRIC = evaluate.load("cer")
+
+# Samples are loaded in DataLoader worker processes so the GPU isn't left
+# waiting on the host side
+DATALOADER_WORKERS = max(4, (os.cpu_count() or 1) // 2)
+DATALOADER_PREFETCH_FACTOR = 4
+
+
+def label_text(record):
+    """
+    Training label for an image record
+    
+    Uses corrected_text when there's no extracted_text. Labels look like
+    "BrandName (GenericName)" and only the brand name is kept.
+    """
+    text = record.extracted_text or record.corrected_text
+    if '(' in text:
+        text = text.split('(')[0].strip()
+    return text
+
+
+# Arrow copy of the handwritten training set; it's memory-mapped, so reading
+# samples never goes back to the database
+DATASET_CACHE_DIR = "data/trocr_arrow"
+
+# Row ranges of each split, following the load order of load_prescription_training.py
+# Training: 0-3003, Testing: 3004-3760, Validation: 3761-4498
+SPLIT_RANGES = {
+    'Training': (0, 3004),
+    'Testing': (3004, 3761),
+    'Validation': (3761, None),
+}
+
+
+def build_dataset_cache(cache_dir=DATASET_CACHE_DIR):
+    """Export handwritten training images from the database into an Arrow dataset on disk"""
+    app = create_app()
+    with app.app_context():
+        db = get_db()
+        records = db.query(TrainingImage).filter(
+            TrainingImage.image_type == 'handwritten',
+            TrainingImage.is_training_data == True
+        ).order_by(TrainingImage.id).all()
+        rows = [
+            {"image": record.image_data, "text": label_text(record)}
+            for record in records
+        ]
+    
+    dataset = datasets.Dataset.from_list(rows)
+    dataset.save_to_disk(cache_dir)
+    print(f"Cached {len(dataset)} images to {cache_dir}")
+    return dataset
+
+
+def load_dataset_cache(cache_dir=DATASET_CACHE_DIR, rebuild=False):
+    """Open the Arrow dataset, exporting it from the database first if needed"""
+    if rebuild or not os.path.isdir(cache_dir):
+        build_dataset_cache(cache_dir)
+    return datasets.load_from_disk(cache_dir)
+
+
+# Processor outputs are identical every epoch, so they're computed once and
+# kept next to the Arrow data as memory-mapped arrays
+PIXELS_FILE = "pixels.f16"
+LABELS_FILE = "labels.i32"
+FEATURES_META_FILE = "features.json"
+MAX_LABEL_LENGTH = 64
+FEATURE_BATCH_SIZE = 64
+
+
+def open_for_processor(image_bytes, target_size):
+    """
+    Decode an image as RGB, no larger than the processor needs
+    
+    For JPEGs, draft() lets libjpeg decode at a reduced scale that still
+    covers target_size; other formats are decoded normally.
+    """
+    image = Image.open(BytesIO(image_bytes))
+    image.draft("RGB", target_size)
+    return image.convert("RGB")
+
+
+def build_feature_cache(data, processor, cache_dir=DATASET_CACHE_DIR):
+    """Run the TrOCR processor over every image once and store pixel_values and labels"""
+    count = len(data)
+    pixel_shape = None
+    pixels = None
+    labels = np.lib.format.open_memmap(
+        os.path.join(cache_dir, LABELS_FILE), mode="w+",
+        dtype=np.int32, shape=(count, MAX_LABEL_LENGTH)
+    )
+    
+    size = processor.image_processor.size
+    target_size = (size["width"], size["height"])
+    
+    for start in range(0, count, FEATURE_BATCH_SIZE):
+        batch = data[start:start + FEATURE_BATCH_SIZE]
+        images = [open_for_processor(image_bytes, target_size) for image_bytes in batch["image"]]
+        pixel_values = processor(images, return_tensors="np").pixel_values
+        
+        if pixels is None:
+            pixel_shape = pixel_values.shape[1:]
+            pixels = np.lib.format.open_memmap(
+                os.path.join(cache_dir, PIXELS_FILE), mode="w+",
+                dtype=np.float16, shape=(count, *pixel_shape)
+            )
+        pixels[start:start + len(images)] = pixel_values.astype(np.float16)
+        
+        label_ids = np.asarray(processor.tokenizer(
+            batch["text"],
+            padding="max_length",
+            max_length=MAX_LABEL_LENGTH,
+            truncation=True
+        ).input_ids, dtype=np.int32)
+        # Replace padding token id's with -100 (ignored by loss)
+        label_ids[label_ids == processor.tokenizer.pad_token_id] = -100
+        labels[start:start + len(images)] = label_ids
+    
+    if pixels is not None:
+        pixels.flush()
+    labels.flush()
+    with open(os.path.join(cache_dir, FEATURES_META_FILE), "w") as f:
+        json.dump({"count": count, "pixel_shape": list(pixel_shape or ())}, f)
+    print(f"Cached pixel values for {count} images")
+
+
+def feature_cache_ready(data, cache_dir=DATASET_CACHE_DIR):
+    """True if the cached features were built from this exact dataset"""
+    try:
+        with open(os.path.join(cache_dir, FEATURES_META_FILE)) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return meta.get("count") == len(data)
+
+
 class HandwrittenMedicationDataset(Dataset):
     """Dataset for handwritten medication name images"""
     
-    def __init__(self, split='Training', processor=None):
+    def __init__(self, split='Training', cache_dir=DATASET_CACHE_DIR):
         """
         Args:
             split: 'Training', 'Testing', or 'Validation'
-            processor: TrOCRProcessor instance
+            cache_dir: Directory holding the features from build_feature_cache
         """
-        self.processor = processor
         self.split = split
+        self.cache_dir = cache_dir
         
-        # Load from database
-        app = create_app()
-        with app.app_context():
-            db = get_db()
-            
-            # Map splits to database tags
-            split_filter = f"%{split.lower()}%"
-            
-            # Get all handwritten training images from this split
-            query = db.query(TrainingImage).filter(
-                TrainingImage.image_type == 'handwritten',
-                TrainingImage.is_training_data == True
-            )
-            
-            # Filter by examining corrected_text for split indicator
-            # Since we stored them sequentially, we can use ID ranges
-            # Or we could add a split column - for now use all and split manually
-            all_images = query.all()
-            
-            # Manual split based on our load order:
-            # Training: 0-3003, Testing: 3004-3760, Validation: 3761-4498
-            if split == 'Training':
-                self.images = all_images[:3004]
-            elif split == 'Testing':
-                self.images = all_images[3004:3761]
-            else:  # Validation
-                self.images = all_images[3761:]
+        with open(os.path.join(cache_dir, FEATURES_META_FILE)) as f:
+            count = json.load(f)["count"]
+        start, stop = SPLIT_RANGES[split]
+        stop = count if stop is None else min(stop, count)
+        self.start = min(start, stop)
+        self.length = stop - self.start
         
-        print(f"Loaded {len(self.images)} images for {split}")
+        # Opened lazily so each DataLoader worker maps the files itself
+        self._pixels = None
+        self._labels = None
+        
+        print(f"Loaded {self.length} images for {split}")
     
     def __len__(self):
-        return len(self.images)
+        return self.length
+    
+    def _arrays(self):
+        if self._pixels is None:
+            self._pixels = np.load(os.path.join(self.cache_dir, PIXELS_FILE), mmap_mode="r")
+            self._labels = np.load(os.path.join(self.cache_dir, LABELS_FILE), mmap_mode="r")
+        return self._pixels, self._labels
     
     def __getitem__(self, idx):
-        img_record = self.images[idx]
-        
-        # Decode base64 image
-        image_bytes = base64.b64decode(img_record.image_data)
-        image = Image.open(BytesIO(image_bytes)).convert("RGB")
-        
-        # Get text label (use corrected_text which has full label)
-        # Format: "BrandName (GenericName)" - we want just the brand name
-        text = img_record.extracted_text or img_record.corrected_text
-        if '(' in text:
-            text = text.split('(')[0].strip()
-        
-        # Process with TrOCR processor
-        pixel_values = self.processor(image, return_tensors="pt").pixel_values
-        labels = self.processor.tokenizer(
-            text,
-            padding="max_length",
-            max_length=64,
-            truncation=True
-        ).input_ids
-        
-        # Convert labels to tensor
-        labels = torch.tensor(labels)
-        # Replace padding token id's with -100 (ignored by loss)
-        labels[labels == self.processor.tokenizer.pad_token_id] = -100
+        pixels, labels = self._arrays()
+        row = self.start + idx
         
-        encoding = {
-            "pixel_values": pixel_values.squeeze(),
-            "labels": labels
+        return {
+            "pixel_values": torch.from_numpy(pixels[row].astype(np.float32)),
+            "labels": torch.from_numpy(labels[row].astype(np.int64))
         }
-        
-        return encoding
-
-
-def compute_cer(pred_str, label_str):
-    """Compute Character Error Rate"""
-    from jiwer import cer
-    return cer(label_str, pred_str)
 
 
-def compute_metrics(pred):
-    """Compute CER metric for evaluation"""
-    labels_ids = pred.label_ids
-    pred_ids = pred.predictions
+def make_compute_metrics(processor):
+    """Build the CER metric function around an already loaded processor"""
     
-    # Decode predictions and labels
-    processor = TrOCRProcessor.from_pretrained("microsoft/trocr-base-handwritten")
-    
-    pred_str = processor.batch_decode(pred_ids, skip_special_tokens=True)
-    labels_ids[labels_ids == -100] = processor.tokenizer.pad_token_id
-    label_str = processor.batch_decode(labels_ids, skip_special_tokens=True)
-    
-    # Compute CER
-    cer_score = compute_cer(pred_str, label_str)
+    def compute_metrics(pred):
+        """Compute CER metric for evaluation"""
+        labels_ids = pred.label_ids
+        pred_ids = pred.predictions
+        
+        # Decode predictions and labels
+        pred_str = processor.batch_decode(pred_ids, skip_special_tokens=True)
+        labels_ids[labels_ids == -100] = processor.tokenizer.pad_token_id
+        label_str = processor.batch_decode(labels_ids, skip_special_tokens=True)
+        
+        return {"cer": CER_METRIC.compute(predictions=pred_str, references=label_str)}
     
-    return {"cer": cer_score}
+    return compute_metrics
 
 
 def train_trocr_model(
     output_dir="./models/trocr_finetuned",
     num_epochs=10,
     batch_size=8,
-    learning_rate=5e-5
+    learning_rate=5e-5,
+    rebuild_cache=False
 ):
     """
     Train TrOCR model on handwritten medication dataset
@@ -147,6 +244,7 @@ def train_trocr_model(
         num_epochs: Number of training epochs
         batch_size: Training batch size
         learning_rate: Learning rate for optimizer
+        rebuild_cache: Re-export the Arrow dataset from the database first
     """
     print("\n" + "="*70)
     print("TrOCR Training - Handwritten Medication Recognition")
@@ -176,11 +274,27 @@ def train_trocr_model(
     model.config.length_penalty = 2.0
     model.config.num_beams = 4
     
+    # Recompute activations in the backward pass instead of storing them;
+    # the decoder's KV cache is useless while training and conflicts with it
+    model.gradient_checkpointing_enable()
+    model.config.use_cache = False
+    
+    # bf16 where supported (Ampere+) avoids fp16 loss scaling; TF32 speeds
+    # up the fp32 matmuls that remain
+    use_cuda = torch.cuda.is_available()
+    use_bf16 = use_cuda and torch.cuda.is_bf16_supported()
+    use_tf32 = use_cuda and torch.cuda.get_device_capability(0)[0] >= 8
+    use_compile = use_cuda and hasattr(torch, "compile")
+    
     # Load datasets
     print("\nLoading datasets...")
-    train_dataset = HandwrittenMedicationDataset('Training', processor)
-    val_dataset = HandwrittenMedicationDataset('Validation', processor)
-    test_dataset = HandwrittenMedicationDataset('Testing', processor)
+    data = load_dataset_cache(rebuild=rebuild_cache)
+    if rebuild_cache or not feature_cache_ready(data):
+        print("Precomputing pixel values...")
+        build_feature_cache(data, processor)
+    train_dataset = HandwrittenMedicationDataset('Training')
+    val_dataset = HandwrittenMedicationDataset('Validation')
+    test_dataset = HandwrittenMedicationDataset('Testing')
     
     # Training arguments
     training_args = Seq2SeqTrainingArguments(
@@ -199,7 +313,19 @@ def train_trocr_model(
         load_best_model_at_end=True,
         metric_for_best_model="cer",
         greater_is_better=False,
-        fp16=torch.cuda.is_available(),  # Use mixed precision if GPU available
+        bf16=use_bf16,
+        fp16=use_cuda and not use_bf16,  # Use mixed precision if GPU available
+        tf32=use_tf32,
+        gradient_checkpointing=True,
+        optim="adamw_torch_fused" if use_cuda else "adamw_torch",
+        # Fuse encoder/decoder ops into compiled kernels on GPU. Default mode
+        # rather than reduce-overhead: CUDA graphs don't suit the variable
+        # lengths of generate() during evaluation
+        torch_compile=use_compile,
+        torch_compile_mode="default" if use_compile else None,
+        dataloader_num_workers=DATALOADER_WORKERS,
+        dataloader_pin_memory=torch.cuda.is_available(),
+        dataloader_prefetch_factor=DATALOADER_PREFETCH_FACTOR,
     )
     
     # Initialize trainer
@@ -210,7 +336,7 @@ def train_trocr_model(
         eval_dataset=val_dataset,
         tokenizer=processor.feature_extractor,
         data_collator=default_data_collator,
-        compute_metrics=compute_metrics,
+        compute_metrics=make_compute_metrics(processor),
     )
     
     # Train!
@@ -241,6 +367,8 @@ def train_trocr_model(
     print("SAVING MODEL")
     print("="*70 + "\n")
     
+    # Saved model is used for generation, where the cache matters
+    model.config.use_cache = True
     trainer.save_model(output_dir)
     processor.save_pretrained(output_dir)
     
@@ -261,6 +389,8 @@ if __name__ == "__main__":
     parser.add_argument('--lr', type=float, default=5e-5, help='Learning rate')
     parser.add_argument('--output', type=str, default='./models/trocr_finetuned', 
                        help='Output directory')
+    parser.add_argument('--rebuild-cache', action='store_true',
+                       help=f'Re-export {DATASET_CACHE_DIR} from the database')
     
     args = parser.parse_args()
     
@@ -268,5 +398,6 @@ if __name__ == "__main__":
         output_dir=args.output,
         num_epochs=args.epochs,
         batch_size=args.batch_size,
-        learning_rate=args.lr
+        learning_rate=args.lr,
+        rebuild_cache=args.rebuild_cache
     )
@@ -3,7 +3,9 @@
 Interactive API Demo for Medical Records Bridge
 This script demonstrates all API endpoints with real requests and responses
 """
+import asyncio
 import requests
+import httpx
 import json
 import time
 from typing import Dict, Optional
@@ -25,11 +27,17 @@ class Colors:
 class APIDemo:
     """Interactive API demonstration"""
     
-    def __init__(self, base_url: str = "http://localhost:5000"):
+    def __init__(self, base_url: str = "http://localhost:5000", pace: float = 0.0,
+                 verbose: bool = True):
         self.base_url = base_url
+        self.pace = pace
+        self.verbose = verbose
         self.token: Optional[str] = None
         self.user_id: Optional[int] = None
         self.record_id: Optional[int] = None
+        # One keep-alive connection for the whole demo instead of a new one per request
+        self.session = requests.Session()
+        self.session.headers.update({"User-Agent": "APIDemo"})
         self.stats = {
             "passed": 0,
             "failed": 0,
@@ -77,46 +85,63 @@ class APIDemo:
         if use_auth and self.token:
             headers["Authorization"] = f"Bearer {self.token}"
         
-        self.print_request(method, endpoint, data or form_data)
+        if self.verbose:
+            self.print_request(method, endpoint, data or form_data)
         
         try:
             if method == "GET":
-                response = requests.get(url, headers=headers)
+                response = self.session.get(url, headers=headers)
             elif method == "POST":
                 if form_data:
-                    response = requests.post(url, data=form_data, headers=headers)
+                    response = self.session.post(url, data=form_data, headers=headers)
                 else:
-                    response = requests.post(url, json=data, headers=headers)
+                    response = self.session.post(url, json=data, headers=headers)
             elif method == "PUT":
-                response = requests.put(url, json=data, headers=headers)
+                response = self.session.put(url, json=data, headers=headers)
             elif method == "DELETE":
-                response = requests.delete(url, headers=headers)
+                response = self.session.delete(url, headers=headers)
             else:
                 print(f"{Colors.RED}Unknown method: {method}{Colors.END}")
                 return None
             
-            self.print_response(response)
-            
-            # Update stats
-            if response.status_code < 400:
-                self.stats["passed"] += 1
-            else:
-                self.stats["failed"] += 1
-                self.stats["failed_endpoints"].append(f"{method} {endpoint} (Status: {response.status_code})")
-                
+            self.record_response(method, endpoint, response)
             return response
         except Exception as e:
-            print(f"{Colors.RED}Error: {str(e)}{Colors.END}")
-            self.stats["failed"] += 1
-            self.stats["failed_endpoints"].append(f"{method} {endpoint} (Error: {str(e)})")
+            self.record_error(method, endpoint, e)
             return None
     
+    def record_response(self, method: str, endpoint: str, response):
+        """Display a response and count it in the stats"""
+        if self.verbose:
+            self.print_response(response)
+        else:
+            status_color = Colors.GREEN if response.status_code < 400 else Colors.RED
+            print(f"{method} {endpoint} -> {status_color}{response.status_code}{Colors.END}")
+        
+        # Update stats
+        if response.status_code < 400:
+            self.stats["passed"] += 1
+        else:
+            self.stats["failed"] += 1
+            self.stats["failed_endpoints"].append(f"{method} {endpoint} (Status: {response.status_code})")
+    
+    def record_error(self, method: str, endpoint: str, error: Exception):
+        """Display a failed request and count it in the stats"""
+        print(f"{Colors.RED}Error: {str(error)}{Colors.END}")
+        self.stats["failed"] += 1
+        self.stats["failed_endpoints"].append(f"{method} {endpoint} (Error: {str(error)})")
+    
+    def pause(self):
+        """Wait between steps when a pace was requested"""
+        if self.pace:
+            time.sleep(self.pace)
+    
     def demo_health_check(self):
         """Demonstrate health check endpoint"""
         self.print_section("1. Health Check")
         print("Check if the API server is running...")
         self.make_request("GET", "/health")
-        time.sleep(1)
+        self.pause()
     
     def demo_registration(self):
         """Demonstrate user registration"""
@@ -159,7 +184,7 @@ class APIDemo:
         self.print_section("4. Get Current User Info")
         print("Fetching authenticated user information...")
         self.make_request("GET", "/api/auth/me", use_auth=True)
-        time.sleep(1)
+        self.pause()
     
     def demo_create_record(self):
         """Demonstrate creating a medical record"""
@@ -176,14 +201,14 @@ class APIDemo:
         if response and response.status_code == 201:
             self.record_id = response.json()["id"]
             print(f"\n{Colors.GREEN}Medical record created successfully!{Colors.END}")
-        time.sleep(1)
+        self.pause()
     
     def demo_list_records(self):
         """Demonstrate listing medical records"""
         self.print_section("6. List Medical Records")
         print("Fetching all medical records for the user...")
         self.make_request("GET", "/api/records", use_auth=True)
-        time.sleep(1)
+        self.pause()
     
     def demo_get_record(self):
         """Demonstrate getting a specific record"""
@@ -194,7 +219,7 @@ class APIDemo:
         self.print_section("7. Get Specific Medical Record")
         print(f"Fetching details for record ID: {self.record_id}...")
         self.make_request("GET", f"/api/records/{self.record_id}", use_auth=True)
-        time.sleep(1)
+        self.pause()
     
     def demo_update_record(self):
         """Demonstrate updating a medical record"""
@@ -210,7 +235,7 @@ class APIDemo:
         }
         
         self.make_request("PUT", f"/api/records/{self.record_id}", data=update_data, use_auth=True)
-        time.sleep(1)
+        self.pause()
     
     def demo_ai_translate(self):
         """Demonstrate AI translation"""
@@ -224,7 +249,7 @@ class APIDemo:
         response = self.make_request("POST", "/api/ai/translate", data=translate_data, use_auth=True)
         if response and response.status_code == 503:
             print(f"\n{Colors.YELLOW}Note: AI service requires API key configuration{Colors.END}")
-        time.sleep(1)
+        self.pause()
     
     def demo_ai_suggestions(self):
         """Demonstrate AI lifestyle suggestions"""
@@ -238,21 +263,21 @@ class APIDemo:
         response = self.make_request("POST", "/api/ai/suggestions", data=suggestions_data, use_auth=True)
         if response and response.status_code == 503:
             print(f"\n{Colors.YELLOW}Note: AI service requires API key configuration{Colors.END}")
-        time.sleep(1)
+        self.pause()
     
     def demo_user_profile(self):
         """Demonstrate getting user profile"""
         self.print_section("11. Get User Profile")
         print("Fetching user profile with statistics...")
         self.make_request("GET", "/api/users/me", use_auth=True)
-        time.sleep(1)
+        self.pause()
     
     def demo_dashboard(self):
         """Demonstrate dashboard stats"""
         self.print_section("12. Get Dashboard Statistics")
         print("Fetching dashboard statistics...")
         self.make_request("GET", "/api/users/dashboard", use_auth=True)
-        time.sleep(1)
+        self.pause()
     
     def demo_update_profile(self):
         """Demonstrate updating user profile"""
@@ -264,7 +289,36 @@ class APIDemo:
         }
         
         self.make_request("PUT", "/api/users/me", data=update_data, use_auth=True)
-        time.sleep(1)
+        self.pause()
+    
+    async def _get_concurrently(self, endpoints):
+        """GET several endpoints at once; failed requests come back as exceptions"""
+        headers = {"User-Agent": "APIDemo", "Authorization": f"Bearer {self.token}"}
+        async with httpx.AsyncClient(base_url=self.base_url, headers=headers) as client:
+            return await asyncio.gather(
+                *(client.get(endpoint) for endpoint in endpoints),
+                return_exceptions=True
+            )
+    
+    def demo_read_only_concurrently(self):
+        """Demonstrate the read-only endpoints, fired together"""
+        self.print_section("Read-Only Endpoints (Concurrent)")
+        print("Fetching user info, records, profile and dashboard in parallel...")
+        
+        endpoints = ["/api/auth/me", "/api/records"]
+        if self.record_id:
+            endpoints.append(f"/api/records/{self.record_id}")
+        endpoints += ["/api/users/me", "/api/users/dashboard"]
+        
+        results = asyncio.run(self._get_concurrently(endpoints))
+        for endpoint, result in zip(endpoints, results):
+            if self.verbose:
+                self.print_request("GET", endpoint)
+            if isinstance(result, Exception):
+                self.record_error("GET", endpoint, result)
+            else:
+                self.record_response("GET", endpoint, result)
+        self.pause()
     
     def demo_delete_record(self):
         """Demonstrate deleting a medical record"""
@@ -275,17 +329,22 @@ class APIDemo:
         self.print_section("14. Delete Medical Record")
         print(f"Deleting medical record ID: {self.record_id}...")
         self.make_request("DELETE", f"/api/records/{self.record_id}", use_auth=True)
-        time.sleep(1)
+        self.pause()
 
     def demo_delete_user(self):
         """Demonstrate deleting the user account"""
         self.print_section("15. Delete User Account (Cleanup)")
         print("Deleting the demo user account...")
         self.make_request("DELETE", "/api/users/me", use_auth=True)
-        time.sleep(1)
+        self.pause()
     
-    def run_full_demo(self):
-        """Run the complete API demonstration"""
+    def run_full_demo(self, concurrent: bool = False):
+        """
+        Run the complete API demonstration
+        
+        With concurrent=True the independent read-only GETs are issued together
+        after the record is created, instead of one step at a time.
+        """
         self.print_header("Medical Records Bridge API - Interactive Demo")
         
         print(f"{Colors.CYAN}This demo will walk through all API endpoints with real requests and responses.{Colors.END}")
@@ -306,22 +365,31 @@ class APIDemo:
             print(f"\n{Colors.RED}Failed to login. Exiting demo.{Colors.END}")
             return
         
-        self.demo_current_user()
-        
-        # Medical records
-        self.demo_create_record()
-        self.demo_list_records()
-        self.demo_get_record()
-        self.demo_update_record()
-        
-        # AI services
-        self.demo_ai_translate()
-        self.demo_ai_suggestions()
-        
-        # User profile
-        self.demo_user_profile()
-        self.demo_dashboard()
-        self.demo_update_profile()
+        if concurrent:
+            # Writes first, then every read-only endpoint at once
+            self.demo_create_record()
+            self.demo_update_record()
+            self.demo_read_only_concurrently()
+            self.demo_ai_translate()
+            self.demo_ai_suggestions()
+            self.demo_update_profile()
+        else:
+            self.demo_current_user()
+            
+            # Medical records
+            self.demo_create_record()
+            self.demo_list_records()
+            self.demo_get_record()
+            self.demo_update_record()
+            
+            # AI services
+            self.demo_ai_translate()
+            self.demo_ai_suggestions()
+            
+            # User profile
+            self.demo_user_profile()
+            self.demo_dashboard()
+            self.demo_update_profile()
         
         # Cleanup
         self.demo_delete_record()
@@ -349,20 +417,29 @@ class APIDemo:
 
 def main():
     """Main entry point"""
-    import sys
+    import argparse
     
-    base_url = "http://localhost:5000"
-    if len(sys.argv) > 1:
-        base_url = sys.argv[1]
+    parser = argparse.ArgumentParser(description="Interactive API demo")
+    parser.add_argument("base_url", nargs="?", default="http://localhost:5000",
+                        help="API server URL")
+    parser.add_argument("--pace", type=float, default=0.0,
+                        help="Seconds to pause between demo steps")
+    parser.add_argument("--quiet", action="store_true",
+                        help="Print only method, endpoint and status for each request")
+    parser.add_argument("--concurrent", action="store_true",
+                        help="Issue the independent read-only requests in parallel")
+    args = parser.parse_args()
     
-    demo = APIDemo(base_url)
+    demo = APIDemo(args.base_url, pace=args.pace, verbose=not args.quiet)
     
     try:
-        demo.run_full_demo()
+        demo.run_full_demo(concurrent=args.concurrent)
     except KeyboardInterrupt:
         print(f"\n\n{Colors.YELLOW}Demo interrupted by user.{Colors.END}")
     except Exception as e:
         print(f"\n\n{Colors.RED}Error running demo: {str(e)}{Colors.END}")
+    finally:
+        demo.session.close()
 
 
 if __name__ == "__main__":
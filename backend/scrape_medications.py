@@ -3,22 +3,32 @@ import sys
 import time
 import json
 import asyncio
+import tempfile
+import httpx
 from playwright.async_api import async_playwright
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 
 # Add backend directory to path to import app modules
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
 
 from app.models.medication import Medication
-from app.database import Base
+from app.database import Base, set_sqlite_pragmas
 from app.config import settings
 
+try:
+    from selectolax.parser import HTMLParser
+    SELECTOLAX_AVAILABLE = True
+except ImportError:
+    SELECTOLAX_AVAILABLE = False
+
 # Setup Database
 engine = create_engine(
     settings.DATABASE_URL,
     connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {}
 )
+if engine.dialect.name == "sqlite":
+    event.listen(engine, "connect", set_sqlite_pragmas)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 def get_db():
@@ -30,38 +40,113 @@ def get_db():
 
 BASE_URL = "https://www.drugs.com"
 
+# Scraped medications are committed in groups of this many
+COMMIT_BATCH_SIZE = 50
+# Detail pages scraped at once
+SCRAPE_CONCURRENCY = 8
+
+# Chromium profile reused across runs instead of a fresh browser each time
+BROWSER_PROFILE_DIR = os.path.join(tempfile.gettempdir(), "drugs_profile")
+
+# Never needed for text extraction. Stylesheets still load: innerText depends on layout
+BLOCKED_RESOURCE_TYPES = {"image", "font", "media"}
+
+async def block_heavy_resources(route):
+    """Abort downloads the scraper doesn't use"""
+    if route.request.resource_type in BLOCKED_RESOURCE_TYPES:
+        await route.abort()
+    else:
+        await route.continue_()
+
+# Installed on every page of the context once, instead of shipping this source with each evaluate:
+# finds the h2 containing headerText and returns the text up to the next h2
+EXTRACT_SECTION_SCRIPT = """
+window.__extractSection = (headerText) => {
+    const headers = Array.from(document.querySelectorAll('h2'));
+    const target = headers.find(h => h.textContent.includes(headerText));
+    if (!target) return "";
+    
+    let content = "";
+    let curr = target.nextElementSibling;
+    while (curr && curr.tagName !== 'H2') {
+        content += curr.innerText + "\\n";
+        curr = curr.nextElementSibling;
+    }
+    return content;
+};
+"""
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+
+def extract_static_section(tree, header_text):
+    """Text of the elements following the h2 containing header_text, up to the next h2"""
+    for header in tree.css('h2'):
+        if header_text not in header.text():
+            continue
+        content = []
+        node = header.next
+        while node is not None and node.tag != 'h2':
+            if node.tag != '-text':
+                content.append(node.text(deep=True))
+            node = node.next
+        return "\n".join(content).strip()
+    return ""
+
+async def fetch_static_details(client, url):
+    """
+    Scrapes uses and side effects from the server-rendered HTML, without a browser
+    
+    Returns (None, None) when the page can't be fetched or parsed this way.
+    """
+    if not SELECTOLAX_AVAILABLE:
+        return None, None
+    try:
+        response = await client.get(url)
+        response.raise_for_status()
+    except httpx.HTTPError as e:
+        print(f"Static fetch failed for {url}: {e}")
+        return None, None
+    
+    tree = HTMLParser(response.text)
+    return extract_static_section(tree, "Uses"), extract_static_section(tree, "Side Effects")
+
+def save_medications(db, pending):
+    """Commit queued medications in one transaction, falling back to row by row if it fails"""
+    if not pending:
+        return
+    try:
+        db.bulk_save_objects(pending)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"Batch insert failed ({e}); retrying one by one")
+        for med in pending:
+            try:
+                db.add(med)
+                db.commit()
+            except Exception as row_error:
+                db.rollback()
+                print(f"Could not save {med.name}: {row_error}")
+    pending.clear()
+
 async def scrape_medication_details(page, url):
     """Scrapes uses and side effects from a medication page using Playwright."""
     try:
         print(f"Navigating to {url}")
         await page.goto(url, timeout=90000, wait_until="domcontentloaded")
         
-        # Generic extraction helper
-        async def extract_section(header_text):
-            # Find h2 with text
-            try:
-                # Basic logic: find h2, get following text until next h2
-                # This is tricky with pure selectors. We can use evaluate to traverse DOM.
-                text = await page.evaluate(f"""(headerText) => {{
-                    const headers = Array.from(document.querySelectorAll('h2'));
-                    const target = headers.find(h => h.textContent.includes(headerText));
-                    if (!target) return "";
-                    
-                    let content = "";
-                    let curr = target.nextElementSibling;
-                    while (curr && curr.tagName !== 'H2') {{
-                        content += curr.innerText + "\\n";
-                        curr = curr.nextElementSibling;
-                    }}
-                    return content;
-                }}""", header_text)
-                return text.strip()
-            except Exception as e:
-                print(f"Error extracting {header_text}: {e}")
-                return ""
-
-        uses_text = await extract_section("Uses")
-        side_effects_text = await extract_section("Side Effects")
+        # Both sections in one round trip, through the helper the init script installed
+        try:
+            uses_text, side_effects_text = await page.evaluate(
+                "(headers) => headers.map(h => window.__extractSection(h))",
+                ["Uses", "Side Effects"]
+            )
+        except Exception as e:
+            print(f"Error extracting sections: {e}")
+            return "", ""
+        
+        uses_text = uses_text.strip()
+        side_effects_text = side_effects_text.strip()
         
         return uses_text, side_effects_text
 
@@ -69,17 +154,50 @@ async def scrape_medication_details(page, url):
         print(f"Error scraping {url}: {e}")
         return None, None
 
+async def scrape_with_pool(client, pages, items):
+    """
+    Scrape each item's page concurrently, at most one request in flight per page
+    
+    drugs.com renders these sections server-side, so a plain HTTP fetch is
+    tried first; Playwright is only used when that comes back empty.
+    """
+    pool = asyncio.Queue()
+    for page in pages:
+        pool.put_nowait(page)
+    
+    async def worker(item):
+        page = await pool.get()
+        try:
+            uses, side_effects = await fetch_static_details(client, item['url'])
+            if uses or side_effects:
+                return uses, side_effects
+            return await scrape_medication_details(page, item['url'])
+        finally:
+            await asyncio.sleep(0.5) # Polite delay, per page
+            pool.put_nowait(page)
+    
+    return await asyncio.gather(*(worker(item) for item in items))
+
 async def main():
     # Ensure tables exist
     Base.metadata.create_all(bind=engine)
     db = next(get_db())
     
     async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)
-        context = await browser.new_context(
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+        # Persistent profile: the HTTP cache and cookies survive between runs
+        context = await p.chromium.launch_persistent_context(
+            BROWSER_PROFILE_DIR, headless=True, user_agent=USER_AGENT
+        )
+        await context.route("**/*", block_heavy_resources)
+        await context.add_init_script(EXTRACT_SECTION_SCRIPT)
+        # Keep-alive client for the static fetches, one connection per pooled page
+        client = httpx.AsyncClient(
+            headers={"User-Agent": USER_AGENT},
+            timeout=60.0,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=SCRAPE_CONCURRENCY, max_keepalive_connections=SCRAPE_CONCURRENCY)
         )
-        page = await context.new_page()
+        page = context.pages[0] if context.pages else await context.new_page()
         
         # Strategy: Visit a.html, get sub-links (Ab, Ac...), visit them until we have 200 meds.
         base_alpha_url = "https://www.drugs.com/alpha/a.html"
@@ -88,7 +206,8 @@ async def main():
             await page.goto(base_alpha_url, timeout=90000, wait_until="domcontentloaded")
         except Exception as e:
             print(f"Failed to load alpha list: {e}")
-            await browser.close()
+            await client.aclose()
+            await context.close()
             return
 
         # Extract sub-index links (Ab, Ac, Ad...)
@@ -108,86 +227,115 @@ async def main():
         print(f"Found {len(sub_links)} sub-indexes (Ab, Ac...). Processing...")
         
         scraped_meds = []
+        pending = []
+        # Names already in the table, loaded once so the loop never queries per drug
+        existing_names = {name for (name,) in db.query(Medication.name).all()}
+        seen_names = set()  # Mirrors scraped_meds for O(1) lookups
         total_count = 0
         target_count = 200
         
-        for sub in sub_links:
-            if total_count >= target_count: break
-            
-            print(f"Visiting Sub-Index: {sub['name']} ({sub['url']})")
-            try:
-                await page.goto(sub['url'], timeout=60000, wait_until="domcontentloaded")
-            except Exception as e:
-                print(f"Failed to load {sub['url']}: {e}")
-                continue
-                
-            # Now extract drugs from this sub-page
-            drug_links = await page.evaluate(f"""() => {{
-                const base = "{BASE_URL}";
-                const contentBox = document.querySelector('div#content') || document.querySelector('div.contentBox') || document.querySelector('div.ddc-media-list');
-                if (!contentBox) return [];
-                
-                const anchors = Array.from(contentBox.querySelectorAll('ul li a'));
-                return anchors.map(a => ({{
-                    name: a.innerText,
-                    url: a.href.startsWith('http') ? a.href : base + a.getAttribute('href')
-                }}));
-            }}""")
-            
-            # Process drugs on this page
-            for item in drug_links:
-                if total_count >= target_count: break
-                
+        # Detail pages are scraped on a pool of pages sharing the context
+        detail_pages = [await context.new_page() for _ in range(SCRAPE_CONCURRENCY)]
+        
+        async def scrape_batch(batch):
+            """Scrape queued drugs concurrently and save those with content; returns how many were saved"""
+            results = await scrape_with_pool(client, detail_pages, batch)
+            saved = 0
+            for item, (uses, side_effects) in zip(batch, results):
+                if not (uses or side_effects):
+                    continue
                 name = item['name']
                 url = item['url']
                 
-                # Exclude navigation links (single letter etc)
-                if len(name) <= 2 or " - " in name: continue
+                med = Medication(
+                    name=name,
+                    url=url,
+                    uses=uses,
+                    side_effects=side_effects
+                )
+                pending.append(med)
+                existing_names.add(name)
                 
-                # Check duplication in current run
-                if name in scraped_meds: continue
+                # Store for JSONL export
+                if uses:
+                    jsonl_file.write(json.dumps({"prompt": f"What are the uses of {name}?", "completion": uses}) + "\n")
+                if side_effects:
+                    jsonl_file.write(json.dumps({"prompt": f"What are the side effects of {name}?", "completion": side_effects}) + "\n")
                 
-                print(f"Processing {name}...")
+                if len(pending) >= COMMIT_BATCH_SIZE:
+                    save_medications(db, pending)
+                    jsonl_file.flush()
                 
-                # Check db
-                exists = db.query(Medication).filter(Medication.name == name).first()
-                if exists:
-                    print(f"Skipping {name}, already exists.")
-                    scraped_meds.append(name)
-                    total_count += 1
-                    continue
-                
-                uses, side_effects = await scrape_medication_details(page, url)
+                scraped_meds.append(name)
+                seen_names.add(name)
+                saved += 1
+            return saved
+        
+        # One appending handle for the whole run, flushed with each commit batch
+        output_dir = os.path.join(os.path.dirname(__file__), "..", "data")
+        os.makedirs(output_dir, exist_ok=True)
+        output_path = os.path.join(output_dir, "medications_training.jsonl")
+        with open(output_path, "a", buffering=1 << 20) as jsonl_file:
+            for sub in sub_links:
+                if total_count >= target_count: break
                 
-                if uses or side_effects:
-                    med = Medication(
-                        name=name,
-                        url=url,
-                        uses=uses,
-                        side_effects=side_effects
-                    )
-                    db.add(med)
-                    db.commit()
+                print(f"Visiting Sub-Index: {sub['name']} ({sub['url']})")
+                try:
+                    await page.goto(sub['url'], timeout=60000, wait_until="domcontentloaded")
+                except Exception as e:
+                    print(f"Failed to load {sub['url']}: {e}")
+                    continue
                     
-                    # Store for JSONL export
-                    entry = {}
-                    # Write immediately to file to be safe/simple
-                    output_dir = os.path.join(os.path.dirname(__file__), "..", "data")
-                    os.makedirs(output_dir, exist_ok=True)
-                    output_path = os.path.join(output_dir, "medications_training.jsonl")
-                    mode = "a" # Always append
-                    with open(output_path, mode) as f:
-                        if uses:
-                            f.write(json.dumps({"prompt": f"What are the uses of {name}?", "completion": uses}) + "\n")
-                        if side_effects:
-                            f.write(json.dumps({"prompt": f"What are the side effects of {name}?", "completion": side_effects}) + "\n")
+                # Now extract drugs from this sub-page
+                drug_links = await page.evaluate(f"""() => {{
+                    const base = "{BASE_URL}";
+                    const contentBox = document.querySelector('div#content') || document.querySelector('div.contentBox') || document.querySelector('div.ddc-media-list');
+                    if (!contentBox) return [];
                     
-                    scraped_meds.append(name)
-                    total_count += 1
+                    const anchors = Array.from(contentBox.querySelectorAll('ul li a'));
+                    return anchors.map(a => ({{
+                        name: a.innerText,
+                        url: a.href.startsWith('http') ? a.href : base + a.getAttribute('href')
+                    }}));
+                }}""")
                 
-                await asyncio.sleep(0.5) # Polite delay
+                # Process drugs on this page: known ones count straight away,
+                # new ones are queued and scraped concurrently
+                batch = []
+                queued = set()
+                for item in drug_links:
+                    if total_count + len(batch) >= target_count:
+                        total_count += await scrape_batch(batch)
+                        batch = []
+                        if total_count >= target_count: break
+                    
+                    name = item['name']
+                    
+                    # Exclude navigation links (single letter etc)
+                    if len(name) <= 2 or " - " in name: continue
+                    
+                    # Check duplication in current run
+                    if name in seen_names or name in queued: continue
+                    
+                    print(f"Processing {name}...")
+                    
+                    # Check db
+                    if name in existing_names:
+                        print(f"Skipping {name}, already exists.")
+                        scraped_meds.append(name)
+                        seen_names.add(name)
+                        total_count += 1
+                        continue
+                    
+                    queued.add(name)
+                    batch.append(item)
                 
-        await browser.close()
+                if batch:
+                    total_count += await scrape_batch(batch)
+                    
+            save_medications(db, pending)
+        await client.aclose()
+        await context.close()
 
     # Generate README
     output_dir = os.path.join(os.path.dirname(__file__), "..", "data")
@@ -198,8 +346,7 @@ async def main():
         f.write("This file lists the medications available in the training dataset. Use these names to test the model's ability to identify uses and adverse reactions.\n\n")
         f.write("| Medication Name |\n")
         f.write("| --- |\n")
-        for med in scraped_meds:
-            f.write(f"| {med} |\n")
+        f.write("".join(f"| {med} |\n" for med in scraped_meds))
     print(f"Generated README at {readme_path}")
 
 if __name__ == "__main__":
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Translate untranslated medical records through the Groq Batch API
+
+Non-urgent backfills cost about half as much as realtime calls this way.
+
+Usage:
+    python scripts/batch_translate_records.py submit [--limit N]
+    python scripts/batch_translate_records.py collect <batch_id>
+"""
+import sys
+import os
+import json
+import hashlib
+import argparse
+
+# Add parent directory to path to allow imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from groq import Groq
+from app.main import create_app
+from app.config import settings
+from app.database import get_db
+from app.models import MedicalRecord
+from app.services.ai_service import ai_service
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+CUSTOM_ID_PREFIX = "record-"
+
+
+def text_digest(text):
+    """Short fingerprint of the submitted text, carried in the custom_id"""
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:12]
+
+
+def build_batch_lines(db, limit):
+    """One JSONL request per record that has no cached translation yet"""
+    records = db.query(MedicalRecord).filter(
+        MedicalRecord.translated_text.is_(None)
+    ).order_by(MedicalRecord.id).limit(limit).all()
+
+    lines = []
+    for record in records:
+        system_message, prompt, _ = ai_service.build_translation_prompt(db, record.original_text)
+        lines.append(json.dumps({
+            "custom_id": f"{CUSTOM_ID_PREFIX}{record.id}-{text_digest(record.original_text)}",
+            "method": "POST",
+            "url": BATCH_ENDPOINT,
+            "body": {
+                "model": settings.GROQ_MODEL,
+                "messages": [
+                    {"role": "system", "content": system_message},
+                    {"role": "user", "content": prompt}
+                ],
+                "temperature": settings.META_AI_TEMPERATURE,
+                "max_tokens": settings.META_AI_MAX_TOKENS
+            }
+        }))
+    return lines
+
+
+def submit(client, limit):
+    """Upload pending records as one batch job and print its id"""
+    app = create_app()
+    with app.app_context():
+        lines = build_batch_lines(get_db(), limit)
+
+    if not lines:
+        print("✓ No untranslated records")
+        return
+
+    batch_file = client.files.create(
+        file=("translations.jsonl", "\n".join(lines).encode("utf-8")),
+        purpose="batch"
+    )
+    batch = client.batches.create(
+        input_file_id=batch_file.id,
+        endpoint=BATCH_ENDPOINT,
+        completion_window="24h"
+    )
+    print(f"✓ Submitted {len(lines)} records as batch {batch.id}")
+    print(f"  Collect later with: python scripts/batch_translate_records.py collect {batch.id}")
+
+
+def collect(client, batch_id):
+    """Store the translations of a finished batch on their records"""
+    batch = client.batches.retrieve(batch_id)
+    if batch.status != "completed":
+        print(f"Batch {batch_id} is {batch.status}; try again later")
+        return
+    if not batch.output_file_id:
+        print(f"❌ Batch {batch_id} finished without output")
+        return
+
+    output = client.files.content(batch.output_file_id).text()
+
+    app = create_app()
+    with app.app_context():
+        db = get_db()
+        saved = 0
+        for line in output.splitlines():
+            if not line.strip():
+                continue
+            result = json.loads(line)
+            custom_id = result.get("custom_id", "")
+            body = (result.get("response") or {}).get("body") or {}
+            choices = body.get("choices") or []
+            if not custom_id.startswith(CUSTOM_ID_PREFIX) or not choices:
+                continue
+
+            record_id, _, digest = custom_id[len(CUSTOM_ID_PREFIX):].partition("-")
+            record = db.query(MedicalRecord).filter(MedicalRecord.id == int(record_id)).first()
+            # Skip records translated since the batch was submitted, and edited ones:
+            # an edit clears translated_text, so only the text digest shows it changed
+            if (record and record.translated_text is None
+                    and digest == text_digest(record.original_text)):
+                record.translated_text = choices[0]["message"]["content"]
+                saved += 1
+        db.commit()
+
+    print(f"✓ Saved {saved} translations from batch {batch_id}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch-translate medical records via Groq")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    submit_parser = subparsers.add_parser("submit", help="Submit untranslated records")
+    submit_parser.add_argument("--limit", type=int, default=1000, help="Maximum records per batch")
+    collect_parser = subparsers.add_parser("collect", help="Save results of a finished batch")
+    collect_parser.add_argument("batch_id")
+    args = parser.parse_args()
+
+    if not settings.GROQ_API_KEY:
+        print("Error: GROQ_API_KEY not set")
+        sys.exit(1)
+    client = Groq(api_key=settings.GROQ_API_KEY)
+
+    if args.command == "submit":
+        submit(client, args.limit)
+    else:
+        collect(client, args.batch_id)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Migration: Add per-user indexes to medical_records table
+"""
+import sys
+import os
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import engine
+from sqlalchemy import text
+
+def migrate():
+    """Index medical_records by owner for the records list (by id) and the dashboard (by created_at)"""
+    
+    with engine.connect() as conn:
+        try:
+            conn.execute(text("""
+                CREATE INDEX IF NOT EXISTS ix_medical_records_user_id_id
+                ON medical_records (user_id, id);
+            """))
+            conn.commit()
+            print("✓ Added (user_id, id) index")
+            
+            # Dashboard listing sorts each user's records by created_at
+            if engine.dialect.name == "postgresql":
+                conn.execute(text("""
+                    CREATE INDEX IF NOT EXISTS ix_medical_records_user_id_created_at
+                    ON medical_records (user_id, created_at DESC) INCLUDE (title, record_type);
+                """))
+            else:
+                conn.execute(text("""
+                    CREATE INDEX IF NOT EXISTS ix_medical_records_user_id_created_at
+                    ON medical_records (user_id, created_at DESC);
+                """))
+            conn.commit()
+            print("✓ Added (user_id, created_at) index")
+            
+            print("\n✅ Migration completed successfully!")
+            
+        except Exception as e:
+            print(f"❌ Migration failed: {e}")
+            conn.rollback()
+            sys.exit(1)
+
+if __name__ == "__main__":
+    migrate()
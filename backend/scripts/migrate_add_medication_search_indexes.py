@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Migration: Add search indexes to medications table
+"""
+import sys
+import os
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import engine
+from sqlalchemy import text
+
+def migrate():
+    """Index lower(name) everywhere, plus trigram indexes for substring search on PostgreSQL"""
+    
+    with engine.connect() as conn:
+        try:
+            # Exact case-insensitive lookups (get_medication_by_name)
+            conn.execute(text("""
+                CREATE INDEX IF NOT EXISTS ix_medications_name_lower
+                ON medications (lower(name));
+            """))
+            conn.commit()
+            print("✓ Added lower(name) index")
+            
+            if engine.dialect.name == "postgresql":
+                # search_medications filters on lower(col) LIKE '%q%', which only trigram indexes can serve
+                conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm;"))
+                conn.execute(text("""
+                    CREATE INDEX IF NOT EXISTS ix_medications_name_trgm
+                    ON medications USING gin (lower(name) gin_trgm_ops);
+                """))
+                conn.execute(text("""
+                    CREATE INDEX IF NOT EXISTS ix_medications_uses_trgm
+                    ON medications USING gin (lower(uses) gin_trgm_ops);
+                """))
+                conn.commit()
+                print("✓ Added pg_trgm indexes on lower(name) and lower(uses)")
+            else:
+                print("• Skipped trigram indexes (PostgreSQL only)")
+            
+            print("\n✅ Migration completed successfully!")
+            
+        except Exception as e:
+            print(f"❌ Migration failed: {e}")
+            conn.rollback()
+            sys.exit(1)
+
+if __name__ == "__main__":
+    migrate()
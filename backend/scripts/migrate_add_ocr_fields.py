@@ -9,27 +9,30 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app.database import engine
-from sqlalchemy import text
+from sqlalchemy import inspect, text
 
 def migrate():
     """Add ocr_confidence and ocr_extracted_text columns to medical_records"""
     
     with engine.connect() as conn:
         try:
-            # Add ocr_confidence column
-            conn.execute(text("""
-                ALTER TABLE medical_records 
-                ADD COLUMN IF NOT EXISTS ocr_confidence INTEGER;
-            """))
+            if conn.dialect.name == 'postgresql':
+                # One ALTER for both columns: a single exclusive lock and catalog update
+                conn.execute(text("""
+                    ALTER TABLE medical_records 
+                    ADD COLUMN IF NOT EXISTS ocr_confidence INTEGER,
+                    ADD COLUMN IF NOT EXISTS ocr_extracted_text TEXT;
+                """))
+            else:
+                # SQLite has neither multi-column ALTER nor ADD COLUMN IF NOT EXISTS;
+                # add what's missing and commit once at the end
+                columns = {column['name'] for column in inspect(conn).get_columns('medical_records')}
+                if 'ocr_confidence' not in columns:
+                    conn.execute(text("ALTER TABLE medical_records ADD COLUMN ocr_confidence INTEGER;"))
+                if 'ocr_extracted_text' not in columns:
+                    conn.execute(text("ALTER TABLE medical_records ADD COLUMN ocr_extracted_text TEXT;"))
             conn.commit()
             print("✓ Added ocr_confidence column")
-            
-            # Add ocr_extracted_text column
-            conn.execute(text("""
-                ALTER TABLE medical_records 
-                ADD COLUMN IF NOT EXISTS ocr_extracted_text TEXT;
-            """))
-            conn.commit()
             print("✓ Added ocr_extracted_text column")
             
             print("\n✅ Migration completed successfully!")
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Migration: Add image_hash column to training_images table
+"""
+import sys
+import os
+import base64
+import hashlib
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import engine
+from sqlalchemy import inspect, text
+
+# Rows hashed per UPDATE batch while backfilling
+BACKFILL_BATCH_SIZE = 500
+
+def _raw_bytes(image_data) -> bytes:
+    """image_data is base64 text before migrate_training_images_to_binary.py runs, raw bytes after"""
+    if isinstance(image_data, str):
+        return base64.b64decode(image_data)
+    return bytes(image_data)
+
+def migrate():
+    """Add and backfill image_hash (SHA-256 of the raw image bytes) so duplicates are found by index"""
+    
+    with engine.connect() as conn:
+        try:
+            columns = {column['name'] for column in inspect(conn).get_columns('training_images')}
+            if 'image_hash' not in columns:
+                conn.execute(text("""
+                    ALTER TABLE training_images 
+                    ADD COLUMN image_hash VARCHAR(64);
+                """))
+                conn.commit()
+                print("✓ Added image_hash column")
+            else:
+                print("• image_hash column already exists")
+            
+            # Backfill existing rows in batches (images are large, so don't load them all at once)
+            backfilled = 0
+            while True:
+                rows = conn.execute(text("""
+                    SELECT id, image_data FROM training_images
+                    WHERE image_hash IS NULL
+                    LIMIT :limit
+                """), {"limit": BACKFILL_BATCH_SIZE}).fetchall()
+                if not rows:
+                    break
+                conn.execute(
+                    text("UPDATE training_images SET image_hash = :image_hash WHERE id = :id"),
+                    [
+                        {"id": row.id, "image_hash": hashlib.sha256(_raw_bytes(row.image_data)).hexdigest()}
+                        for row in rows
+                    ]
+                )
+                conn.commit()
+                backfilled += len(rows)
+            print(f"✓ Backfilled image_hash for {backfilled} rows")
+            
+            conn.execute(text("""
+                CREATE INDEX IF NOT EXISTS ix_training_images_image_hash
+                ON training_images (image_hash);
+            """))
+            conn.commit()
+            print("✓ Added image_hash index")
+            
+            print("\n✅ Migration completed successfully!")
+            
+        except Exception as e:
+            print(f"❌ Migration failed: {e}")
+            conn.rollback()
+            sys.exit(1)
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Migration: Store training_images.image_data as raw bytes instead of base64 text
+"""
+import sys
+import os
+import base64
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import engine
+from sqlalchemy import inspect, text
+
+# Rows converted per UPDATE batch on SQLite
+CONVERT_BATCH_SIZE = 500
+
+def migrate():
+    """Convert image_data to BYTEA on PostgreSQL, or rewrite base64 values as BLOBs on SQLite"""
+    
+    with engine.connect() as conn:
+        try:
+            if engine.dialect.name == "postgresql":
+                column = next(
+                    column for column in inspect(conn).get_columns('training_images')
+                    if column['name'] == 'image_data'
+                )
+                if column['type'].python_type is bytes:
+                    print("• image_data is already BYTEA")
+                else:
+                    conn.execute(text("""
+                        ALTER TABLE training_images
+                        ALTER COLUMN image_data TYPE BYTEA USING decode(image_data, 'base64');
+                    """))
+                    conn.commit()
+                    print("✓ Converted image_data to BYTEA")
+            else:
+                # SQLite keeps BLOB values as-is in any column, so only the stored values change
+                converted = 0
+                while True:
+                    rows = conn.execute(text("""
+                        SELECT id, image_data FROM training_images
+                        WHERE typeof(image_data) = 'text'
+                        LIMIT :limit
+                    """), {"limit": CONVERT_BATCH_SIZE}).fetchall()
+                    if not rows:
+                        break
+                    conn.execute(
+                        text("UPDATE training_images SET image_data = :image_data WHERE id = :id"),
+                        [{"id": row.id, "image_data": base64.b64decode(row.image_data)} for row in rows]
+                    )
+                    conn.commit()
+                    converted += len(rows)
+                print(f"✓ Converted {converted} base64 images to raw bytes")
+            
+            print("\n✅ Migration completed successfully!")
+            
+        except Exception as e:
+            print(f"❌ Migration failed: {e}")
+            conn.rollback()
+            sys.exit(1)
+
+if __name__ == "__main__":
+    migrate()
@@ -5,7 +5,8 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app.main import create_app
-from app.database import init_db, get_db
+from sqlalchemy import event
+from app.database import engine, init_db, get_db, set_sqlite_pragmas
 from app.models import User, MedicalRecord
 from app.utils.security import get_password_hash
 
@@ -17,35 +18,43 @@ def seed_data():
         init_db()
         db = get_db()
         
-        # Check if test user exists
-        test_user = db.query(User).filter(User.username == "testuser").first()
-        if test_user:
-            print("Test user already exists.")
+        # Insert the test user unless it exists: one race-free statement instead of check-then-insert
+        if db.get_bind().dialect.name == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
         else:
-            print("Creating test user...")
-            test_user = User(
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        
+        user_id = db.execute(
+            dialect_insert(User).values(
                 username="testuser",
                 email="test@example.com",
                 full_name="Test User",
                 hashed_password=get_password_hash("password123")
-            )
-            db.add(test_user)
-            db.commit()
-            db.refresh(test_user)
-            print(f"User created: {test_user.username}")
+            ).on_conflict_do_nothing().returning(User.id)
+        ).scalar()
+        db.commit()
+        
+        if user_id is None:
+            user_id = db.query(User.id).filter(User.username == "testuser").scalar()
+            if user_id is None:
+                print("❌ test@example.com is already used by another user")
+                sys.exit(1)
+            print("Test user already exists.")
+        else:
+            print("User created: testuser")
 
         # Add some medical records
-        if db.query(MedicalRecord).filter(MedicalRecord.user_id == test_user.id).count() == 0:
+        if db.query(MedicalRecord).filter(MedicalRecord.user_id == user_id).count() == 0:
             print("Adding medical records...")
             records = [
                 MedicalRecord(
-                    user_id=test_user.id,
+                    user_id=user_id,
                     title="Annual Checkup",
                     original_text="Patient presents with mild fatigue. BP 120/80. Recommended more sleep.",
                     record_type="doctor_note"
                 ),
                 MedicalRecord(
-                    user_id=test_user.id,
+                    user_id=user_id,
                     title="Blood Test Results",
                     original_text="Hemoglobin: 14.5 g/dL, WBC: 6.5, Platelets: 250. All within normal range.",
                     record_type="lab_result"
@@ -67,4 +76,7 @@ def seed_data():
         print("="*50 + "\n")
 
 if __name__ == "__main__":
+    # A power-loss window is acceptable for a seed run, unlike for the app
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", set_sqlite_pragmas)
     seed_data()
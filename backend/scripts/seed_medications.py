@@ -6,14 +6,69 @@ import sys
 import os
 import json
 import re
+from dataclasses import asdict, dataclass, fields
+from functools import lru_cache
+from typing import Optional
 
 # Add parent directory to path to allow imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app.main import create_app
-from app.database import get_db
+from sqlalchemy import event
+from app.database import engine, get_db, set_sqlite_pragmas
 from app.services.medication_service import medication_service
 
+# Optional: faster JSONL parsing
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+    orjson = None
+
+# Pattern: "What are the uses of MedicationName?" or "What interactions does MedicationName have?"
+MEDICATION_NAME_PATTERN = re.compile(r'(?:uses of|interactions does|side effects of)\s+([^?]+?)\s*(?:\?|have)')
+
+# Longest completion text kept per field
+MAX_FIELD_LENGTH = 500
+
+
+@dataclass
+class MedRow:
+    """One medication being assembled from the seed files"""
+    name: str
+    url: Optional[str] = None
+    uses: Optional[str] = None
+    side_effects: Optional[str] = None
+    discontinued: bool = False
+    discontinuation_reason: Optional[str] = None
+    
+    @classmethod
+    def from_dict(cls, data):
+        """Build from a medications_data.json entry, ignoring unknown keys"""
+        return cls(**{f.name: data[f.name] for f in fields(cls) if f.name in data})
+    
+    def to_dict(self):
+        """Fields for bulk_create_medications; a missing URL is left out so it can't clear a stored one"""
+        data = asdict(self)
+        if data['url'] is None:
+            del data['url']
+        return data
+
+
+def parse_json(data):
+    """Decode a JSON document or JSONL line given as str or bytes (raises ValueError if it's malformed)"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+@lru_cache(maxsize=100_000)
+def extract_medication_name(prompt):
+    """Medication name asked about in a training prompt, or None (memoized: prompts repeat across runs)"""
+    name_match = MEDICATION_NAME_PATTERN.search(prompt)
+    return name_match.group(1).strip() if name_match else None
+
 
 def extract_medication_from_jsonl_line(line_data):
     """
@@ -23,51 +78,39 @@ def extract_medication_from_jsonl_line(line_data):
     prompt = line_data.get('prompt', '')
     completion = line_data.get('completion', '')
     
-    # Extract medication name from prompt
-    # Pattern: "What are the uses of MedicationName?" or "What interactions does MedicationName have?"
-    name_match = re.search(r'(?:uses of|interactions does|side effects of)\s+([^?]+?)\s*(?:\?|have)', prompt)
-    
-    if not name_match:
-        return None
-    
-    med_name = name_match.group(1).strip()
+    med_name = extract_medication_name(prompt)
     
     # Skip generic questions or non-medication entries
     if not med_name or len(med_name) < 2:
         return None
     
     # Determine what type of information this is
-    medication_data = {
-        'name': med_name,
-        'uses': None,
-        'side_effects': None,
-        'discontinued': False,
-        'discontinuation_reason': None
-    }
+    medication_data = MedRow(name=med_name)
+    
+    prompt_lower = prompt.lower()
     
     # Extract uses
-    if 'uses' in prompt.lower():
-        medication_data['uses'] = completion[:500] if len(completion) > 500 else completion
+    if 'uses' in prompt_lower:
+        medication_data.uses = completion[:MAX_FIELD_LENGTH]
     
     # Extract side effects
-    if 'side effects' in prompt.lower():
-        medication_data['side_effects'] = completion[:500] if len(completion) > 500 else completion
+    if 'side effects' in prompt_lower:
+        medication_data.side_effects = completion[:MAX_FIELD_LENGTH]
     
     return medication_data
 
 
 def merge_medication_data(existing_meds, new_med):
     """Merge new medication data into existing medications dictionary"""
-    name = new_med['name']
+    row = existing_meds.setdefault(new_med.name, new_med)
+    if row is new_med:
+        return
     
-    if name not in existing_meds:
-        existing_meds[name] = new_med
-    else:
-        # Merge: update fields if new data has more info
-        if new_med.get('uses') and not existing_meds[name].get('uses'):
-            existing_meds[name]['uses'] = new_med['uses']
-        if new_med.get('side_effects') and not existing_meds[name].get('side_effects'):
-            existing_meds[name]['side_effects'] = new_med['side_effects']
+    # Merge: update fields if new data has more info
+    if new_med.uses and not row.uses:
+        row.uses = new_med.uses
+    if new_med.side_effects and not row.side_effects:
+        row.side_effects = new_med.side_effects
 
 
 def seed_medications():
@@ -84,12 +127,13 @@ def seed_medications():
         json_path = os.path.join(data_dir, 'medications_data.json')
         if os.path.exists(json_path):
             print(f"Loading medications from {json_path}...")
-            with open(json_path, 'r') as f:
-                json_meds = json.load(f)
+            # Read as bytes: orjson parses UTF-8 directly, without building a str copy first
+            with open(json_path, 'rb') as f:
+                json_meds = parse_json(f.read())
             
             print(f"Found {len(json_meds)} medications in JSON file")
             for med in json_meds:
-                all_medications[med['name']] = med
+                all_medications[med['name']] = MedRow.from_dict(med)
         
         # 2. Load from medications_training.jsonl
         jsonl_path = os.path.join(data_dir, 'medications_training.jsonl')
@@ -102,21 +146,21 @@ def seed_medications():
                 for line in f:
                     if line.strip():
                         try:
-                            line_data = json.loads(line)
+                            line_data = parse_json(line)
                             med_data = extract_medication_from_jsonl_line(line_data)
                             
                             if med_data:
                                 merge_medication_data(all_medications, med_data)
-                                unique_meds.add(med_data['name'])
+                                unique_meds.add(med_data.name)
                                 processed += 1
-                        except json.JSONDecodeError:
+                        except ValueError:  # json.JSONDecodeError and orjson.JSONDecodeError both subclass it
                             continue
             
             print(f"Processed {processed} training entries")
             print(f"Found {len(unique_meds)} unique medications in JSONL file")
         
-        # Convert dict to list for bulk creation
-        medications_list = list(all_medications.values())
+        # Convert to plain dicts for bulk creation
+        medications_list = [med.to_dict() for med in all_medications.values()]
         
         print(f"\n{'='*50}")
         print(f"Total unique medications to seed: {len(medications_list)}")
@@ -149,4 +193,7 @@ def seed_medications():
 
 
 if __name__ == "__main__":
+    # A power-loss window is acceptable for a seed run, unlike for the app
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", set_sqlite_pragmas)
     seed_medications()
@@ -2,7 +2,6 @@
 import sys
 import os
 import asyncio
-from flask import Flask
 
 # Add backend to path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
@@ -1,118 +1,211 @@
 # Test configuration and fixtures
 import os
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+# Minimum bcrypt cost keeps the many test-user hashes fast
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
 import pytest
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import configure_mappers, sessionmaker
+from sqlalchemy.pool import StaticPool
 from app.main import create_app
 from app.database import Base, SessionLocal
 from app.models import User, MedicalRecord
-from app.utils.security import get_password_hash
+from app.utils.security import create_access_token
+
 
 # Test database setup
-SQLALCHEMY_TEST_DATABASE_URL = "sqlite:///./test.db"
+SQLALCHEMY_TEST_DATABASE_URL = "sqlite://"
 
+# In-memory database; StaticPool hands every checkout the same connection so they all see it.
+# Each pytest-xdist worker is its own process and therefore gets its own database.
 engine = create_engine(
     SQLALCHEMY_TEST_DATABASE_URL,
-    connect_args={"check_same_thread": False}
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
-@pytest.fixture(scope="function")
+# pysqlite defers BEGIN on its own, which breaks SAVEPOINTs; let SQLAlchemy emit it
+@event.listens_for(engine, "connect")
+def _disable_pysqlite_transactions(dbapi_connection, connection_record):
+    dbapi_connection.isolation_level = None
+
+
+@event.listens_for(engine, "begin")
+def _emit_begin(connection):
+    connection.exec_driver_sql("BEGIN")
+
+
+@pytest.fixture(scope="session")
 def test_db():
-    """Create test database and tables"""
+    """Create test database tables once for the whole run"""
+    # Configure mappers up front so the first test's query doesn't pay for it
+    configure_mappers()
     Base.metadata.create_all(bind=engine)
     yield
     Base.metadata.drop_all(bind=engine)
 
 
 @pytest.fixture(scope="function")
-def app(test_db):
-    """Create Flask app for testing"""
+def db_connection(test_db):
+    """
+    Connection holding an outer transaction that is rolled back after each test
+    
+    The test's own session joins it directly and request sessions join through
+    a SAVEPOINT, so no commit reaches the database and each test starts from
+    empty tables.
+    """
+    connection = engine.connect()
+    transaction = connection.begin()
+    yield connection
+    transaction.rollback()
+    connection.close()
+
+
+@pytest.fixture(scope="session")
+def app():
+    """Create Flask app once for the whole test run"""
     app = create_app()
     app.config['TESTING'] = True
     app.config['DATABASE_URL'] = SQLALCHEMY_TEST_DATABASE_URL
+    return app
+
+
+@pytest.fixture(scope="session", autouse=True)
+def ai_provider_mocks():
+    """
+    Replace the outbound Groq, Hugging Face and Ollama calls for the whole run
     
-    # Patch the database session to use test database
+    Groq and Hugging Face count as configured and every provider returns None
+    unless a test sets `return_value` or `side_effect` on its mock.
+    """
+    from app.services.ai_service import ai_service
+    mocks = SimpleNamespace(groq=AsyncMock(), hf=AsyncMock(), ollama=AsyncMock())
+    with patch.multiple(
+        ai_service,
+        _call_groq_api=mocks.groq,
+        _call_huggingface_api=mocks.hf,
+        _call_ollama_api=mocks.ollama,
+        groq_client=True,
+        hf_client=True,
+        hedge_enabled=False
+    ):
+        yield mocks
+
+
+@pytest.fixture(scope="function", autouse=True)
+def isolated_state(db_connection, ai_provider_mocks):
+    """Give each test its own database transaction and fresh AI state"""
+    # Start every test without AI responses cached by an earlier one
+    from app.services.ai_service import ai_service
+    ai_service.clear_caches()
+    for breaker in ai_service._breakers.values():
+        breaker.update(fails=0, open_until=0.0)
+    for mock in vars(ai_provider_mocks).values():
+        mock.reset_mock(return_value=True, side_effect=True)
+        mock.return_value = None
+    
+    # Patch the database session to use the test connection
     from app import database
     original_session = database.SessionLocal
-    database.SessionLocal = TestingSessionLocal
+    database.SessionLocal = sessionmaker(
+        autocommit=False, autoflush=False, bind=db_connection,
+        join_transaction_mode="create_savepoint"
+    )
     
-    yield app
+    yield
     
     # Restore original session
     database.SessionLocal = original_session
 
 
-@pytest.fixture(scope="function")
+@pytest.fixture(scope="session")
 def client(app):
-    """Create test client with Flask app"""
-    return app.test_client()
-
-
-@pytest.fixture(scope="function")
-def app_context(app):
-    """Create app context for tests"""
-    with app.app_context():
-        yield
+    """Create test client with Flask app (auth is header-based, so no cookies leak between tests)"""
+    client = app.test_client()
+    # get_json() falls back to stdlib json outside an app context; decode with the app's provider (orjson)
+    client.response_wrapper.json_module = app.json
+    return client
 
 
 @pytest.fixture(scope="function")
-def db_session(test_db, app_context):
+def db_session(db_connection):
     """Get database session for direct database access in tests"""
-    session = TestingSessionLocal()
+    # Join the outer transaction without a SAVEPOINT of its own: commit() leaves it
+    # open, and request sessions' SAVEPOINTs never end up nested under one that
+    # gets released first
+    session = TestingSessionLocal(bind=db_connection)
     yield session
     session.close()
 
 
-@pytest.fixture
+TEST_USER_DATA = {
+    "email": "test@example.com",
+    "username": "testuser",
+    "password": "testpass123",
+    "full_name": "Test User"
+}
+
+# Precomputed cost-4 bcrypt hash of TEST_USER_DATA["password"], so creating the test user never hashes
+TEST_USER_PASSWORD_HASH = "$2b$04$c4HI0UKXwCIsizOEJSg0j.AlmdIpp7RrmtozbJfGwBLslWC52Feti"
+
+
+TEST_MEDICAL_RECORD_DATA = {
+    "title": "Blood Test Results",
+    "original_text": "WBC: 7.5, RBC: 4.8, HGB: 14.2, PLT: 250",
+    "record_type": "lab_result"
+}
+
+
+# Shared across tests: copy before modifying
+@pytest.fixture(scope="session")
 def test_user_data():
     """Test user registration data"""
-    return {
-        "email": "test@example.com",
-        "username": "testuser",
-        "password": "testpass123",
-        "full_name": "Test User"
-    }
+    return TEST_USER_DATA
+
+
+@pytest.fixture(scope="session")
+def password_hash():
+    """Precomputed bcrypt hash of the test password, shared by every test user"""
+    return TEST_USER_PASSWORD_HASH
 
 
 @pytest.fixture
-def test_user(db_session, test_user_data):
+def test_user(db_session, test_user_data, password_hash):
     """Create a test user in the database"""
     user = User(
         email=test_user_data["email"],
         username=test_user_data["username"],
-        hashed_password=get_password_hash(test_user_data["password"]),
+        hashed_password=password_hash,
         full_name=test_user_data["full_name"]
     )
+    # Flush, not commit: the row only has to be visible to this test's connection
     db_session.add(user)
-    db_session.commit()
-    db_session.refresh(user)
+    db_session.flush()
     return user
 
 
+@pytest.fixture(scope="session")
+def auth_token(app):
+    """Sign the test user's JWT once instead of logging in for every test"""
+    with app.app_context():
+        return create_access_token(data={"sub": TEST_USER_DATA["username"]})
+
+
 @pytest.fixture
-def auth_headers(client, test_user, test_user_data, app_context):
+def auth_headers(auth_token, test_user):
     """Get authentication headers with JWT token"""
-    response = client.post(
-        "/api/auth/login",
-        json={
-            "username": test_user_data["username"],
-            "password": test_user_data["password"]
-        }
-    )
-    token = response.get_json()["access_token"]
-    return {"Authorization": f"Bearer {token}"}
+    return {"Authorization": f"Bearer {auth_token}"}
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def test_medical_record_data():
     """Test medical record data"""
-    return {
-        "title": "Blood Test Results",
-        "original_text": "WBC: 7.5, RBC: 4.8, HGB: 14.2, PLT: 250",
-        "record_type": "lab_result"
-    }
+    return TEST_MEDICAL_RECORD_DATA
 
 
 @pytest.fixture
@@ -127,8 +220,7 @@ def test_medical_record(db_session, test_user, test_medical_record_data):
         created_at=datetime.now(timezone.utc)
     )
     db_session.add(record)
-    db_session.commit()
-    db_session.refresh(record)
+    db_session.flush()
     return record
 
 
@@ -136,17 +228,19 @@ def test_medical_record(db_session, test_user, test_medical_record_data):
 def multiple_medical_records(db_session, test_user):
     """Create multiple test medical records"""
     from datetime import datetime, timezone
-    records = [
-        MedicalRecord(
-            user_id=test_user.id,
-            title=f"Record {i}",
-            original_text=f"Test content {i}",
-            record_type="doctor_note",
-            created_at=datetime.now(timezone.utc)
-        )
+    now = datetime.now(timezone.utc)
+    rows = [
+        {
+            "user_id": test_user.id,
+            "title": f"Record {i}",
+            "original_text": f"Test content {i}",
+            "record_type": "doctor_note",
+            "created_at": now
+        }
         for i in range(5)
     ]
-    for record in records:
-        db_session.add(record)
-    db_session.commit()
-    return records
+    # One executemany INSERT from plain dicts, no ORM objects or unit-of-work flush
+    db_session.bulk_insert_mappings(MedicalRecord, rows)
+    return db_session.query(MedicalRecord).filter(
+        MedicalRecord.user_id == test_user.id
+    ).order_by(MedicalRecord.id).all()
@@ -1,26 +1,21 @@
 # AI service endpoint tests
 import pytest
-from unittest.mock import patch, AsyncMock
+from unittest.mock import patch
 from app.services.ai_service import ai_service
 
 @pytest.mark.ai
 class TestAITranslation:
     """Tests for AI translation endpoint"""
     
-    def test_translate_success(self, client, auth_headers):
+    def test_translate_success(self, client, auth_headers, ai_provider_mocks):
         """Test successful medical text translation"""
-        with patch.object(ai_service, 'translate_medical_text', new_callable=AsyncMock) as mock_translate, \
-             patch.object(ai_service, 'meta_api_key', 'test_key'), \
-             patch.object(ai_service, 'hf_client', 'test_key'), \
-             patch.object(ai_service, 'groq_client', 'test_key'):
-            
-            mock_translate.return_value = "This means white blood cells, red blood cells, and platelets are normal."
-        
-            response = client.post(
-                "/api/ai/translate",
-                json={"text": "WBC, RBC, and PLT within normal limits"},
-                headers=auth_headers
-            )
+        ai_provider_mocks.groq.return_value = "This means white blood cells, red blood cells, and platelets are normal."
+    
+        response = client.post(
+            "/api/ai/translate",
+            json={"text": "WBC, RBC, and PLT within normal limits"},
+            headers=auth_headers
+        )
         
         assert response.status_code == 200
         data = response.get_json()
@@ -51,18 +46,15 @@ class TestAITranslation:
 class TestAISuggestions:
     """Tests for AI lifestyle suggestions endpoint"""
     
-    def test_suggestions_success(self, client, auth_headers):
+    def test_suggestions_success(self, client, auth_headers, ai_provider_mocks):
         """Test successful lifestyle suggestions generation"""
-        with patch.object(ai_service, 'generate_lifestyle_suggestions', new_callable=AsyncMock) as mock_suggestions, \
-             patch.object(ai_service, 'meta_api_key', 'test_key'):
-            
-            mock_suggestions.return_value = "Consider regular exercise and balanced diet."
-        
-            response = client.post(
-                "/api/ai/suggestions",
-                json={"condition": "High cholesterol"},
-                headers=auth_headers
-            )
+        ai_provider_mocks.groq.return_value = "Consider regular exercise and balanced diet."
+    
+        response = client.post(
+            "/api/ai/suggestions",
+            json={"condition": "High cholesterol"},
+            headers=auth_headers
+        )
         
         assert response.status_code == 200
         data = response.get_json()
@@ -93,20 +85,14 @@ class TestAISuggestions:
 class TestAIExplainRecord:
     """Tests for AI record explanation endpoint"""
     
-    def test_explain_record_success(self, client, auth_headers, test_medical_record):
+    def test_explain_record_success(self, client, auth_headers, test_medical_record, ai_provider_mocks):
         """Test successful record explanation"""
-        with patch.object(ai_service, 'explain_medical_record', new_callable=AsyncMock) as mock_explain, \
-             patch.object(ai_service, 'meta_api_key', 'test_key'):
-            
-            mock_explain.return_value = {
-                "translation": "Your blood test shows normal levels",
-                "suggestions": "Maintain healthy diet and exercise"
-            }
-            
-            response = client.post(
-                f"/api/ai/explain/{test_medical_record.id}",
-                headers=auth_headers
-            )
+        ai_provider_mocks.groq.return_value = "Your blood test shows normal levels"
+        
+        response = client.post(
+            f"/api/ai/explain/{test_medical_record.id}",
+            headers=auth_headers
+        )
         
         assert response.status_code == 200
         data = response.get_json()
@@ -132,30 +118,24 @@ class TestAIExplainRecord:
         assert data["suggestions"] == "Cached suggestions"
         assert data["cached"] is True
     
-    def test_explain_record_force_refresh(self, client, auth_headers, test_medical_record, db_session):
+    def test_explain_record_force_refresh(self, client, auth_headers, test_medical_record, db_session, ai_provider_mocks):
         """Test explanation with force refresh"""
         # Set cached data
         test_medical_record.translated_text = "Old translation"
         test_medical_record.lifestyle_suggestions = "Old suggestions"
         db_session.commit()
         
-        with patch.object(ai_service, 'explain_medical_record', new_callable=AsyncMock) as mock_explain, \
-             patch.object(ai_service, 'meta_api_key', 'test_key'):
-            
-            mock_explain.return_value = {
-                "translation": "New translation",
-                "suggestions": "New suggestions"
-            }
-            
-            response = client.post(
-                f"/api/ai/explain/{test_medical_record.id}?force_refresh=true",
-                headers=auth_headers
-            )
+        ai_provider_mocks.groq.return_value = "New translation"
+        
+        response = client.post(
+            f"/api/ai/explain/{test_medical_record.id}?force_refresh=true",
+            headers=auth_headers
+        )
         
         assert response.status_code == 200
         data = response.get_json()
         # Should call the AI service even with cached data
-        assert mock_explain.called
+        assert ai_provider_mocks.groq.called
     
     def test_explain_record_not_found(self, client, auth_headers):
         """Test explanation for non-existent record"""
@@ -1,3 +1,5 @@
+import asyncio
+import time
 import pytest
 from unittest.mock import patch, AsyncMock
 
@@ -5,118 +7,155 @@ from unittest.mock import patch, AsyncMock
 class TestAIFallback:
     """Tests for AI fallback logic (Groq -> Hugging Face -> Ollama)"""
 
-    @patch('app.config.settings.GROQ_API_KEY', 'valid_groq_key')
-    @patch('app.config.settings.HUGGINGFACE_API_KEY', 'valid_hf_key')
-    def test_groq_success(self, client, auth_headers):
+    def test_groq_success(self, client, auth_headers, ai_provider_mocks):
         """Test that Groq is used when configured and works (Priority 1)"""
+        ai_provider_mocks.groq.return_value = "Response from Groq"
+        
+        response = client.post(
+            "/api/ai/translate",
+            json={"text": "Medical text"},
+            headers=auth_headers
+        )
+                
+        assert response.status_code == 200
+        assert ai_provider_mocks.groq.called
+        assert not ai_provider_mocks.hf.called
+        assert not ai_provider_mocks.ollama.called
+        assert "Response from Groq" in response.get_json()["result"]
+
+    def test_fallback_to_huggingface(self, client, auth_headers, ai_provider_mocks):
+        """Test fallback to Hugging Face when Groq fails (Priority 2)"""
+        # Groq fails (returns None)
+        ai_provider_mocks.hf.return_value = "Response from Hugging Face"
+        
+        response = client.post(
+            "/api/ai/translate",
+            json={"text": "Medical text"},
+            headers=auth_headers
+        )
+        
+        assert response.status_code == 200
+        assert ai_provider_mocks.groq.called
+        assert ai_provider_mocks.hf.called
+        assert not ai_provider_mocks.ollama.called
+        assert "Response from Hugging Face" in response.get_json()["result"]
+
+    def test_fallback_to_ollama(self, client, auth_headers, ai_provider_mocks):
+        """Test fallback to Ollama when Groq and HF fail (Priority 3)"""
+        # Groq and Hugging Face fail (return None)
+        ai_provider_mocks.ollama.return_value = "Response from Ollama"
+        
+        response = client.post(
+            "/api/ai/translate",
+            json={"text": "Medical text"},
+            headers=auth_headers
+        )
+        
+        assert response.status_code == 200
+        assert ai_provider_mocks.groq.called
+        assert ai_provider_mocks.hf.called
+        assert ai_provider_mocks.ollama.called
+        assert "Response from Ollama" in response.get_json()["result"]
+        assert response.get_json()["fallback"] is False
+
+    def test_groq_not_configured(self, client, auth_headers, ai_provider_mocks):
+        """Test proper skip of Groq if not configured"""
         from app.services.ai_service import ai_service
         
-        # Patch methods on the singleton instance
-        with patch.object(ai_service, '_call_groq_api', new_callable=AsyncMock) as mock_groq, \
-             patch.object(ai_service, '_call_huggingface_api', new_callable=AsyncMock) as mock_hf, \
-             patch.object(ai_service, '_call_ollama_api', new_callable=AsyncMock) as mock_ollama:
-            
-            # Re-initialize client if needed (since __init__ checks env vars)
-            # Actually, ai_service is already initialized. We need to manually set clients if we want to simulate init
-            # But simpler is to rely on the fact that _call_api checks self.groq_client.
-            # We must set self.groq_client on the instance if it wasn't set during app startup.
-            # Or we can just mock the client itself?
-            # The cleanest way for tested logic is to mock _call_groq_api directly which we do.
-            # BUT _call_api checks `if self.groq_client:`. So we must ensure self.groq_client is truthy.
-            ai_service.groq_client = True 
+        # Use patch.object to safely unset clients for this test only
+        with patch.object(ai_service, 'groq_client', None), \
+             patch.object(ai_service, 'hf_client', None):
             
-            mock_groq.return_value = "Response from Groq"
+            ai_provider_mocks.ollama.return_value = "Response from Ollama"
             
             response = client.post(
                 "/api/ai/translate",
                 json={"text": "Medical text"},
                 headers=auth_headers
             )
-                    
+            
             assert response.status_code == 200
-            assert mock_groq.called
-            assert not mock_hf.called
-            assert not mock_ollama.called
-            assert "Response from Groq" in response.get_json()["result"]
-
-    @patch('app.config.settings.GROQ_API_KEY', 'valid_groq_key')
-    @patch('app.config.settings.HUGGINGFACE_API_KEY', 'valid_hf_key')
-    def test_fallback_to_huggingface(self, client, auth_headers):
-        """Test fallback to Hugging Face when Groq fails (Priority 2)"""
+            assert not ai_provider_mocks.groq.called
+            assert not ai_provider_mocks.hf.called
+            assert ai_provider_mocks.ollama.called
+
+    def test_hedged_call_uses_faster_provider(self, client, auth_headers, ai_provider_mocks):
+        """Test that hedging starts Hugging Face when Groq is slow and returns the first answer"""
         from app.services.ai_service import ai_service
-        
-        with patch.object(ai_service, '_call_groq_api', new_callable=AsyncMock) as mock_groq, \
-             patch.object(ai_service, '_call_huggingface_api', new_callable=AsyncMock) as mock_hf, \
-             patch.object(ai_service, '_call_ollama_api', new_callable=AsyncMock) as mock_ollama:
-            
-            ai_service.groq_client = True
-            ai_service.hf_client = True
-            
-            # Groq fails (returns None)
-            mock_groq.return_value = None
-            mock_hf.return_value = "Response from Hugging Face"
-            
+
+        async def slow_groq(*args, **kwargs):
+            await asyncio.sleep(5)
+            return "Response from Groq"
+
+        ai_provider_mocks.groq.side_effect = slow_groq
+        ai_provider_mocks.hf.return_value = "Response from Hugging Face"
+
+        with patch.object(ai_service, 'hedge_enabled', True), \
+             patch.object(ai_service, 'hedge_delay', 0.01):
+
             response = client.post(
                 "/api/ai/translate",
                 json={"text": "Medical text"},
                 headers=auth_headers
             )
-            
+
             assert response.status_code == 200
-            assert mock_groq.called
-            assert mock_hf.called
-            assert not mock_ollama.called
+            assert ai_provider_mocks.groq.called
+            assert ai_provider_mocks.hf.called
+            assert not ai_provider_mocks.ollama.called
             assert "Response from Hugging Face" in response.get_json()["result"]
 
-    @patch('app.config.settings.GROQ_API_KEY', 'valid_groq_key')
-    @patch('app.config.settings.HUGGINGFACE_API_KEY', 'valid_hf_key')
-    def test_fallback_to_ollama(self, client, auth_headers):
-        """Test fallback to Ollama when Groq and HF fail (Priority 3)"""
+    def test_open_circuit_skips_provider(self, client, auth_headers, ai_provider_mocks):
+        """Test that a provider with an open circuit breaker is skipped without being called"""
         from app.services.ai_service import ai_service
-        
-        with patch.object(ai_service, '_call_groq_api', new_callable=AsyncMock) as mock_groq, \
-             patch.object(ai_service, '_call_huggingface_api', new_callable=AsyncMock) as mock_hf, \
-             patch.object(ai_service, '_call_ollama_api', new_callable=AsyncMock) as mock_ollama:
-            
-            ai_service.groq_client = True
-            ai_service.hf_client = True
-            
-            mock_groq.return_value = None
-            mock_hf.return_value = None
-            mock_ollama.return_value = "Response from Ollama"
-            
+
+        ai_provider_mocks.hf.return_value = "Response from Hugging Face"
+
+        with patch.dict(ai_service._breakers["groq"], {"open_until": time.monotonic() + 60}):
+
             response = client.post(
                 "/api/ai/translate",
                 json={"text": "Medical text"},
                 headers=auth_headers
             )
-            
+
             assert response.status_code == 200
-            assert mock_groq.called
-            assert mock_hf.called
-            assert mock_ollama.called
-            assert "Response from Ollama" in response.get_json()["result"]
+            assert not ai_provider_mocks.groq.called
+            assert ai_provider_mocks.hf.called
+            assert "Response from Hugging Face" in response.get_json()["result"]
 
-    def test_groq_not_configured(self, client, auth_headers):
-        """Test proper skip of Groq if not configured"""
+    def test_rule_based_suggestions_when_all_providers_fail(self, client, auth_headers, ai_provider_mocks):
+        """Test canned lifestyle tips are returned when every provider fails"""
         from app.services.ai_service import ai_service
-        
-        # Use patch.object to safely unset clients for this test only
+
         with patch.object(ai_service, 'groq_client', None), \
-             patch.object(ai_service, 'hf_client', None), \
-             patch.object(ai_service, '_call_groq_api', new_callable=AsyncMock) as mock_groq, \
-             patch.object(ai_service, '_call_huggingface_api', new_callable=AsyncMock) as mock_hf, \
-             patch.object(ai_service, '_call_ollama_api', new_callable=AsyncMock) as mock_ollama:
-            
-            mock_ollama.return_value = "Response from Ollama"
-            
+             patch.object(ai_service, 'hf_client', None):
+
             response = client.post(
-                "/api/ai/translate",
-                json={"text": "Medical text"},
+                "/api/ai/suggestions",
+                json={"condition": "Hypertension"},
                 headers=auth_headers
             )
-            
+
             assert response.status_code == 200
-            assert not mock_groq.called
-            assert not mock_hf.called
-            assert mock_ollama.called
+            assert ai_provider_mocks.ollama.called
+            data = response.get_json()
+            assert data["fallback"] is True
+            assert "temporarily unavailable" in data["result"]
+            assert "salt" in data["result"]
+
+    def test_low_quality_ocr_skips_translation(self, app):
+        """Test that noisy or near-empty OCR text is never sent for translation"""
+        from app.services.ai_service import ai_service
+        from app.services.ocr_service import ocr_service
+
+        for ocr_result in [("Take 1 tablet daily with food", 0.1), ("ok", 0.95)]:
+            with app.app_context(), \
+                 patch.object(ocr_service, 'extract_text_from_image', return_value=ocr_result), \
+                 patch.object(ai_service, 'translate_medical_text', new_callable=AsyncMock) as mock_translate:
+
+                result = asyncio.run(ai_service.analyze_medical_note_with_medications("image"))
+
+                assert not mock_translate.called
+                assert result["ai_translation"] is None
+                assert result["extracted_text"] == ocr_result[0]
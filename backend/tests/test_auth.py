@@ -20,45 +20,26 @@ class TestUserRegistration:
         assert "password" not in data
         assert "hashed_password" not in data
     
-    def test_register_duplicate_username(self, client, test_user, test_user_data):
-        """Test registration with existing username"""
-        response = client.post("/api/auth/register", json=test_user_data)
-        
-        assert response.status_code == 400
-        data = response.get_json()
-        assert "username" in data.get("error", "").lower() or "username" in str(data.get("errors", "")).lower()
-    
-    def test_register_duplicate_email(self, client, test_user, test_user_data):
-        """Test registration with existing email"""
-        new_user = test_user_data.copy()
-        new_user["username"] = "differentuser"
-        response = client.post("/api/auth/register", json=new_user)
+    @pytest.mark.parametrize("changes,field", [
+        ({}, "username"),
+        ({"username": "differentuser"}, "email"),
+    ], ids=["duplicate_username", "duplicate_email"])
+    def test_register_duplicate(self, client, test_user, test_user_data, changes, field):
+        """Test registration with an existing username or email"""
+        response = client.post("/api/auth/register", json={**test_user_data, **changes})
         
         assert response.status_code == 400
         data = response.get_json()
-        assert "email" in data.get("error", "").lower() or "email" in str(data.get("errors", "")).lower()
-    
-    def test_register_invalid_email(self, client, test_user_data):
-        """Test registration with invalid email format"""
-        invalid_data = test_user_data.copy()
-        invalid_data["email"] = "not-an-email"
-        response = client.post("/api/auth/register", json=invalid_data)
-        
-        assert response.status_code == 400
-    
-    def test_register_short_password(self, client, test_user_data):
-        """Test registration with password too short"""
-        invalid_data = test_user_data.copy()
-        invalid_data["password"] = "12345"
-        response = client.post("/api/auth/register", json=invalid_data)
-        
-        assert response.status_code == 400
+        assert field in data.get("error", "").lower() or field in str(data.get("errors", "")).lower()
     
-    def test_register_short_username(self, client, test_user_data):
-        """Test registration with username too short"""
-        invalid_data = test_user_data.copy()
-        invalid_data["username"] = "ab"
-        response = client.post("/api/auth/register", json=invalid_data)
+    @pytest.mark.parametrize("changes", [
+        {"email": "not-an-email"},
+        {"password": "12345"},
+        {"username": "ab"},
+    ], ids=["invalid_email", "short_password", "short_username"])
+    def test_register_invalid_field(self, client, test_user_data, changes):
+        """Test registration with an invalid email, password or username"""
+        response = client.post("/api/auth/register", json={**test_user_data, **changes})
         
         assert response.status_code == 400
     
@@ -108,6 +89,23 @@ class TestUserLogin:
         
         assert response.status_code == 401
     
+    def test_login_malformed_password_hash(self, client, db_session):
+        """Test login against a corrupt stored hash is rejected instead of erroring"""
+        from app.models import User
+        db_session.add(User(
+            email="broken@example.com",
+            username="brokenhash",
+            hashed_password="not-a-bcrypt-hash"
+        ))
+        db_session.commit()
+        
+        response = client.post("/api/auth/login", data={
+            "username": "brokenhash",
+            "password": "somepassword"
+        })
+        
+        assert response.status_code == 401
+    
     def test_login_missing_credentials(self, client):
         """Test login with missing credentials"""
         response = client.post("/api/auth/login", json={})
@@ -0,0 +1,60 @@
+# Knowledge base storage tests
+import os
+import pytest
+from app.services.knowledge_base import KnowledgeBase
+
+
+@pytest.fixture
+def kb_dir(tmp_path, monkeypatch):
+    """Run the knowledge base out of an empty temporary directory"""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def make_knowledge_base():
+    kb = KnowledgeBase()
+    kb.close()
+    return kb
+
+
+@pytest.mark.ai
+class TestKnowledgeBaseStorage:
+    """Tests for loading the JSON + .npy snapshot"""
+
+    def test_reload_keeps_records(self, kb_dir):
+        """Test that a saved snapshot loads back with its embeddings"""
+        kb = make_knowledge_base()
+        kb._append_records([{"id": "1", "text": "Aspirin", "meta": {}}], [[1.0, 0.0]])
+        kb._save_data()
+
+        reloaded = make_knowledge_base()
+        assert [item["text"] for item in reloaded.data] == ["Aspirin"]
+        assert reloaded._emb_matrix.shape == (1, 2)
+
+    @pytest.mark.parametrize("damage", ["delete", "corrupt"])
+    def test_missing_embeddings_keep_records(self, kb_dir, damage):
+        """Test that losing the .npy sidecar never wipes the stored records"""
+        kb = make_knowledge_base()
+        kb._append_records([
+            {"id": "1", "text": "Aspirin", "meta": {}},
+            {"id": "2", "text": "Ibuprofen", "meta": {}}
+        ], [[1.0, 0.0], [0.0, 1.0]])
+        kb._save_data()
+        if damage == "delete":
+            os.remove(kb.embeddings_path)
+        else:
+            with open(kb.embeddings_path, "wb") as f:
+                f.write(b"not an npy file")
+        with open(kb.file_path, "rb") as f:
+            snapshot = f.read()
+
+        reloaded = make_knowledge_base()
+        assert [item["text"] for item in reloaded.data] == ["Aspirin", "Ibuprofen"]
+
+        # Writes are refused so the JSON isn't replaced by a partial snapshot
+        with pytest.raises(RuntimeError):
+            reloaded._append_records([{"id": "3", "text": "Paracetamol", "meta": {}}], [[1.0, 1.0]])
+        with pytest.raises(RuntimeError):
+            reloaded._save_data()
+        with open(kb.file_path, "rb") as f:
+            assert f.read() == snapshot
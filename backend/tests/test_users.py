@@ -26,12 +26,6 @@ class TestUserProfile:
         data = response.get_json()
         assert data["record_count"] == 5
     
-    def test_get_profile_no_auth(self, client):
-        """Test getting profile without authentication"""
-        response = client.get("/api/users/me")
-        
-        assert response.status_code == 401
-    
     def test_update_profile_email(self, client, auth_headers):
         """Test updating user email"""
         response = client.put(
@@ -76,16 +70,15 @@ class TestUserProfile:
         )
         assert login_response.status_code == 200
     
-    def test_update_profile_duplicate_email(self, client, auth_headers, db_session):
+    def test_update_profile_duplicate_email(self, client, auth_headers, db_session, password_hash):
         """Test updating to an already existing email"""
         # Create another user
         from app.models import User
-        from app.utils.security import get_password_hash
         
         other_user = User(
             email="other@example.com",
             username="otheruser",
-            hashed_password=get_password_hash("password123")
+            hashed_password=password_hash
         )
         db_session.add(other_user)
         db_session.commit()
@@ -97,15 +90,6 @@ class TestUserProfile:
         )
         
         assert response.status_code == 400
-    
-    def test_update_profile_no_auth(self, client):
-        """Test updating profile without authentication"""
-        response = client.put(
-            "/api/users/me",
-            json={"email": "new@example.com"}
-        )
-        
-        assert response.status_code == 401
 
 
 @pytest.mark.users
@@ -146,9 +130,19 @@ class TestDashboard:
         assert data["statistics"]["total_records"] == 1
         assert data["ai_insights"]["translations_completed"] == 1
         assert data["ai_insights"]["suggestions_generated"] == 1
+
+
+@pytest.mark.users
+class TestUsersRequireAuth:
+    """Every user profile endpoint rejects requests without a token"""
     
-    def test_dashboard_no_auth(self, client):
-        """Test dashboard without authentication"""
-        response = client.get("/api/users/dashboard")
+    @pytest.mark.parametrize("method,url,body", [
+        ("GET", "/api/users/me", None),
+        ("PUT", "/api/users/me", {"email": "new@example.com"}),
+        ("GET", "/api/users/dashboard", None),
+    ])
+    def test_requires_auth(self, client, method, url, body):
+        """Test the endpoint without authentication"""
+        response = client.open(url, method=method, json=body)
         
         assert response.status_code == 401
@@ -1,9 +1,21 @@
+import os
 import requests
 import time
 import sys
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 BASE_URL = "http://localhost:8000"
 
+# Set VERIFY_MOCK_AI=1 to skip the live LLM call and check only the non-AI flow
+SKIP_AI = os.getenv("VERIFY_MOCK_AI", "").lower() in ("1", "true", "yes")
+
+# One keep-alive connection for every check; retries cover a server that is still starting
+SESSION = requests.Session()
+ADAPTER = HTTPAdapter(pool_connections=1, pool_maxsize=4, max_retries=Retry(total=2, backoff_factor=0.1))
+SESSION.mount("http://", ADAPTER)
+SESSION.mount("https://", ADAPTER)
+
 def print_pass(message):
     print(f"\033[92m[PASS] {message}\033[0m")
 
@@ -12,7 +24,7 @@ def print_fail(message):
 
 def verify_health():
     try:
-        resp = requests.get(f"{BASE_URL}/health")
+        resp = SESSION.get(f"{BASE_URL}/health")
         if resp.status_code == 200:
             print_pass("Health check passed")
             return True
@@ -22,7 +34,7 @@ def verify_health():
 
 def verify_frontend_serving():
     try:
-        resp = requests.get(f"{BASE_URL}/login")
+        resp = SESSION.get(f"{BASE_URL}/login")
         if resp.status_code == 200 and "<html" in resp.text:
             print_pass("Frontend serving (login page) passed")
             return True
@@ -43,7 +55,7 @@ def verify_json_login():
     }
     
     try:
-        resp = requests.post(f"{BASE_URL}/api/auth/register", json=user_data)
+        resp = SESSION.post(f"{BASE_URL}/api/auth/register", json=user_data)
         if resp.status_code != 201:
             print_fail(f"Registration failed: {resp.text}")
             return None
@@ -54,7 +66,7 @@ def verify_json_login():
             "username": username,
             "password": "password123"
         }
-        resp = requests.post(f"{BASE_URL}/api/auth/login", json=login_data)
+        resp = SESSION.post(f"{BASE_URL}/api/auth/login", json=login_data)
         if resp.status_code == 200 and "access_token" in resp.json():
             print_pass("JSON Login passed")
             return resp.json()["access_token"]
@@ -64,9 +76,7 @@ def verify_json_login():
         print_fail(f"Auth flow failed: {e}")
     return None
 
-def verify_rag(token):
-    headers = {"Authorization": f"Bearer {token}"}
-    
+def verify_rag():
     # 1. Add Knowledge
     knowledge_data = {
         "title": "Test Condition X",
@@ -75,7 +85,7 @@ def verify_rag(token):
     }
     
     try:
-        resp = requests.post(f"{BASE_URL}/api/knowledge/", json=knowledge_data, headers=headers)
+        resp = SESSION.post(f"{BASE_URL}/api/knowledge/", json=knowledge_data)
         if resp.status_code == 201:
             print_pass("Add Knowledge passed")
         else:
@@ -88,8 +98,12 @@ def verify_rag(token):
         # If the AI service is not configured, it returns 503. 
         # We can accept 503 as "passed" for the infrastructure test if we don't have a key.
         
+        if SKIP_AI:
+            print_pass("AI Suggestion skipped (VERIFY_MOCK_AI set)")
+            return
+        
         suggestion_data = {"condition": "I have Test Condition X"}
-        resp = requests.post(f"{BASE_URL}/api/ai/suggestions", json=suggestion_data, headers=headers)
+        resp = SESSION.post(f"{BASE_URL}/api/ai/suggestions", json=suggestion_data)
         
         if resp.status_code == 200:
             print_pass("AI Suggestion (RAG) passed")
@@ -111,4 +125,6 @@ if __name__ == "__main__":
         
     token = verify_json_login()
     if token:
-        verify_rag(token)
+        SESSION.headers["Authorization"] = f"Bearer {token}"
+        verify_rag()
+    SESSION.close()